@@ -0,0 +1,168 @@
+"""
+Indexed user account store backed by SQLite (WAL mode).
+
+Accounts are keyed by Phone_Number (the table's primary key), so login and
+profile lookups are O(log n) B-tree lookups and profile edits are row-level
+updates instead of rewriting Auth/user_signup.csv.
+
+One-shot import of the legacy CSV, run from the backend folder:
+
+    python account_store.py import Auth/user_signup.csv
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional
+
+
+AUTH_DIR = "Auth"
+DB_FILE = os.path.join(AUTH_DIR, "users.db")
+SIGNUP_CSV = os.path.join(AUTH_DIR, "user_signup.csv")
+
+PROFILE_FIELDS = ("full_name", "Phone_Number", "email", "location")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    Phone_Number TEXT PRIMARY KEY,
+    full_name    TEXT NOT NULL,
+    email        TEXT NOT NULL,
+    location     TEXT NOT NULL,
+    password     TEXT NOT NULL
+) WITHOUT ROWID
+"""
+
+
+class AccountExistsError(Exception):
+    """Raised when signing up with a Phone_Number that already has an account."""
+
+
+class AccountStore:
+    """
+    SQLite account store. Each thread gets its own connection; WAL mode lets
+    readers proceed while a profile update is being written, and concurrent
+    updates are serialised by SQLite instead of racing on a temp file.
+    """
+
+    def __init__(self, db_path: str = DB_FILE):
+        self.db_path = os.path.abspath(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def create(self, full_name: str, phone_number: str, email: str, location: str, password: str) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO users (Phone_Number, full_name, email, location, password) VALUES (?, ?, ?, ?, ?)",
+                    (phone_number, full_name, email, location, password),
+                )
+        except sqlite3.IntegrityError:
+            raise AccountExistsError(phone_number)
+
+    def get_profile(self, phone_number: str) -> Optional[Dict[str, str]]:
+        """Profile fields of an account, or None if the phone number is not registered."""
+        row = self._connect().execute(
+            "SELECT full_name, Phone_Number, email, location FROM users WHERE Phone_Number = ?",
+            (phone_number,),
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def check_password(self, phone_number: str, password: str) -> bool:
+        row = self._connect().execute(
+            "SELECT password FROM users WHERE Phone_Number = ?", (phone_number,)
+        ).fetchone()
+        return row is not None and row["password"] == password
+
+    def update_profile(self, phone_number: str, full_name: Optional[str] = None,
+                       email: Optional[str] = None, location: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """
+        Update the given (truthy) fields of one account and return the updated
+        profile, or None if the phone number is not registered.
+        """
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                """
+                UPDATE users SET
+                    full_name = COALESCE(NULLIF(?, ''), full_name),
+                    email = COALESCE(NULLIF(?, ''), email),
+                    location = COALESCE(NULLIF(?, ''), location)
+                WHERE Phone_Number = ?
+                """,
+                (full_name, email, location, phone_number),
+            )
+            if cursor.rowcount == 0:
+                return None
+        return self.get_profile(phone_number)
+
+    def import_rows(self, rows: Iterable[Dict[str, str]], batch_size: int = 10000) -> int:
+        """
+        Insert legacy signup rows; the first row for a Phone_Number wins, as it
+        did with the CSV scan. Rows without a phone number or password (e.g.
+        merge-conflict markers) are skipped. Returns the number of new accounts.
+        """
+        conn = self._connect()
+        before = self.count()
+        batch = []
+        with conn:
+            for row in rows:
+                phone_number = (row.get("Phone_Number") or "").strip()
+                password = row.get("password") or ""
+                if not phone_number or not password:
+                    continue
+                batch.append((phone_number, row.get("full_name") or "", row.get("email") or "",
+                              row.get("location") or "", password))
+                if len(batch) >= batch_size:
+                    conn.executemany("INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?, ?)", batch)
+                    batch = []
+            if batch:
+                conn.executemany("INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?, ?)", batch)
+        return self.count() - before
+
+    def import_csv(self, csv_path: str = SIGNUP_CSV) -> int:
+        """One-shot import of Auth/user_signup.csv. Returns the number of new accounts."""
+        with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+            return self.import_rows(csv.DictReader(f))
+
+
+def open_account_store(db_path: str = DB_FILE, legacy_csv: str = SIGNUP_CSV) -> AccountStore:
+    """Open the store, importing the legacy signup CSV the first time the database is created."""
+    is_new = not os.path.exists(db_path)
+    store = AccountStore(db_path)
+    if is_new and os.path.exists(legacy_csv):
+        imported = store.import_csv(legacy_csv)
+        print(f"Imported {imported} accounts from {legacy_csv}")
+    return store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="User account store maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    importer = subparsers.add_parser("import", help="Import accounts from a signup CSV")
+    importer.add_argument("csv_path", nargs="?", default=SIGNUP_CSV)
+    importer.add_argument("--db", default=DB_FILE)
+    args = parser.parse_args()
+
+    store = AccountStore(args.db)
+    imported = store.import_csv(args.csv_path)
+    print(f"Imported {imported} accounts into {store.db_path} ({store.count()} total)")
+
+
+if __name__ == "__main__":
+    main()
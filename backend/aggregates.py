@@ -0,0 +1,155 @@
+import threading
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from columnar_cache import OutletTable
+
+
+EPOCH = date(1970, 1, 1)
+
+
+def day_numbers(timestamps: np.ndarray) -> np.ndarray:
+    """Days since 1970-01-01 of datetime64 values (NaT stays NaT)."""
+    return timestamps.astype("datetime64[D]")
+
+
+class OutletAggregates:
+    """
+    Running sales metrics of one outlet.
+
+    ``add`` folds a batch of orders into the state in O(batch), so building
+    from a full table and applying newly appended orders are the same path.
+    """
+
+    def __init__(self):
+        self.total_sales = 0.0
+        self.order_count = 0
+        # Whether every Order_Bill is a whole number, i.e. pandas reads the column as int64
+        self.integral_bills = True
+        # Waiting time is accumulated in whole seconds so the running sum is exact
+        self.waiting_seconds = 0
+        self.waiting_count = 0
+        # Day number -> [sales, orders, waiting_seconds, waiting_count]
+        self.daily: Dict[int, List[float]] = {}
+        # Menu ID -> times ordered, as a bincount
+        self.item_counts = np.zeros(0, dtype=np.int64)
+
+    def add(self, table: OutletTable) -> "OutletAggregates":
+        if len(table) == 0:
+            return self
+        bill = np.asarray(table.bill, dtype=np.float64)
+        self.integral_bills = self.integral_bills and bool(np.all(bill == np.round(bill)))
+        bill = np.nan_to_num(bill, nan=0.0)
+        placed = np.asarray(table.placed)
+        complete = np.asarray(table.complete)
+
+        self.total_sales += float(bill.sum())
+        self.order_count += len(table)
+
+        has_waiting = ~np.isnat(placed) & ~np.isnat(complete)
+        waiting = (complete - placed).astype("timedelta64[s]").astype(np.int64)
+        waiting = np.where(has_waiting, waiting, 0)
+        self.waiting_seconds += int(waiting.sum())
+        self.waiting_count += int(has_waiting.sum())
+
+        has_day = ~np.isnat(placed)
+        days = day_numbers(placed[has_day]).astype(np.int64)
+        if len(days):
+            unique_days, inverse = np.unique(days, return_inverse=True)
+            sales = np.bincount(inverse, weights=bill[has_day])
+            orders = np.bincount(inverse)
+            waiting_sum = np.bincount(inverse, weights=waiting[has_day])
+            waiting_count = np.bincount(inverse, weights=has_waiting[has_day])
+            for i, day in enumerate(unique_days.tolist()):
+                entry = self.daily.setdefault(day, [0.0, 0, 0, 0])
+                entry[0] += float(sales[i])
+                entry[1] += int(orders[i])
+                entry[2] += int(waiting_sum[i])
+                entry[3] += int(waiting_count[i])
+
+        items = np.asarray(table.items)
+        if len(items):
+            counts = np.bincount(items)
+            if len(counts) > len(self.item_counts):
+                counts[:len(self.item_counts)] += self.item_counts
+                self.item_counts = counts
+            else:
+                self.item_counts[:len(counts)] += counts
+        return self
+
+    def average_waiting_minutes(self) -> Optional[float]:
+        if self.waiting_count == 0:
+            return None
+        return self.waiting_seconds / 60 / self.waiting_count
+
+    def daily_sales(self) -> List[Tuple[date, float]]:
+        """(day, sales) sorted by day; sales are ints when every bill is, like a pandas groupby sum."""
+        cast = int if self.integral_bills else float
+        return [(EPOCH + timedelta(days=day), cast(entry[0])) for day, entry in sorted(self.daily.items())]
+
+    def most_sold_item(self) -> Optional[Tuple[int, int]]:
+        """(Menu ID, count) of the most ordered item; ties go to the lowest Menu ID."""
+        if not self.item_counts.any():
+            return None
+        item = int(np.argmax(self.item_counts))
+        return item, int(self.item_counts[item])
+
+
+class AggregateEngine:
+    """
+    Per-outlet, per-day sales metrics maintained incrementally.
+
+    Registered as an order store listener: appended orders are folded into
+    the running state in O(batch), and an outlet's state is only recomputed
+    from its full table when it is (re)loaded from disk or on an explicit
+    ``rebuild``. The analytics endpoints are served straight from this state.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._outlets: Dict[str, OutletAggregates] = {}
+
+    def outlet_loaded(self, outlet: str, table: OutletTable) -> None:
+        aggregates = OutletAggregates().add(table)
+        with self._lock:
+            self._outlets[outlet] = aggregates
+
+    def outlet_removed(self, outlet: str) -> None:
+        with self._lock:
+            self._outlets.pop(outlet, None)
+
+    def orders_appended(self, outlet: str, batch: OutletTable, table: OutletTable) -> None:
+        with self._lock:
+            self._outlets.setdefault(outlet, OutletAggregates()).add(batch)
+
+    def rebuild(self, tables: Dict[str, OutletTable]) -> None:
+        """Recompute every outlet from scratch, e.g. ``rebuild(order_store.tables())``."""
+        outlets = {outlet: OutletAggregates().add(table) for outlet, table in tables.items()}
+        with self._lock:
+            self._outlets = outlets
+
+    def _snapshot(self, metric) -> Dict:
+        """Outlet name -> ``metric(aggregates)``, sorted by outlet name and read under the lock."""
+        with self._lock:
+            return {outlet: metric(self._outlets[outlet]) for outlet in sorted(self._outlets)}
+
+    def sales_totals(self) -> Dict[str, Tuple[float, int]]:
+        """Outlet -> (total sales, number of orders)."""
+        return self._snapshot(lambda a: (a.total_sales, a.order_count))
+
+    def waiting_times(self) -> Dict[str, Optional[float]]:
+        """Outlet -> average waiting time in minutes (None if no order has both timestamps)."""
+        return self._snapshot(OutletAggregates.average_waiting_minutes)
+
+    def daily_sales(self) -> Dict[str, List[Tuple[date, float]]]:
+        """Outlet -> [(day, sales)] sorted by day."""
+        return self._snapshot(OutletAggregates.daily_sales)
+
+    def most_sold_items(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        """Outlet -> (Menu ID, count) of its most ordered item."""
+        return self._snapshot(OutletAggregates.most_sold_item)
+
+
+aggregate_engine = AggregateEngine()
@@ -0,0 +1,128 @@
+import copy
+from typing import Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+
+class LSHIndex:
+    """
+    Random-hyperplane LSH over the standard-scaled user rows, for cosine
+    neighbor search that does not scan every user.
+
+    Each of ``n_tables`` tables hashes a user to the signs of ``n_bits``
+    random projections of their scaled row; users with the same code share a
+    bucket. A query gathers the users in its buckets (at most
+    ``max_candidates`` in total) and ranks them by exact similarity, so the
+    cost per query depends on the bucket sizes instead of the number of
+    users. With ``multi_probe`` the buckets one bit flip away are searched
+    too, which raises recall without adding tables. More tables raise
+    recall, more bits make buckets smaller and queries faster, and
+    ``max_candidates`` bounds the worst case. By default ``n_bits`` is chosen
+    so that an average query gathers about max_candidates users.
+    """
+
+    def __init__(self, n_tables: int = 8, n_bits: Optional[int] = None, max_candidates: int = 4000,
+                 multi_probe: bool = True, seed: int = 0):
+        if n_bits is not None and not 1 <= n_bits <= 62:
+            raise ValueError("n_bits must be between 1 and 62")
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.max_candidates = max_candidates
+        self.multi_probe = multi_probe
+        self.seed = seed
+        self.codes = np.zeros((0, n_tables), dtype=np.int64)
+        self._orders = []
+        self._sorted_codes = []
+
+    def build(self, matrix: sp.csr_matrix, mean: np.ndarray, scale: np.ndarray, block: int = 65536) -> "LSHIndex":
+        """Hash every row of ``matrix`` after scaling it with (x - mean) / scale."""
+        if self.n_bits is None:
+            self.n_bits = self._auto_bits(matrix.shape[0])
+        rng = np.random.default_rng(self.seed)
+        planes = rng.standard_normal((matrix.shape[1], self.n_tables * self.n_bits))
+        # (x - mean) / scale . p  ==  x . (p / scale) - (mean / scale) . p, so the rows stay sparse
+        self._weights = planes / scale[:, None]
+        self._shift = (mean / scale) @ planes
+        self._bit_values = 1 << np.arange(self.n_bits, dtype=np.int64)
+
+        codes = np.empty((matrix.shape[0], self.n_tables), dtype=np.int64)
+        for start in range(0, matrix.shape[0], block):
+            codes[start:start + block] = self._hash(matrix[start:start + block])
+        self._set_codes(codes)
+        return self
+
+    def update(self, matrix: sp.csr_matrix, rows: np.ndarray) -> "LSHIndex":
+        """
+        A copy of the index with ``rows`` of ``matrix`` hashed again, for rows
+        that changed or were appended since the build. The projections keep
+        the scaling statistics of the build.
+        """
+        index = copy.copy(self)
+        codes = np.zeros((matrix.shape[0], self.n_tables), dtype=np.int64)
+        codes[:len(self.codes)] = self.codes
+        if len(rows):
+            codes[rows] = self._hash(matrix[rows])
+        index._set_codes(codes)
+        return index
+
+    def _set_codes(self, codes: np.ndarray) -> None:
+        self.codes = codes
+        self._orders = [np.argsort(codes[:, t], kind="stable") for t in range(self.n_tables)]
+        self._sorted_codes = [codes[order, t] for t, order in enumerate(self._orders)]
+
+    def _auto_bits(self, n_users: int) -> int:
+        """Bits per code for which the expected number of gathered users is closest to max_candidates."""
+        def expected(bits):
+            buckets = bits + 1 if self.multi_probe else 1
+            return n_users / 2 ** bits * buckets * self.n_tables
+        return min(range(1, 63), key=lambda bits: abs(np.log(expected(bits) / self.max_candidates)))
+
+    def _hash(self, rows: sp.csr_matrix) -> np.ndarray:
+        projections = rows @ self._weights - self._shift
+        bits = (projections > 0).reshape(rows.shape[0], self.n_tables, self.n_bits)
+        return bits.astype(np.int64) @ self._bit_values
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    def candidates(self, row: int) -> np.ndarray:
+        """Users sharing at least one bucket with ``row`` (excluding it), at most max_candidates."""
+        probes = (self.n_bits + 1) if self.multi_probe else 1
+        per_bucket = max(1, self.max_candidates // (self.n_tables * probes))
+        found = []
+        for t in range(self.n_tables):
+            code = self.codes[row, t]
+            codes = np.concatenate([[code], code ^ self._bit_values]) if self.multi_probe else np.array([code])
+            lo = np.searchsorted(self._sorted_codes[t], codes, side="left")
+            hi = np.minimum(np.searchsorted(self._sorted_codes[t], codes, side="right"), lo + per_bucket)
+            lengths = hi - lo
+            positions = np.repeat(lo - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            found.append(self._orders[t][positions])
+        candidates = np.unique(np.concatenate(found))
+        return candidates[candidates != row]
+
+    def query(self, recommender, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-``k`` neighbors of ``rows`` as (indices, similarities),
+        most similar first, ranked with the recommender's exact similarities.
+        Rows whose buckets hold fewer than ``k`` other users fall back to an
+        exact search.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        indices = np.zeros((len(rows), k), dtype=np.int64)
+        similarities = np.zeros((len(rows), k))
+        exact = []
+        for i, row in enumerate(rows.tolist()):
+            candidates = self.candidates(row)
+            if len(candidates) < k:
+                exact.append(i)
+                continue
+            scores = recommender.pair_similarities(row, candidates)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            indices[i], similarities[i] = candidates[top], scores[top]
+        if exact:
+            exact = np.array(exact)
+            indices[exact], similarities[exact] = recommender.exact_neighbors(rows[exact], k)
+        return indices, similarities
@@ -0,0 +1,155 @@
+"""
+Rolling-origin backtest of the sales forecast models against Data/*.csv.
+
+Every outlet's daily sales history, with 0 for days without orders, is cut
+at a series of origins; each fold forecasts the ``horizon`` calendar days
+after its origin. The feature matrices of all
+folds are gathered from one per-outlet feature matrix with a single fancy
+index, scaled in one broadcast and predicted in one batch.
+
+By default the models currently served by /forecast (the original
+artifacts, or the versions in Models/models.json) are evaluated, so two
+model versions can be compared before one is swapped in. Note that a model
+trained on the full history is then scored partly in-sample. With
+``--retrain`` each fold instead fits a fresh model on the days before its
+origin, using the same procedure as train_forecast.py.
+
+Run from the backend folder, e.g.:
+
+    python backtest_forecast.py
+    python backtest_forecast.py --horizon 14 --step 7 --retrain --json backtest.json
+"""
+import argparse
+import json
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from forecast import ModelRegistry, date_features, location_for, scaler_params
+from order_store import DATA_DIR
+from train_forecast import daily_sales, fit_model, outlet_files
+
+
+def fold_origins(n_days: int, horizon: int, min_train: int, step: int) -> np.ndarray:
+    """
+    Index of the first forecast day of every fold that has ``horizon`` days
+    of actuals after it, in a calendar-complete daily series (one entry per
+    day), so positions are calendar days.
+    """
+    return np.arange(min_train, n_days - horizon + 1, step)
+
+
+def errors(actual: np.ndarray, predicted: np.ndarray) -> Dict[str, float]:
+    """MAPE (%, over days with non-zero sales) and RMSE."""
+    nonzero = actual != 0
+    mape = float(np.mean(np.abs(actual[nonzero] - predicted[nonzero]) / np.abs(actual[nonzero])) * 100) \
+        if nonzero.any() else None
+    rmse = float(np.sqrt(np.mean((actual - predicted) ** 2)))
+    return {"mape": mape, "rmse": rmse}
+
+
+def backtest_model(model, mean: np.ndarray, scale: np.ndarray, features: np.ndarray, sales: np.ndarray,
+                   origins: np.ndarray, horizon: int) -> Dict:
+    """Score one fixed model on every fold in a single batched predict."""
+    windows = origins[:, None] + np.arange(horizon)  # folds x horizon day indices
+    X = (features[windows].reshape(-1, features.shape[1]) - mean) / scale
+    started = time.perf_counter()
+    predicted = np.asarray(model.predict(X), dtype=np.float64)
+    predict_seconds = time.perf_counter() - started
+    return {"actual": sales[windows].ravel(), "predicted": predicted,
+            "predict_seconds": predict_seconds, "rows": len(X)}
+
+
+def backtest_retrain(features: np.ndarray, sales: np.ndarray, origins: np.ndarray, horizon: int) -> Dict:
+    """Fit a model per fold on the days before its origin and score it on the next ``horizon`` days."""
+    actual, predicted, predict_seconds = [], [], 0.0
+    for origin in origins.tolist():
+        model, scaler = fit_model(features[:origin], sales[:origin])
+        mean, scale = scaler_params(scaler)
+        fold = backtest_model(model, mean, scale, features, sales, np.array([origin]), horizon)
+        actual.append(fold["actual"])
+        predicted.append(fold["predicted"])
+        predict_seconds += fold["predict_seconds"]
+    return {"actual": np.concatenate(actual), "predicted": np.concatenate(predicted),
+            "predict_seconds": predict_seconds, "rows": len(origins) * horizon}
+
+
+def backtest(outlets: Optional[List[str]] = None, data_dir: str = DATA_DIR, horizon: int = 7,
+             min_train: int = 28, step: int = 1, retrain: bool = False,
+             registry: Optional[ModelRegistry] = None) -> List[Dict]:
+    """Per-outlet MAPE/RMSE and prediction throughput over rolling origins."""
+    files = outlet_files(data_dir)
+    if outlets:
+        missing = [outlet for outlet in outlets if outlet not in files]
+        if missing:
+            raise ValueError(f"No data file for: {', '.join(missing)}")
+        files = {outlet: files[outlet] for outlet in outlets}
+    registry = registry or ModelRegistry()
+
+    results = []
+    for outlet, path in files.items():
+        location = location_for(outlet)
+        dates, sales = daily_sales(outlet, path)
+        origins = fold_origins(len(dates), horizon, min_train, step)
+        result = {"outlet": outlet, "location": location, "days": len(dates), "folds": len(origins)}
+        if len(origins) == 0:
+            result["error"] = f"{len(dates)} days of sales is too short for min_train={min_train}, horizon={horizon}"
+            results.append(result)
+            continue
+
+        features = date_features(dates)
+        if retrain:
+            result["model"] = "retrained per fold"
+            scored = backtest_retrain(features, sales, origins, horizon)
+        else:
+            try:
+                entry = registry.get(location)
+            except KeyError:
+                result["error"] = "no forecast model for this location"
+                results.append(result)
+                continue
+            result["model"] = entry.model_file
+            scored = backtest_model(entry.model, entry.mean, entry.scale, features, sales, origins, horizon)
+
+        result.update(errors(scored["actual"], scored["predicted"]))
+        result["rows"] = scored["rows"]
+        result["rows_per_second"] = scored["rows"] / scored["predict_seconds"] if scored["predict_seconds"] else None
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the sales forecast models")
+    parser.add_argument("--outlets", nargs="*", help="outlet names (default: every CSV in the data folder)")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--horizon", type=int, default=7, help="days forecast from each origin")
+    parser.add_argument("--min-train", type=int, default=28, help="days of history before the first origin")
+    parser.add_argument("--step", type=int, default=1, help="days between origins")
+    parser.add_argument("--retrain", action="store_true", help="fit a model per fold instead of using the served models")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    unknown = [outlet for outlet in args.outlets or [] if outlet not in outlet_files(args.data)]
+    if unknown:
+        parser.error(f"unknown outlet(s): {', '.join(unknown)} (data files: {', '.join(outlet_files(args.data))})")
+
+    results = backtest(args.outlets, args.data, args.horizon, args.min_train, args.step, args.retrain)
+
+    print(f"{'outlet':<16} {'folds':>6} {'MAPE %':>8} {'RMSE':>10} {'rows/s':>12}  model")
+    for result in results:
+        if "error" in result:
+            print(f"{result['outlet']:<16} ERROR {result['error']}")
+            continue
+        mape = f"{result['mape']:.2f}" if result["mape"] is not None else "-"
+        rate = f"{result['rows_per_second']:.0f}" if result["rows_per_second"] else "-"
+        print(f"{result['outlet']:<16} {result['folds']:>6} {mape:>8} {result['rmse']:>10.1f} {rate:>12}  {result['model']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"horizon": args.horizon, "min_train": args.min_train, "step": args.step,
+                       "retrain": args.retrain, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,480 @@
+"""
+Micro-benchmarks for the backend hot paths.
+
+Run from the backend folder, e.g.:
+
+    python benchmarks.py phone-lookup --lookups 200
+    python benchmarks.py accounts --users 1000000
+    python benchmarks.py forecast-load
+    python benchmarks.py recommender-fit --users 100000 1000000
+    python benchmarks.py recommend-latency --users 20000
+    python benchmarks.py ann-recall --users 200000
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+
+def timed(fn: Callable, repeat: int = 1) -> float:
+    """Average wall time of ``fn()`` in seconds over ``repeat`` calls."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def report(name: str, seconds: float, baseline: Optional[float] = None) -> None:
+    line = f"{name:<40} {seconds * 1e6:>14.2f} us"
+    if baseline:
+        line += f"   {baseline / seconds:>10.1f}x faster"
+    print(line)
+
+
+# ---------------------------------------------------------------------------
+# phone-lookup: csv scan in get_user_id_by_phone vs the phone index
+# ---------------------------------------------------------------------------
+
+def scan_user_id_by_phone(data_path: str, phone_number: str) -> Optional[int]:
+    """The original lookup: scan every CSV in Data/ row by row (debug prints removed)."""
+    for file_name in os.listdir(data_path):
+        if file_name.endswith(".csv"):
+            with open(os.path.join(data_path, file_name), 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    if row.get("Phone_Number", "").strip() == phone_number.strip():
+                        try:
+                            return int(row.get("User_ID", "").strip())
+                        except ValueError:
+                            pass
+    return None
+
+
+def bench_phone_lookup(args) -> None:
+    from order_store import OrderStore
+    from phone_index import PhoneIndex
+
+    store = OrderStore(args.data_dir)
+    index = PhoneIndex()
+    build = timed(lambda: store.add_listener(index))
+    print(f"indexed {len(index)} phones in {build * 1e3:.1f} ms (includes loading the order store)")
+
+    rng = random.Random(0)
+    phones = [p for table in store.tables().values() for p in table.phone.tolist()]
+    # Mix of hits spread over the data and misses, which are the worst case for a scan
+    queries = [rng.choice(phones) for _ in range(args.lookups)] + ["0000000000"] * max(1, args.lookups // 10)
+
+    for phone in queries[:50]:
+        assert index.user_id(phone) == scan_user_id_by_phone(store.data_dir, phone), phone
+
+    scan = timed(lambda: [scan_user_id_by_phone(store.data_dir, p) for p in queries]) / len(queries)
+    lookup = timed(lambda: [index.user_id(p) for p in queries], repeat=100) / len(queries)
+    report("csv scan per lookup", scan)
+    report("phone index per lookup", lookup, baseline=scan)
+
+
+# ---------------------------------------------------------------------------
+# accounts: linear scans of Auth/user_signup.csv vs the SQLite account store
+# ---------------------------------------------------------------------------
+
+SIGNUP_HEADERS = ['full_name', 'Phone_Number', 'email', 'location', 'password', 'confirm_password']
+
+
+def write_synthetic_signups(path: str, users: int) -> None:
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SIGNUP_HEADERS)
+        for i in range(users):
+            phone = str(7000000000 + i)
+            writer.writerow([f"User {i}", phone, f"user{i}@example.com", "Andheri", f"pw{i}", f"pw{i}"])
+
+
+def scan_login(csv_file: str, phone_number: str, password: str) -> bool:
+    """The original /login check: scan the signup CSV until the phone/password match."""
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row['Phone_Number'] == phone_number and row['password'] == password:
+                return True
+    return False
+
+
+def rewrite_update(csv_file: str, phone_number: str, location: str) -> None:
+    """The original PUT /profile path: read every row and rewrite the file via a temp file."""
+    temp_file = csv_file + ".tmp"
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        headers = reader.fieldnames
+        rows = []
+        for row in reader:
+            if row['Phone_Number'] == phone_number:
+                row['location'] = location
+            rows.append(row)
+    with open(temp_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=headers)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(temp_file, csv_file)
+
+
+def bench_accounts(args) -> None:
+    from account_store import AccountStore
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file = os.path.join(tmp, "user_signup.csv")
+        write_synthetic_signups(csv_file, args.users)
+        print(f"{args.users} users, signup CSV {os.path.getsize(csv_file) / 1e6:.1f} MB")
+
+        store = AccountStore(os.path.join(tmp, "users.db"))
+        start = time.perf_counter()
+        store.import_csv(csv_file)
+        print(f"one-shot import: {time.perf_counter() - start:.2f} s")
+
+        def random_user():
+            i = rng.randrange(args.users)
+            return str(7000000000 + i), f"pw{i}"
+
+        # Scans are slow at this size, so only a handful are timed
+        scan = timed(lambda: scan_login(csv_file, *random_user()), repeat=args.scans)
+        lookup = timed(lambda: store.check_password(*random_user()), repeat=10000)
+        report("login: csv scan", scan)
+        report("login: account store", lookup, baseline=scan)
+
+        profile = timed(lambda: store.get_profile(random_user()[0]), repeat=10000)
+        report("get profile: account store", profile, baseline=scan)
+
+        rewrite = timed(lambda: rewrite_update(csv_file, random_user()[0], "Dadar"), repeat=args.scans)
+        update = timed(lambda: store.update_profile(random_user()[0], location="Dadar"), repeat=1000)
+        report("update profile: csv rewrite", rewrite)
+        report("update profile: account store", update, baseline=rewrite)
+
+
+# ---------------------------------------------------------------------------
+# forecast-load: cold load of the forecast models, joblib pickles vs native format
+# ---------------------------------------------------------------------------
+
+def rss_bytes() -> int:
+    """Resident set size of this process (Linux)."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def cold_load(pairs) -> tuple:
+    """Runs in a fresh process: (seconds, RSS growth in bytes) to load every (model, scaler) pair."""
+    import warnings
+    warnings.filterwarnings("ignore")
+    import xgboost  # noqa: F401  imported up front, both formats need it
+    import sklearn.preprocessing  # noqa: F401
+    from forecast import ForecastModel
+
+    before = rss_bytes()
+    start = time.perf_counter()
+    models = [ForecastModel(str(i), model_file, scaler_file) for i, (model_file, scaler_file) in enumerate(pairs)]
+    seconds = time.perf_counter() - start
+    growth = rss_bytes() - before
+    assert len(models) == len(pairs)
+    return seconds, growth
+
+
+def bench_forecast_load(args) -> None:
+    import warnings
+    warnings.filterwarnings("ignore")
+    from forecast import MODEL_FILES, ForecastModel, save_native
+
+    pickled = list(MODEL_FILES.values())
+    with tempfile.TemporaryDirectory() as tmp:
+        native = []
+        for location, (model_file, scaler_file) in MODEL_FILES.items():
+            loaded = ForecastModel(location, model_file, scaler_file)
+            native.append(save_native(loaded.model, loaded.scaler, os.path.join(tmp, location)))
+
+        def size(pairs):
+            return sum(os.path.getsize(f) for pair in pairs for f in pair)
+
+        # Every run loads in a fresh process, like a booting worker
+        context = multiprocessing.get_context("spawn")
+        results = {}
+        for name, pairs in (("pickle", pickled), ("native", native)):
+            runs = []
+            for _ in range(args.runs):
+                with context.Pool(1) as pool:
+                    runs.append(pool.apply(cold_load, (pairs,)))
+            results[name] = (statistics.median(r[0] for r in runs), statistics.median(r[1] for r in runs))
+            print(f"{name:<8} files {size(pairs) / 1e3:>8.1f} KB   RSS +{results[name][1] / 1e6:>6.2f} MB")
+
+        report(f"load {len(pickled)} models: joblib pickle", results["pickle"][0])
+        report(f"load {len(native)} models: native", results["native"][0], baseline=results["pickle"][0])
+
+
+# ---------------------------------------------------------------------------
+# recommender-fit: dense crosstab + StandardScaler vs the sparse recommender
+# ---------------------------------------------------------------------------
+
+def synthetic_interactions(users: int, seed: int = 0):
+    """(User_ID, Menu ID) arrays with one entry per ordered item, shaped like Data/*.csv."""
+    rng = np.random.default_rng(seed)
+    orders = rng.poisson(3, users) + 1
+    order_users = np.repeat(np.arange(1, users + 1), orders)
+    sizes = rng.integers(1, 6, len(order_users))
+    item_users = np.repeat(order_users, sizes)
+    # Skewed popularity over the ~80 menu items
+    popularity = 1.0 / np.arange(1, 84) ** 0.8
+    items = rng.choice(np.arange(101, 184), size=len(item_users), p=popularity / popularity.sum())
+    return item_users, items
+
+
+def fit_dense(user_ids, items) -> None:
+    """The original RecommenderSystem.load_data + train_model."""
+    import pandas as pd
+    from sklearn.neighbors import NearestNeighbors
+    from sklearn.preprocessing import StandardScaler
+
+    exploded = pd.DataFrame({"User_ID": user_ids, "Order_List": items})
+    matrix = pd.crosstab(exploded["User_ID"], exploded["Order_List"]).astype(float).fillna(0)
+    scaled = pd.DataFrame(StandardScaler().fit_transform(matrix), index=matrix.index, columns=matrix.columns)
+    NearestNeighbors(n_neighbors=4, metric="cosine", algorithm="brute").fit(scaled)
+    return matrix, scaled
+
+
+def fit_sparse(user_ids, items):
+    from recommender import RecommenderSystem
+
+    recommender = RecommenderSystem()
+    recommender.fit_interactions(user_ids, items)
+    recommender.train_model()
+    return recommender
+
+
+def measure(fn, users: int) -> tuple:
+    """
+    Runs in a fresh process: (seconds, peak RSS growth in bytes) of ``fn`` on
+    ``users`` synthetic users. RSS is used rather than tracemalloc, whose
+    tracing overhead swamps the pandas path.
+    """
+    import resource
+
+    user_ids, items = synthetic_interactions(users)
+    baseline = rss_bytes()
+    start = time.perf_counter()
+    fn(user_ids, items)
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return seconds, max(peak - baseline, 0)
+
+
+def bench_recommender_fit(args) -> None:
+    context = multiprocessing.get_context("spawn")
+
+    def run(fn, users):
+        with context.Pool(1) as pool:
+            return pool.apply(measure, (fn, users))
+
+    for users in args.users:
+        print(f"{users} users, {len(synthetic_interactions(users)[1])} ordered items")
+        sparse_seconds, sparse_peak = run(fit_sparse, users)
+        dense_seconds = None
+        if users <= args.dense_max_users:
+            dense_seconds, dense_peak = run(fit_dense, users)
+            print(f"  dense:  fit {dense_seconds:8.2f} s   peak RSS +{dense_peak / 1e6:9.1f} MB")
+        else:
+            print("  dense:  skipped (--dense-max-users)")
+        print(f"  sparse: fit {sparse_seconds:8.2f} s   peak RSS +{sparse_peak / 1e6:9.1f} MB"
+              + (f"   {dense_seconds / sparse_seconds:.1f}x faster, {dense_peak / max(sparse_peak, 1):.1f}x less memory"
+                 if dense_seconds else ""))
+
+
+# ---------------------------------------------------------------------------
+# recommend-latency: per-request latency of the original pandas path vs RecommenderSystem,
+# and users/sec of the batch path
+# ---------------------------------------------------------------------------
+
+class LegacyRecommender:
+    """The original dense RecommenderSystem: crosstab, StandardScaler, brute-force kneighbors, pandas scoring."""
+
+    def __init__(self, user_ids, items):
+        import pandas as pd
+        from sklearn.neighbors import NearestNeighbors
+
+        self.df_exploded = pd.DataFrame({"User_ID": user_ids, "Order_List": items})
+        self.user_item_matrix, self.user_item_matrix_scaled = fit_dense(user_ids, items)
+        self.model = NearestNeighbors(n_neighbors=4, metric="cosine", algorithm="brute")
+        self.model.fit(self.user_item_matrix_scaled)
+
+    def get_recommendations(self, user_id: int, n_recommendations: int = 3):
+        import pandas as pd
+
+        user_idx = self.user_item_matrix_scaled.index.get_loc(user_id)
+        distances, indices = self.model.kneighbors(
+            self.user_item_matrix_scaled.iloc[user_idx:user_idx + 1], n_neighbors=n_recommendations + 1)
+        similarity_scores = 1 - distances.flatten()[1:]
+        similar_user_indices = indices.flatten()[1:]
+        user_items = set(self.df_exploded[self.df_exploded["User_ID"] == user_id]["Order_List"].tolist())
+        weighted_rec = pd.DataFrame(0, index=self.user_item_matrix.columns, columns=["score"])
+        for idx, score in zip(similar_user_indices, similarity_scores):
+            weighted_rec["score"] += self.user_item_matrix.iloc[idx] * score
+        recommendations = weighted_rec.sort_values("score", ascending=False)
+        recommendations = recommendations[~recommendations.index.isin(user_items)]
+        top_n = recommendations.head(n_recommendations)
+        return top_n.index.tolist(), top_n["score"].tolist()
+
+
+def latencies(fn, queries) -> np.ndarray:
+    """Wall time of ``fn(query)`` for every query, in seconds."""
+    times = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        fn(query)
+        times[i] = time.perf_counter() - start
+    return times
+
+
+def report_latency(name: str, times: np.ndarray, baseline: Optional[np.ndarray] = None) -> None:
+    p50, p99 = np.percentile(times, [50, 99])
+    line = f"{name:<40} p50 {p50 * 1e6:>10.1f} us   p99 {p99 * 1e6:>10.1f} us"
+    if baseline is not None:
+        line += f"   {np.percentile(baseline, 50) / p50:>8.1f}x faster (p50)"
+    print(line)
+
+
+def interactions_from_data(data_dir: str):
+    from order_store import OrderStore
+
+    tables = OrderStore(data_dir).tables()
+    return (np.concatenate([table.item_users() for table in tables.values()]),
+            np.concatenate([table.items for table in tables.values()]))
+
+
+def bench_recommend_latency(args) -> None:
+    from recommender import RecommenderSystem
+
+    if args.users:
+        user_ids, items = synthetic_interactions(args.users)
+    else:
+        user_ids, items = interactions_from_data(args.data_dir)
+    recommender = RecommenderSystem()
+    recommender.fit_interactions(user_ids, items)
+    recommender.train_model()
+    rng = np.random.default_rng(0)
+    queries = rng.choice(recommender.user_ids, args.queries).tolist()
+    print(f"{len(recommender.user_ids)} users, {len(queries)} requests of {args.n} recommendations")
+
+    legacy_times = None
+    if len(recommender.user_ids) <= args.legacy_max_users:
+        legacy = LegacyRecommender(user_ids, items)
+        legacy_times = latencies(lambda user: legacy.get_recommendations(user, args.n), queries)
+        report_latency("original: kneighbors + pandas", legacy_times)
+
+    # Let the background build finish first, so it cannot install the table
+    # (or compete for the CPU) during the live pass
+    table = recommender.wait_for_neighbor_table()
+    recommender.neighbor_table = None
+    live_times = latencies(lambda user: recommender.get_recommendations(user, args.n), queries)
+    report_latency("sparse: live search + numpy scoring", live_times, legacy_times)
+    recommender.neighbor_table = table
+    table_times = latencies(lambda user: recommender.get_recommendations(user, args.n), queries)
+    report_latency("sparse: neighbor table + numpy scoring", table_times, legacy_times)
+    item_times = latencies(lambda user: recommender.get_recommendations(user, args.n, "item"), queries)
+    report_latency("item engine: co-occurrence neighbors", item_times, legacy_times)
+
+    # /recommend/batch path: blocks of users through one neighbor gather and one scoring product
+    rows = recommender.user_rows(queries * max(1, args.batch_users // len(queries)))
+    seconds = timed(lambda: [recommender.recommend_batch(rows[i:i + 2048], args.n) for i in range(0, len(rows), 2048)])
+    single = len(queries) / table_times.sum()
+    print(f"{'batch: recommend_batch':<40} {len(rows) / seconds:>10.0f} users/s   "
+          f"(one request per user: {single:.0f} users/s, {len(rows) / seconds / single:.1f}x)")
+    seconds = timed(lambda: [recommender.recommend_batch(rows[i:i + 2048], args.n, "item")
+                             for i in range(0, len(rows), 2048)])
+    print(f"{'batch: recommend_batch, item engine':<40} {len(rows) / seconds:>10.0f} users/s")
+
+
+# ---------------------------------------------------------------------------
+# ann-recall: recall@k and latency of the LSH index against exact brute force
+# ---------------------------------------------------------------------------
+
+def bench_ann_recall(args) -> None:
+    from ann_index import LSHIndex
+    from recommender import RecommenderSystem
+
+    if args.users:
+        user_ids, items = synthetic_interactions(args.users)
+    else:
+        user_ids, items = interactions_from_data(args.data_dir)
+    recommender = RecommenderSystem()
+    recommender.fit_interactions(user_ids, items)
+    recommender.train_model(table_neighbors=None)
+    rows = np.random.default_rng(0).choice(recommender.matrix.shape[0], args.queries, replace=False)
+    k = args.k
+
+    exact_times = latencies(lambda row: recommender.exact_neighbors(np.array([row]), k), rows)
+    _, exact_similarities = recommender.exact_neighbors(rows, k)
+    print(f"{recommender.matrix.shape[0]} users, {len(rows)} queries, k={k}")
+    report_latency("exact brute force", exact_times)
+
+    for n_tables in args.tables:
+        for max_candidates in args.candidates:
+            index_params = {"n_tables": n_tables, "max_candidates": max_candidates}
+            started = time.perf_counter()
+            recommender.ann = LSHIndex(**index_params).build(recommender.matrix, recommender.mean, recommender.scale)
+            build = time.perf_counter() - started
+            times = latencies(lambda row: recommender.neighbors(np.array([row]), k), rows)
+            _, similarities = recommender.neighbors(rows, k)
+            # Tie-aware recall: a returned neighbor counts if it is as similar as the exact k-th neighbor
+            recall = float(np.mean(similarities >= exact_similarities[:, -1:] - 1e-9))
+            report_latency(f"lsh tables={n_tables} bits={recommender.ann.n_bits} cand={max_candidates}", times, exact_times)
+            print(f"{'':<40} recall@{k} {recall:.3f}   build {build:.2f} s")
+            recommender.ann = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    phone = subparsers.add_parser("phone-lookup", help="Phone_Number -> User_ID: csv scan vs hash index")
+    phone.add_argument("--data-dir", default="Data")
+    phone.add_argument("--lookups", type=int, default=200)
+    phone.set_defaults(func=bench_phone_lookup)
+
+    accounts = subparsers.add_parser("accounts", help="Login/profile: signup CSV scans vs SQLite account store")
+    accounts.add_argument("--users", type=int, default=1000000)
+    accounts.add_argument("--scans", type=int, default=3, help="timed runs of the slow CSV paths")
+    accounts.set_defaults(func=bench_accounts)
+
+    forecast = subparsers.add_parser("forecast-load", help="Forecast model cold load: joblib pickles vs native format")
+    forecast.add_argument("--runs", type=int, default=5, help="fresh processes per format")
+    forecast.set_defaults(func=bench_forecast_load)
+
+    recommender = subparsers.add_parser("recommender-fit", help="Recommender fit: dense crosstab vs sparse CSR")
+    recommender.add_argument("--users", type=int, nargs="+", default=[100000, 1000000])
+    recommender.add_argument("--dense-max-users", type=int, default=1000000, help="skip the dense path above this")
+    recommender.set_defaults(func=bench_recommender_fit)
+
+    latency = subparsers.add_parser("recommend-latency", help="/recommend/ latency: original vs current; batch users/sec")
+    latency.add_argument("--users", type=int, default=0, help="synthetic users (default: the orders in --data-dir)")
+    latency.add_argument("--data-dir", default="Data")
+    latency.add_argument("--queries", type=int, default=500)
+    latency.add_argument("-n", type=int, default=5, help="recommendations per request")
+    latency.add_argument("--batch-users", type=int, default=50000, help="users scored by the batch path")
+    latency.add_argument("--legacy-max-users", type=int, default=200000, help="skip the original path above this")
+    latency.set_defaults(func=bench_recommend_latency)
+
+    ann = subparsers.add_parser("ann-recall", help="LSH neighbor search: recall@k and latency vs exact")
+    ann.add_argument("--users", type=int, default=0, help="synthetic users (default: the orders in --data-dir)")
+    ann.add_argument("--data-dir", default="Data")
+    ann.add_argument("--queries", type=int, default=200)
+    ann.add_argument("-k", type=int, default=10)
+    ann.add_argument("--tables", type=int, nargs="+", default=[8, 16])
+    ann.add_argument("--candidates", type=int, nargs="+", default=[1000, 4000, 16000])
+    ann.set_defaults(func=bench_ann_recall)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
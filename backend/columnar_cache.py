@@ -0,0 +1,310 @@
+import json
+import os
+import shutil
+import uuid
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+CACHE_DIR = "Cache"
+# Columns of an outlet order CSV, in file order
+ORDER_COLUMNS = ["User_ID", "Phone_Number", "User_Location", "Order_List",
+                 "Order_Placed_Time", "Order_Complete_Time", "Order_Bill"]
+CACHE_FORMAT_VERSION = 1
+META_FILE = "meta.json"
+
+# Column name in the outlet CSVs -> array file in the cache
+ARRAY_FILES = {
+    "user_id": "user_id.npy",
+    "phone": "phone.npy",
+    "location_codes": "location_codes.npy",
+    "locations": "locations.npy",
+    "items": "items.npy",
+    "offsets": "offsets.npy",
+    "placed": "placed.npy",
+    "complete": "complete.npy",
+    "bill": "bill.npy",
+}
+
+
+class OutletTable:
+    """
+    Columnar orders of a single outlet.
+
+    Order_List is stored CSR-style: the items of order ``i`` are
+    ``items[offsets[i]:offsets[i + 1]]``. User_Location is stored as int32
+    codes into ``locations`` (-1 for a missing location). Timestamps are
+    datetime64[ns] with NaT where the source value could not be parsed.
+    """
+
+    def __init__(self, user_id, phone, location_codes, locations, items, offsets, placed, complete, bill):
+        self.user_id = user_id
+        self.phone = phone
+        self.location_codes = location_codes
+        self.locations = locations
+        self.items = items
+        self.offsets = offsets
+        self.placed = placed
+        self.complete = complete
+        self.bill = bill
+        self._frame = None
+
+    def __len__(self):
+        return len(self.user_id)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in ARRAY_FILES}
+
+    def order_sizes(self) -> np.ndarray:
+        """Number of items in each order."""
+        return np.diff(self.offsets)
+
+    def item_users(self) -> np.ndarray:
+        """User_ID of every entry in ``items`` (the exploded Order_List)."""
+        return np.repeat(self.user_id, self.order_sizes())
+
+    def item_counts(self) -> Dict[int, int]:
+        """Menu ID -> number of times it was ordered."""
+        ids, counts = np.unique(self.items, return_counts=True)
+        return dict(zip(ids.tolist(), counts.tolist()))
+
+    def frame(self) -> pd.DataFrame:
+        """
+        DataFrame view of the scalar columns (everything except Order_List).
+        Built once per table and shared, so callers must not modify it.
+        """
+        if self._frame is None:
+            self._frame = pd.DataFrame({
+                "User_ID": self.user_id,
+                "Phone_Number": self.phone,
+                "User_Location": pd.Categorical.from_codes(self.location_codes, self.locations),
+                "Order_Placed_Time": self.placed,
+                "Order_Complete_Time": self.complete,
+                "Order_Bill": self.bill,
+            })
+        return self._frame
+
+
+def parse_order_lists(order_lists: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parse stringified Order_List values such as "[101, 104]" into a flat
+    int32 item array plus int64 offsets, without a Python-level eval per row.
+    """
+    stripped = order_lists.fillna("").astype(str).str.strip("[] ")
+    non_empty = stripped != ""
+    sizes = np.where(non_empty, stripped.str.count(",") + 1, 0)
+
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+
+    joined = ",".join(stripped[non_empty])
+    items = np.array(joined.split(","), dtype=np.int32) if joined else np.empty(0, dtype=np.int32)
+    return items, offsets
+
+
+def table_from_frame(df: pd.DataFrame) -> OutletTable:
+    """Build an OutletTable from a raw (string-typed) outlet order DataFrame."""
+    items, offsets = parse_order_lists(df["Order_List"])
+    locations = pd.Categorical(df["User_Location"])
+
+    return OutletTable(
+        user_id=pd.to_numeric(df["User_ID"], errors="coerce").fillna(-1).to_numpy(dtype=np.int64),
+        phone=df["Phone_Number"].fillna("").astype(str).str.strip().to_numpy(dtype=str),
+        location_codes=locations.codes.astype(np.int32),
+        locations=np.asarray(locations.categories, dtype=str),
+        items=items,
+        offsets=offsets,
+        placed=pd.to_datetime(df["Order_Placed_Time"], errors="coerce").to_numpy(dtype="datetime64[ns]"),
+        complete=pd.to_datetime(df["Order_Complete_Time"], errors="coerce").to_numpy(dtype="datetime64[ns]"),
+        bill=pd.to_numeric(df["Order_Bill"], errors="coerce").to_numpy(dtype=np.float64),
+    )
+
+
+def concat_tables(first: OutletTable, second: OutletTable) -> OutletTable:
+    """Append the orders of ``second`` after those of ``first``."""
+    locations = pd.Index(first.locations).append(pd.Index(second.locations)).unique()
+    first_codes = _remap_codes(first.location_codes, first.locations, locations)
+    second_codes = _remap_codes(second.location_codes, second.locations, locations)
+
+    return OutletTable(
+        user_id=np.concatenate([first.user_id, second.user_id]),
+        phone=np.concatenate([first.phone, second.phone]),
+        location_codes=np.concatenate([first_codes, second_codes]),
+        locations=np.asarray(locations, dtype=str),
+        items=np.concatenate([first.items, second.items]),
+        offsets=np.concatenate([first.offsets, second.offsets[1:] + first.offsets[-1]]),
+        placed=np.concatenate([first.placed, second.placed]),
+        complete=np.concatenate([first.complete, second.complete]),
+        bill=np.concatenate([first.bill, second.bill]),
+    )
+
+
+class TableBuilder:
+    """
+    An outlet table that grows by appended batches.
+
+    The columns live in buffers with spare capacity that double when full,
+    so an append copies only the batch (amortized), where ``concat_tables``
+    copies the whole table every time. Each append returns an OutletTable
+    of views over the filled part; later appends only write past it or into
+    new buffers, so tables handed out earlier stay valid.
+    """
+
+    def __init__(self, table: OutletTable):
+        self.table = table
+        self._buffers = {name: array for name, array in table.arrays().items() if name != "locations"}
+        self._locations = pd.Index(table.locations)
+
+    @staticmethod
+    def _extend(buffer: np.ndarray, used: int, values: np.ndarray) -> np.ndarray:
+        """Write ``values`` after the first ``used`` entries, moving to a buffer twice the size when they do not fit."""
+        dtype = np.result_type(buffer, values)
+        if used + len(values) > len(buffer) or dtype != buffer.dtype:
+            grown = np.empty(max(2 * len(buffer), used + len(values)), dtype=dtype)
+            grown[:used] = buffer[:used]
+            buffer = grown
+        buffer[used:used + len(values)] = values
+        return buffer
+
+    def append(self, batch: OutletTable) -> OutletTable:
+        """The current table followed by the orders of ``batch``."""
+        table = self.table
+        rows, n_items = len(table), len(table.items)
+        # New locations are added after the existing ones, so existing codes stay valid
+        locations = self._locations.append(pd.Index(batch.locations)).unique()
+        columns = {
+            "user_id": batch.user_id,
+            "phone": batch.phone,
+            "location_codes": _remap_codes(batch.location_codes, batch.locations, locations),
+            "placed": batch.placed,
+            "complete": batch.complete,
+            "bill": batch.bill,
+        }
+        for name, values in columns.items():
+            self._buffers[name] = self._extend(self._buffers[name], rows, values)
+        self._buffers["items"] = self._extend(self._buffers["items"], n_items, batch.items)
+        self._buffers["offsets"] = self._extend(self._buffers["offsets"], rows + 1,
+                                                batch.offsets[1:] + table.offsets[-1])
+        self._locations = locations
+
+        total = rows + len(batch)
+        lengths = {"items": n_items + len(batch.items), "offsets": total + 1}
+        arrays = {name: buffer[:lengths.get(name, total)] for name, buffer in self._buffers.items()}
+        arrays["locations"] = np.asarray(locations, dtype=str)
+        self.table = OutletTable(**arrays)
+        return self.table
+
+
+def _remap_codes(codes: np.ndarray, categories: np.ndarray, new_categories: pd.Index) -> np.ndarray:
+    mapping = np.append(new_categories.get_indexer(categories), -1).astype(np.int32)
+    # Code -1 (missing) indexes the trailing -1
+    return mapping[codes]
+
+
+def read_outlet_csv(path: str) -> OutletTable:
+    """Parse one outlet CSV into an OutletTable."""
+    return table_from_frame(pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""]))
+
+
+def save_table(table: OutletTable, directory: str, source_signature: Tuple[int, int]) -> None:
+    """Write a table as .npy arrays; meta.json is written last and marks the cache as complete."""
+    os.makedirs(directory, exist_ok=True)
+    for name, file_name in ARRAY_FILES.items():
+        np.save(os.path.join(directory, file_name), getattr(table, name), allow_pickle=False)
+
+    meta = {
+        "version": CACHE_FORMAT_VERSION,
+        "rows": len(table),
+        "source_mtime_ns": source_signature[0],
+        "source_size": source_signature[1],
+    }
+    with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def load_table(directory: str) -> OutletTable:
+    """Memory-map a table written by save_table."""
+    arrays = {
+        name: np.load(os.path.join(directory, file_name), mmap_mode="r", allow_pickle=False)
+        for name, file_name in ARRAY_FILES.items()
+    }
+    return OutletTable(**arrays)
+
+
+class ColumnarCache:
+    """
+    On-disk columnar copy of the outlet CSVs, kept in the Cache folder next to Data.
+
+    Each cached outlet lives in ``<Outlet>-<mtime_ns>-<size>/``, named after
+    the signature of the CSV it was built from. A changed CSV therefore never
+    matches a stale cache entry, and entries are replaced by building a new
+    directory and renaming it into place, so readers that still have the old
+    arrays memory-mapped are unaffected.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = os.path.abspath(cache_dir)
+
+    def _entry_dir(self, outlet: str, signature: Tuple[int, int]) -> str:
+        return os.path.join(self.cache_dir, f"{outlet}-{signature[0]}-{signature[1]}")
+
+    def _is_complete(self, directory: str) -> bool:
+        meta_path = os.path.join(directory, META_FILE)
+        if not os.path.exists(meta_path):
+            return False
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                return json.load(f).get("version") == CACHE_FORMAT_VERSION
+        except (OSError, ValueError):
+            return False
+
+    def _remove_stale(self, outlet: str, keep: str) -> None:
+        if not os.path.isdir(self.cache_dir):
+            return
+        for entry in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, entry)
+            if path != keep and entry.rsplit("-", 2)[0] == outlet:
+                # On Windows an entry that is still memory-mapped cannot be removed yet
+                shutil.rmtree(path, ignore_errors=True)
+
+    def get(self, outlet: str, signature: Tuple[int, int]) -> Optional[OutletTable]:
+        """Memory-mapped table for this CSV signature, or None if it is not cached."""
+        directory = self._entry_dir(outlet, signature)
+        if not self._is_complete(directory):
+            return None
+        try:
+            return load_table(directory)
+        except (OSError, ValueError) as e:
+            print(f"Error reading columnar cache {directory}: {e}")
+            return None
+
+    def put(self, outlet: str, signature: Tuple[int, int], table: OutletTable) -> None:
+        """Store a table for this CSV signature and drop older entries of the outlet."""
+        directory = self._entry_dir(outlet, signature)
+        tmp_dir = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        try:
+            save_table(table, tmp_dir, signature)
+            if os.path.isdir(directory):
+                shutil.rmtree(directory, ignore_errors=True)
+            os.replace(tmp_dir, directory)
+        except OSError as e:
+            print(f"Error writing columnar cache {directory}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        self._remove_stale(outlet, keep=directory)
+
+    def load(self, outlet: str, csv_path: str, signature: Tuple[int, int]) -> OutletTable:
+        """
+        Return the outlet's table, memory-mapped from the cache when it matches
+        the CSV signature. Otherwise parse the CSV once, write the cache and
+        memory-map the fresh entry.
+        """
+        table = self.get(outlet, signature)
+        if table is not None:
+            return table
+
+        table = read_outlet_csv(csv_path)
+        self.put(outlet, signature, table)
+        return self.get(outlet, signature) or table
@@ -0,0 +1,188 @@
+"""
+Where the analytics endpoints get their order data from.
+
+``csv`` (default) serves from the CSV files in Data/ through the in-memory
+order store and its incremental aggregates. ``mongo`` runs server-side
+aggregation pipelines against the ``Mcd`` database, one collection per
+outlet. The source is picked with the ORDER_DATA_SOURCE environment variable;
+the Mongo source connects to MONGODB_URI.
+"""
+import os
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from aggregates import AggregateEngine
+from order_store import MENU_FILE, OrderStore, clean_collection_name, outlet_name
+
+
+class OrderDataSource(ABC):
+    """Per-outlet metrics behind /get_total_sales/, /get_waiting, /process-data and /most_sold_items."""
+
+    @abstractmethod
+    def sales_totals(self) -> Dict[str, Tuple[float, int]]:
+        """Outlet -> (total sales, number of orders)."""
+
+    @abstractmethod
+    def waiting_times(self) -> Dict[str, Optional[float]]:
+        """Outlet -> average waiting time in minutes (None if no order has both timestamps)."""
+
+    @abstractmethod
+    def daily_sales(self) -> Dict[str, List[Tuple[date, float]]]:
+        """Outlet -> [(day, sales)] sorted by day."""
+
+    @abstractmethod
+    def most_sold_items(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        """Outlet -> (Menu ID, count) of its most ordered item."""
+
+    def close(self) -> None:
+        pass
+
+
+class CsvDirectorySource(OrderDataSource):
+    """Orders from Data/*.csv, served from the aggregates the order store keeps up to date."""
+
+    def __init__(self, store: OrderStore, aggregates: AggregateEngine):
+        self.store = store
+        self.aggregates = aggregates
+
+    def _in_listing_order(self, metrics: Dict) -> Dict:
+        """``metrics`` ordered like the files in the Data directory listing, as the endpoints always were."""
+        try:
+            names = [outlet_name(file_name) for file_name in os.listdir(self.store.data_dir)]
+        except OSError:
+            return metrics
+        return {outlet: metrics[outlet] for outlet in names if outlet in metrics}
+
+    def sales_totals(self):
+        # Picks up outlet files that changed on disk; the aggregates are updated by the store
+        self.store.refresh()
+        return self._in_listing_order(self.aggregates.sales_totals())
+
+    def waiting_times(self):
+        self.store.refresh()
+        return self._in_listing_order(self.aggregates.waiting_times())
+
+    def daily_sales(self):
+        self.store.refresh()
+        return self._in_listing_order(self.aggregates.daily_sales())
+
+    def most_sold_items(self):
+        self.store.refresh()
+        return self._in_listing_order(self.aggregates.most_sold_items())
+
+
+# Order_List is either an array of Menu IDs or, for data imported from the
+# CSVs, a string such as "[101, 104]"; both become an array of ints.
+ORDER_ITEMS = {
+    "$cond": [
+        {"$isArray": "$Order_List"},
+        "$Order_List",
+        {"$map": {
+            "input": {"$split": [{"$trim": {"input": {"$ifNull": ["$Order_List", ""]}, "chars": "[] "}}, ","]},
+            "as": "item",
+            "in": {"$convert": {"input": {"$trim": {"input": "$$item"}}, "to": "int", "onError": None, "onNull": None}},
+        }},
+    ]
+}
+
+SALES_PIPELINE = [
+    {"$project": {"_id": 0, "Order_Bill": 1}},
+    {"$group": {"_id": None, "total_sales": {"$sum": "$Order_Bill"}, "total_orders": {"$sum": 1}}},
+]
+
+WAITING_PIPELINE = [
+    {"$match": {"Order_Placed_Time": {"$type": "date"}, "Order_Complete_Time": {"$type": "date"}}},
+    {"$project": {"_id": 0, "minutes": {
+        "$divide": [{"$subtract": ["$Order_Complete_Time", "$Order_Placed_Time"]}, 60000]}}},
+    {"$group": {"_id": None, "avg_minutes": {"$avg": "$minutes"}}},
+]
+
+DAILY_SALES_PIPELINE = [
+    {"$match": {"Order_Placed_Time": {"$type": "date"}}},
+    {"$project": {"_id": 0, "Order_Bill": 1,
+                  "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$Order_Placed_Time"}}}},
+    {"$group": {"_id": "$day", "sales": {"$sum": "$Order_Bill"}}},
+    {"$sort": {"_id": 1}},
+]
+
+MOST_SOLD_PIPELINE = [
+    {"$project": {"_id": 0, "items": ORDER_ITEMS}},
+    {"$unwind": "$items"},
+    {"$match": {"items": {"$ne": None}}},
+    {"$group": {"_id": "$items", "count": {"$sum": 1}}},
+    # Ties go to the lowest Menu ID, as with the CSV source
+    {"$sort": {"count": -1, "_id": 1}},
+    {"$limit": 1},
+]
+
+
+class MongoDataSource(OrderDataSource):
+    """
+    Orders from the ``Mcd`` MongoDB database, one collection per outlet.
+
+    Uses a single pooled MongoClient for the life of the process. All metrics
+    are computed by aggregation pipelines on the server, each starting with a
+    projection so only the fields it needs are read, and only the aggregated
+    results cross the wire.
+    """
+
+    def __init__(self, uri: Optional[str] = None, database: str = "Mcd", client=None, max_pool_size: int = 20):
+        if client is None:
+            # pymongo is only needed when this source is used
+            from pymongo import MongoClient
+            client = MongoClient(uri, maxPoolSize=max_pool_size)
+        self.client = client
+        self.db = client[database]
+
+    def _collections(self) -> Dict[str, str]:
+        """Outlet name -> collection name."""
+        menu = os.path.splitext(MENU_FILE)[0]
+        return {
+            clean_collection_name(name): name
+            for name in sorted(self.db.list_collection_names())
+            if clean_collection_name(name).lower() != menu
+        }
+
+    def _aggregate(self, pipeline) -> Dict[str, List[Dict]]:
+        return {outlet: list(self.db[name].aggregate(pipeline)) for outlet, name in self._collections().items()}
+
+    def sales_totals(self):
+        return {
+            outlet: (float(rows[0]["total_sales"]), int(rows[0]["total_orders"])) if rows else (0.0, 0)
+            for outlet, rows in self._aggregate(SALES_PIPELINE).items()
+        }
+
+    def waiting_times(self):
+        return {
+            outlet: float(rows[0]["avg_minutes"]) if rows and rows[0]["avg_minutes"] is not None else None
+            for outlet, rows in self._aggregate(WAITING_PIPELINE).items()
+        }
+
+    def daily_sales(self):
+        return {
+            outlet: [(datetime.strptime(row["_id"], "%Y-%m-%d").date(), row["sales"]) for row in rows]
+            for outlet, rows in self._aggregate(DAILY_SALES_PIPELINE).items()
+        }
+
+    def most_sold_items(self):
+        return {
+            outlet: (int(rows[0]["_id"]), int(rows[0]["count"])) if rows else None
+            for outlet, rows in self._aggregate(MOST_SOLD_PIPELINE).items()
+        }
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def create_data_source(store: OrderStore, aggregates: AggregateEngine) -> OrderDataSource:
+    """Build the source selected by ORDER_DATA_SOURCE ("csv" or "mongo")."""
+    kind = os.getenv("ORDER_DATA_SOURCE", "csv").lower()
+    if kind == "mongo":
+        uri = os.getenv("MONGODB_URI")
+        if not uri:
+            raise RuntimeError("ORDER_DATA_SOURCE=mongo requires MONGODB_URI")
+        return MongoDataSource(uri, database=os.getenv("MONGODB_DATABASE", "Mcd"))
+    if kind != "csv":
+        raise RuntimeError(f"Unknown ORDER_DATA_SOURCE {kind!r}, expected 'csv' or 'mongo'")
+    return CsvDirectorySource(store, aggregates)
@@ -0,0 +1,260 @@
+"""
+Offline evaluation of the recommender: quality on a time split of Data/*.csv
+and fit time, memory and latency at synthetic scale.
+
+Quality: the orders are split at a point in time (by default so that the
+last 20% of orders are held out), the models are trained on the earlier
+orders and asked for ``k`` recommendations for every user who ordered
+something new (an item not in their training history) afterwards.
+precision@k, recall@k and catalog coverage are reported for each engine,
+next to a most-popular-items baseline.
+
+Scale: for each synthetic size a fresh process fits the recommender,
+builds the neighbor table (up to ``--table-max-users``; bigger models
+search live) and times single-user requests of each engine. Peak memory
+is the growth of the process' peak RSS while fitting and building the
+table.
+
+Run from the backend folder, e.g.:
+
+    python evaluate_recommender.py
+    python evaluate_recommender.py --scales 10000 100000 1000000 5000000 --json recommender-eval.json
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import subprocess
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from benchmarks import latencies, rss_bytes, synthetic_interactions
+from order_store import DATA_DIR, OrderStore
+from recommender import ENGINES, INDEX_MODES, TABLE_NEIGHBORS, RecommenderSystem
+
+
+def time_split(data_dir: str = DATA_DIR, test_fraction: float = 0.2, split: Optional[str] = None) -> Dict:
+    """
+    Exploded orders (one entry per ordered item) divided at ``split``, or at
+    the time before which 1 - ``test_fraction`` of the orders were placed.
+    Orders without a valid placed time are kept for training.
+    """
+    if split is None and not 0 < test_fraction < 1:
+        raise ValueError(f"test_fraction must be between 0 and 1 (exclusive), got {test_fraction}")
+    tables = list(OrderStore(data_dir).tables().values())
+    sizes = np.concatenate([table.order_sizes() for table in tables])
+    placed = np.concatenate([table.placed for table in tables])
+    user_ids = np.concatenate([table.item_users() for table in tables])
+    items = np.concatenate([table.items for table in tables])
+
+    timed_orders = placed[~np.isnat(placed)]
+    cutoff = np.datetime64(split) if split else np.sort(timed_orders)[int(len(timed_orders) * (1 - test_fraction))]
+    test_orders = ~np.isnat(placed) & (placed >= cutoff)
+    test = np.repeat(test_orders, sizes)
+    # Order number of every training entry, so the item engine sees real baskets
+    train_baskets = np.repeat(np.arange(int((~test_orders).sum())), sizes[~test_orders])
+    return {
+        "cutoff": str(cutoff),
+        "train_orders": int((~test_orders).sum()),
+        "test_orders": int(test_orders.sum()),
+        "train": (user_ids[~test], items[~test], train_baskets),
+        "test": (user_ids[test], items[test]),
+    }
+
+
+def held_out_items(model: RecommenderSystem, user_ids: np.ndarray, items: np.ndarray) -> Dict[int, set]:
+    """Matrix row -> Menu IDs a known user ordered in the test period but never in training."""
+    truth: Dict[int, set] = {}
+    for row, item in zip(model.user_rows(user_ids.tolist()).tolist(), items.tolist()):
+        if row >= 0:
+            truth.setdefault(row, set()).add(item)
+    for row in list(truth):
+        truth[row] -= set(model.item_ids[model.row_items(row)].tolist())
+        if not truth[row]:
+            del truth[row]
+    return truth
+
+
+def popular_batch(model: RecommenderSystem, rows: np.ndarray, k: int) -> np.ndarray:
+    """Baseline: the ``k`` most ordered items each user has not ordered yet (Menu IDs, -1 when fewer)."""
+    popularity = np.asarray(model.matrix.sum(axis=0)).ravel()
+    scores = np.tile(popularity, (len(rows), 1))
+    owned = model.matrix[rows].tocoo()
+    scores[owned.row, owned.col] = -np.inf
+    top = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return np.where(np.take_along_axis(scores, top, axis=1) > -np.inf, model.item_ids[top], -1)
+
+
+def ranking_metrics(recommended: np.ndarray, truth: List[set], n_items: int, k: int) -> Dict[str, float]:
+    """Mean precision@k and recall@k over users, and the share of the catalog recommended to anyone."""
+    hits = np.array([len(truth_items.intersection(row.tolist())) for row, truth_items in zip(recommended, truth)])
+    sizes = np.array([len(truth_items) for truth_items in truth])
+    shown = np.unique(recommended[recommended >= 0])
+    return {
+        f"precision@{k}": float(np.mean(hits / k)),
+        f"recall@{k}": float(np.mean(hits / sizes)),
+        "coverage": len(shown) / n_items if n_items else 0.0,
+    }
+
+
+def evaluate_quality(data_dir: str = DATA_DIR, k: int = 5, test_fraction: float = 0.2,
+                     split: Optional[str] = None, index: str = "exact") -> Dict:
+    """Train on the orders before the split and score every engine on the items ordered after it."""
+    data = time_split(data_dir, test_fraction, split)
+    model = RecommenderSystem(index=index)
+    started = time.perf_counter()
+    model.fit_interactions(*data["train"])
+    model.train_model()
+    model.wait_for_neighbor_table()
+    fit_seconds = time.perf_counter() - started
+
+    truth = held_out_items(model, *data["test"])
+    rows = np.array(sorted(truth), dtype=np.int64)
+    truth_items = [truth[row] for row in rows.tolist()]
+    test_users = np.unique(data["test"][0])
+    result = {
+        "cutoff": data["cutoff"],
+        "train_orders": data["train_orders"],
+        "test_orders": data["test_orders"],
+        "train_users": model.matrix.shape[0],
+        "test_users": len(test_users),
+        "evaluated_users": len(rows),
+        "cold_users": int(np.sum(model.user_rows(test_users.tolist()) < 0)),
+        "fit_seconds": fit_seconds,
+        "engines": {},
+    }
+    if not len(rows):
+        return result
+
+    n_items = len(model.item_ids)
+    for engine in ENGINES:
+        items, scores = model.recommend_batch(rows, k, engine)
+        result["engines"][engine] = ranking_metrics(np.where(scores > -np.inf, items, -1), truth_items, n_items, k)
+    result["engines"]["popular"] = ranking_metrics(popular_batch(model, rows, k), truth_items, n_items, k)
+    return result
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's peak RSS counter of this process (Linux); False if that is not possible."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def evaluate_scale(users: int, queries: int = 200, k: int = 5, index: str = "exact",
+                   table_max_users: int = 20000, seed: int = 0) -> Dict:
+    """Runs in a fresh process: fit time, peak memory and request latency on ``users`` synthetic users."""
+    user_ids, items = synthetic_interactions(users, seed)
+    baseline = rss_bytes()
+    reset_peak_rss()
+    model = RecommenderSystem(index=index)
+    started = time.perf_counter()
+    model.fit_interactions(user_ids, items)
+    model.train_model(table_neighbors=TABLE_NEIGHBORS if users <= table_max_users else None)
+    fit_seconds = time.perf_counter() - started
+    model.wait_for_neighbor_table()
+    table_seconds = time.perf_counter() - started - fit_seconds
+    peak = peak_rss_bytes()
+
+    result = {
+        "users": int(model.matrix.shape[0]),
+        "interactions": len(items),
+        "index": index,
+        "fit_seconds": fit_seconds,
+        "neighbor_table": model.neighbor_table is not None,
+        "table_seconds": table_seconds if model.neighbor_table is not None else None,
+        "peak_memory_bytes": max(peak - baseline, 0),
+        "latency": {},
+    }
+    sample = np.random.default_rng(seed).choice(model.user_ids, queries).tolist()
+    for engine in ENGINES:
+        times = latencies(lambda user: model.get_recommendations(user, k, engine), sample)
+        p50, p99 = np.percentile(times, [50, 99])
+        result["latency"][engine] = {"p50_us": p50 * 1e6, "p99_us": p99 * 1e6}
+    return result
+
+
+def fraction(value: str) -> float:
+    """argparse type for a share strictly between 0 and 1."""
+    try:
+        share = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a number: {value!r}")
+    if not 0 < share < 1:
+        raise argparse.ArgumentTypeError(f"must be between 0 and 1 (exclusive), got {value}")
+    return share
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline quality and scale evaluation of the recommender")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("-k", type=int, default=5, help="recommendations per user")
+    parser.add_argument("--test-fraction", type=fraction, default=0.2, help="share of the latest orders held out")
+    parser.add_argument("--split", help="hold out the orders placed at or after this time instead (YYYY-MM-DD)")
+    parser.add_argument("--index", choices=INDEX_MODES, default="exact")
+    parser.add_argument("--scales", type=int, nargs="*", default=[10000, 100000, 1000000],
+                        help="synthetic user counts (none to skip)")
+    parser.add_argument("--queries", type=int, default=200, help="timed requests per engine and scale")
+    parser.add_argument("--table-max-users", type=int, default=20000,
+                        help="largest scale that gets a neighbor table; bigger ones search live")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    quality = evaluate_quality(args.data, args.k, args.test_fraction, args.split, args.index)
+    print(f"Split at {quality['cutoff']}: {quality['train_orders']} train / {quality['test_orders']} test orders, "
+          f"{quality['evaluated_users']} users evaluated ({quality['cold_users']} new users skipped)")
+    print(f"{'engine':<10} {'precision@' + str(args.k):>14} {'recall@' + str(args.k):>12} {'coverage':>10}")
+    for engine, metrics in quality["engines"].items():
+        print(f"{engine:<10} {metrics[f'precision@{args.k}']:>14.4f} {metrics[f'recall@{args.k}']:>12.4f} "
+              f"{metrics['coverage']:>10.2%}")
+
+    scales = []
+    if args.scales:
+        print()
+        print(f"{'users':>10} {'fit s':>8} {'table s':>9} {'peak MB':>9}  " +
+              "  ".join(f"{engine + ' p50/p99 us':>22}" for engine in ENGINES))
+        # A fresh process per scale, so peak memory and allocator state are not shared
+        context = multiprocessing.get_context("spawn")
+        for users in args.scales:
+            with context.Pool(1) as pool:
+                result = pool.apply(evaluate_scale, (users, args.queries, args.k, args.index, args.table_max_users))
+            scales.append(result)
+            table = f"{result['table_seconds']:.2f}" if result["table_seconds"] is not None else "-"
+            print(f"{result['users']:>10} {result['fit_seconds']:>8.2f} {table:>9} "
+                  f"{result['peak_memory_bytes'] / 2 ** 20:>9.0f}  " +
+                  "  ".join(f"{result['latency'][engine]['p50_us']:>10.1f} / {result['latency'][engine]['p99_us']:>9.1f}"
+                            for engine in ENGINES))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"commit": git_commit(), "run_at": datetime.now().isoformat(timespec="seconds"),
+                       "k": args.k, "index": args.index, "quality": quality, "scales": scales}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,515 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import joblib
+import numpy as np
+
+from order_store import file_signature
+
+
+# Location -> (model file, scaler file) of the per-outlet sales forecast models
+MODEL_FILES = {
+    "andheri": ("andheri.pkl", "scaler.pkl"),
+    "dadar": ("dadar.pkl", "scaler2.pkl"),
+    "borivali": ("borivali.pkl", "scaler3.pkl"),
+    "bhayander": ("bhayander.pkl", "scaler4.pkl"),
+}
+
+# Retrained, versioned artifacts and the manifest pointing each location at its current version
+MODELS_DIR = "Models"
+MANIFEST_FILE = os.path.join(MODELS_DIR, "models.json")
+
+# Outlets whose original model key differs from the outlet file name
+OUTLET_LOCATIONS = {"Bhayandar": "bhayander"}
+
+
+def location_for(outlet: str) -> str:
+    """Forecast location key of an outlet (Data/<Outlet>.csv)."""
+    return OUTLET_LOCATIONS.get(outlet, outlet.lower())
+
+
+def read_manifest(path: str) -> Dict[str, Dict[str, str]]:
+    """Location -> {"model", "scaler", "version", ...} from a manifest file (empty if there is none)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("locations", {})
+
+
+def update_manifest(path: str, entries: Dict[str, Dict[str, str]]) -> None:
+    """Merge ``entries`` into the manifest, replacing the file atomically."""
+    locations = read_manifest(path)
+    locations.update(entries)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"locations": locations}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+# Native artifacts: the booster in xgboost's own binary (UBJSON) format and the
+# scaler as a 2 x n_features array of [mean, scale]
+NATIVE_MODEL_FILE = "model.ubj"
+NATIVE_SCALER_FILE = "scaler.npy"
+
+
+def is_native(path: str) -> bool:
+    return path.endswith((".ubj", ".json", ".npy"))
+
+
+def save_native(model, scaler, directory: str) -> Tuple[str, str]:
+    """Write a fitted XGBRegressor and StandardScaler in the native format; returns (model file, scaler file)."""
+    os.makedirs(directory, exist_ok=True)
+    model_file = os.path.join(directory, NATIVE_MODEL_FILE)
+    scaler_file = os.path.join(directory, NATIVE_SCALER_FILE)
+    model.save_model(model_file)
+    np.save(scaler_file, np.stack(scaler_params(scaler)))
+    return model_file, scaler_file
+
+
+def load_native_model(model_file: str):
+    from xgboost import XGBRegressor
+
+    model = XGBRegressor()
+    model.load_model(model_file)
+    return model
+
+
+class ForecastModel:
+    """A loaded model/scaler pair and the signatures of the files it was loaded from."""
+
+    def __init__(self, location: str, model_file: str, scaler_file: str):
+        self.location = location
+        self.model_file = model_file
+        self.scaler_file = scaler_file
+        self.signature = (file_signature(model_file), file_signature(scaler_file))
+        if is_native(model_file):
+            self.model = load_native_model(model_file)
+        else:
+            # Arrays in the pickles are memory-mapped instead of copied into the heap
+            self.model = joblib.load(model_file, mmap_mode="r")
+        if is_native(scaler_file):
+            # Only the parameters are needed to scale; no StandardScaler is rebuilt
+            self.scaler = None
+            self.mean, self.scale = np.load(scaler_file)
+        else:
+            self.scaler = joblib.load(scaler_file, mmap_mode="r")
+            self.mean, self.scale = scaler_params(self.scaler)
+
+    @property
+    def version(self) -> str:
+        """Identifies the loaded artifacts; changes whenever either file changes."""
+        (model_mtime, model_size), (scaler_mtime, scaler_size) = self.signature
+        return f"{model_mtime:x}-{model_size:x}-{scaler_mtime:x}-{scaler_size:x}"
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of the forecast models, loaded once instead of per
+    request.
+
+    ``models`` maps a location to its (model file, scaler file): the
+    original artifacts, overridden by the entries of the manifest written by
+    train_forecast.py, which is re-read whenever it changes. ``get``
+    checks the files' mtime and size and, when either changed, loads the new
+    pair and swaps it in as a whole, so a request never sees a new model with
+    an old scaler. Requests already holding the previous ForecastModel finish
+    with it. A file pair that fails to load leaves the previous model in
+    place and is not retried until its path or signature changes.
+    """
+
+    def __init__(self, models: Optional[Dict[str, Tuple[str, str]]] = None, base_dir: str = ".",
+                 manifest: Optional[str] = MANIFEST_FILE):
+        self.base_dir = os.path.abspath(base_dir)
+        self.models = dict(MODEL_FILES if models is None else models)
+        self.manifest = os.path.join(self.base_dir, manifest) if manifest else None
+        self._manifest_signature = None
+        self._lock = threading.Lock()
+        self._loaded: Dict[str, ForecastModel] = {}
+        # Location -> (model file, scaler file, signatures) that failed to load, so it is not retried per request
+        self._failed: Dict[str, tuple] = {}
+
+    def _refresh_manifest(self) -> None:
+        if self.manifest is None:
+            return
+        try:
+            signature = file_signature(self.manifest)
+        except OSError:
+            return
+        if signature == self._manifest_signature:
+            return
+        try:
+            entries = read_manifest(self.manifest)
+        except (OSError, ValueError) as e:
+            print(f"Error reading forecast model manifest: {e}")
+            return
+        with self._lock:
+            for location, entry in entries.items():
+                self.models[location] = (entry["model"], entry["scaler"])
+            self._manifest_signature = signature
+
+    def _paths(self, location: str) -> Tuple[str, str]:
+        self._refresh_manifest()
+        model_file, scaler_file = self.models[location]
+        return os.path.join(self.base_dir, model_file), os.path.join(self.base_dir, scaler_file)
+
+    def locations(self) -> List[str]:
+        self._refresh_manifest()
+        return list(self.models)
+
+    def register(self, location: str, model_file: str, scaler_file: str) -> ForecastModel:
+        """Point ``location`` at new artifact files and load them."""
+        with self._lock:
+            self.models[location] = (model_file, scaler_file)
+        return self.get(location)
+
+    def get(self, location: str) -> ForecastModel:
+        """The current model of ``location``, reloaded first if its files changed. KeyError if unknown."""
+        model_file, scaler_file = self._paths(location)
+        loaded = self._loaded.get(location)
+        try:
+            signature = (file_signature(model_file), file_signature(scaler_file))
+        except OSError as e:
+            if loaded is None:
+                raise
+            print(f"Keeping loaded {location} forecast model: {e}")
+            return loaded
+        artifacts = (model_file, scaler_file, signature)
+        if loaded is not None and (self._is_current(loaded, artifacts) or self._failed.get(location) == artifacts):
+            return loaded
+
+        with self._lock:
+            # Another request may have reloaded it (or failed to) while we waited
+            loaded = self._loaded.get(location)
+            if loaded is not None and (self._is_current(loaded, artifacts) or self._failed.get(location) == artifacts):
+                return loaded
+            try:
+                fresh = ForecastModel(location, model_file, scaler_file)
+            except Exception as e:
+                if loaded is None:
+                    raise
+                print(f"Error loading {location} forecast model {model_file}, keeping the loaded one: {e}")
+                self._failed[location] = artifacts
+                return loaded
+            self._failed.pop(location, None)
+            self._loaded[location] = fresh
+            if loaded is not None:
+                print(f"Reloaded {location} forecast model ({fresh.version})")
+            return fresh
+
+    @staticmethod
+    def _is_current(loaded: ForecastModel, artifacts: tuple) -> bool:
+        return (loaded.model_file, loaded.scaler_file, loaded.signature) == artifacts
+
+    def load_all(self) -> None:
+        """Load every registered model, e.g. at startup. Errors are logged, not raised."""
+        for location in self.locations():
+            try:
+                self.get(location)
+            except Exception as e:
+                print(f"Error loading {location} forecast model: {e}")
+
+
+# Longest forecast horizon served, in days
+MAX_HORIZON = 3660
+# Days predicted per chunk when forecasts are streamed
+CHUNK_DAYS = 90
+STREAM_FORMATS = ("ndjson", "csv")
+
+# Calendar features the forecast models were trained on, in column order
+FEATURES = ("dayofweek", "month", "year", "day", "is_weekend", "is_month_start", "is_month_end")
+
+
+def date_features(dates: np.ndarray) -> np.ndarray:
+    """(len(dates) x 7) feature matrix of datetime64[D] dates, in FEATURES order."""
+    months = dates.astype("datetime64[M]")
+    month_numbers = months.astype(np.int64)
+    day = (dates - months).astype(np.int64) + 1
+    # 1970-01-01 was a Thursday, dayofweek counts from Monday = 0
+    dayofweek = (dates.astype(np.int64) + 3) % 7
+    features = np.column_stack([
+        dayofweek,
+        month_numbers % 12 + 1,
+        month_numbers // 12 + 1970,
+        day,
+        dayofweek >= 5,
+        day == 1,
+        (dates + 1).astype("datetime64[M]") != months,
+    ]).astype(np.float64)
+    return features.reshape(len(dates), len(FEATURES))
+
+
+def calendar_features(start: date, periods: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Dates (datetime64[D]) of ``periods`` days from ``start`` and their (periods x 7) feature matrix."""
+    dates = np.arange(np.datetime64(start, "D"), np.datetime64(start, "D") + periods)
+    return dates, date_features(dates)
+
+
+def scaler_params(scaler) -> Tuple[np.ndarray, np.ndarray]:
+    """(mean, scale) of a fitted StandardScaler, so scaling is one vectorized expression."""
+    n = scaler.n_features_in_
+    mean = scaler.mean_ if scaler.with_mean and scaler.mean_ is not None else np.zeros(n)
+    scale = scaler.scale_ if scaler.with_std and scaler.scale_ is not None else np.ones(n)
+    return np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64)
+
+
+class ForecastEngine:
+    """
+    Forecasts many outlets in one pass. The calendar feature matrix is built
+    once for the date range, every outlet's scaler is applied to it in a
+    single broadcast (outlets x days x features), and the models predict in
+    parallel on a thread pool; xgboost releases the GIL while predicting.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self._pool = ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) + 4),
+                                        thread_name_prefix="forecast")
+
+    def predict(self, models: List[ForecastModel], start: date, periods: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Dates and an (outlets x periods) array of predicted daily sales."""
+        dates, features = calendar_features(start, periods)
+        if not models:
+            return dates, np.zeros((0, periods))
+        means = np.stack([model.mean for model in models])
+        scales = np.stack([model.scale for model in models])
+        scaled = (features[None, :, :] - means[:, None, :]) / scales[:, None, :]
+
+        def predict_one(i):
+            return models[i].model.predict(scaled[i])
+
+        if len(models) == 1:
+            predictions = [predict_one(0)]
+        else:
+            predictions = list(self._pool.map(predict_one, range(len(models))))
+        return dates, np.vstack(predictions)
+
+    def iter_chunks(self, models: List[ForecastModel], start: date, periods: int,
+                    chunk_days: int = CHUNK_DAYS) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """``predict`` over consecutive chunks of at most ``chunk_days`` days, so long horizons stay bounded in memory."""
+        for offset in range(0, periods, chunk_days):
+            yield self.predict(models, start + timedelta(days=offset), min(chunk_days, periods - offset))
+
+    def forecast(self, models: List[ForecastModel], start: date, periods: int = 30) -> List[Dict[str, float]]:
+        """One {date: sales} dict per model."""
+        dates, predictions = self.predict(models, start, periods)
+        labels = np.datetime_as_string(dates, unit="D").tolist()
+        return [dict(zip(labels, row)) for row in predictions.tolist()]
+
+
+def format_rows(fmt: str, locations: List[str], dates: np.ndarray, predictions: np.ndarray) -> str:
+    """
+    One chunk of forecast rows as NDJSON or CSV text, grouped by location.
+    Dates and values are formatted with vectorized NumPy string operations
+    rather than per row; NaN is written as null (NDJSON) or left empty (CSV).
+    """
+    labels = np.datetime_as_string(dates, unit="D")
+    predictions = predictions.astype(np.float64)
+    values = predictions.astype(str).astype(object)
+    # A missing (NaN or infinite) forecast is null in NDJSON and an empty CSV field
+    values[~np.isfinite(predictions)] = "null" if fmt == "ndjson" else ""
+    values = values.astype(str)
+    parts = []
+    for location, row in zip(locations, values):
+        if fmt == "ndjson":
+            lines = np.char.add(np.char.add(
+                '{"location": ' + json.dumps(location) + ', "date": "', labels),
+                np.char.add('", "forecast": ', np.char.add(row, "}\n")))
+        else:
+            lines = np.char.add(np.char.add(location + ",", labels), np.char.add(",", np.char.add(row, "\n")))
+        parts.append("".join(lines.tolist()))
+    return "".join(parts)
+
+
+def stream_forecasts(engine: ForecastEngine, models: List[ForecastModel], start: date, periods: int,
+                     fmt: str = "ndjson") -> Iterator[str]:
+    """Forecast rows of ``models`` in ``fmt``, yielded chunk by chunk as they are predicted."""
+    if fmt not in STREAM_FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, choose from {', '.join(STREAM_FORMATS)}")
+    if fmt == "csv":
+        yield "location,date,forecast\n"
+    locations = [model.location for model in models]
+    for dates, predictions in engine.iter_chunks(models, start, periods):
+        yield format_rows(fmt, locations, dates, predictions)
+
+
+def next_midnight(now: Optional[datetime] = None) -> datetime:
+    """Start of the next local day."""
+    now = now or datetime.now()
+    return datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+
+
+class ForecastCache:
+    """
+    Forecast results keyed by (location, model version, start date, horizon).
+
+    A forecast only depends on the model and the dates, so results are kept
+    until local midnight, when the default start date moves and the cache is
+    emptied. A model reload changes the version and therefore the key.
+    Concurrent misses for the same key are collapsed: the first request
+    computes, the others wait for its result. ``hits`` and ``misses`` count
+    lookups served from the cache and lookups that computed; ``coalesced``
+    counts misses that waited on another request's computation.
+    """
+
+    def __init__(self, registry: ModelRegistry, engine: Optional[ForecastEngine] = None, periods: int = 30,
+                 max_entries: int = 1024):
+        self.registry = registry
+        self.engine = engine or ForecastEngine()
+        self.periods = periods
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._day = date.today()
+        self._entries: Dict[tuple, Dict[str, float]] = {}
+        self._pending: Dict[tuple, Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._warmer: Optional[threading.Thread] = None
+
+    def _expire(self) -> date:
+        """Drop the previous day's entries; returns today. Call with the lock held."""
+        today = date.today()
+        if today != self._day:
+            self._entries.clear()
+            self._day = today
+        return today
+
+    def get(self, location: str, start: Optional[date] = None, periods: Optional[int] = None) -> Dict[str, float]:
+        """Forecast of ``location`` (KeyError if unknown); by default 30 days from tomorrow."""
+        return self.get_many([location], start, periods)[location]
+
+    def get_many(self, locations: List[str], start: Optional[date] = None,
+                 periods: Optional[int] = None) -> Dict[str, Dict[str, float]]:
+        """Forecasts of several locations; all misses are computed together in one batched pass."""
+        models = {location: self.registry.get(location) for location in locations}
+        periods = periods or self.periods
+        results, waiting, owned = {}, {}, {}
+        with self._lock:
+            today = self._expire()
+            start = start or today + timedelta(days=1)
+            for location, model in models.items():
+                key = (location, model.version, start, periods)
+                result = self._entries.get(key)
+                if result is not None:
+                    self.hits += 1
+                    results[location] = result
+                elif key in self._pending:
+                    self.coalesced += 1
+                    waiting[location] = self._pending[key]
+                else:
+                    self.misses += 1
+                    owned[location] = (key, self._pending.setdefault(key, Future()))
+
+        if owned:
+            try:
+                computed = self.engine.forecast([models[location] for location in owned], start, periods)
+            except BaseException as e:
+                with self._lock:
+                    for key, future in owned.values():
+                        self._pending.pop(key, None)
+                        future.set_exception(e)
+                raise
+            with self._lock:
+                for (key, future), result in zip(owned.values(), computed):
+                    self._pending.pop(key, None)
+                    if self._day == today:
+                        self._entries[key] = result
+                        if len(self._entries) > self.max_entries:
+                            # Custom start dates and horizons could otherwise grow it all day; drop the oldest
+                            del self._entries[next(iter(self._entries))]
+                    future.set_result(result)
+            results.update(zip(owned, computed))
+
+        for location, future in waiting.items():
+            results[location] = future.result()
+        return {location: results[location] for location in locations}
+
+    def warm(self) -> None:
+        """Compute the default forecast of every location, e.g. at startup."""
+        locations = []
+        for location in self.registry.locations():
+            try:
+                self.registry.get(location)
+                locations.append(location)
+            except Exception as e:
+                print(f"Error loading {location} forecast model: {e}")
+        try:
+            self.get_many(locations)
+        except Exception as e:
+            print(f"Error warming forecasts: {e}")
+
+    def start_warmer(self) -> None:
+        """Warm the cache now and again right after every local midnight, on a daemon thread."""
+        if self._warmer is not None:
+            return
+
+        def run():
+            while True:
+                self.warm()
+                # A little past midnight so date.today() has moved on
+                time.sleep(max((next_midnight() - datetime.now()).total_seconds(), 0) + 1)
+
+        self._warmer = threading.Thread(target=run, name="forecast-cache-warmer", daemon=True)
+        self._warmer.start()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "day": self._day.isoformat(),
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+
+
+def export_native(registry: ModelRegistry, models_dir: str = MODELS_DIR, activate: bool = False) -> Dict[str, Dict[str, str]]:
+    """
+    Convert every registered model to the native format under
+    Models/<location>/native-<version>/. With ``activate`` the registry's
+    manifest is pointed at the converted files, so the server loads those instead.
+    """
+    entries = {}
+    for location in registry.locations():
+        entry = registry.get(location)
+        if is_native(entry.model_file) and is_native(entry.scaler_file):
+            continue
+        directory = os.path.join(models_dir, location, f"native-{entry.version}")
+        scaler = entry.scaler
+        if scaler is None:
+            raise ValueError(f"{location}: cannot convert a native scaler paired with a pickled model")
+        model_file, scaler_file = save_native(entry.model, scaler, directory)
+        entries[location] = {"model": model_file, "scaler": scaler_file, "version": f"native-{entry.version}"}
+        print(f"Exported {location}: {model_file}, {scaler_file}")
+    if activate and entries:
+        if registry.manifest is None:
+            raise ValueError("The registry has no manifest to activate the converted models in")
+        # The manifest the registry (and so the server) reads, wherever the models were written
+        update_manifest(registry.manifest, entries)
+    return entries
+
+
+model_registry = ModelRegistry()
+forecast_cache = ForecastCache(model_registry)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast model maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export-native", help="convert the pickled models to xgboost's native format")
+    export.add_argument("--models-dir", default=MODELS_DIR)
+    export.add_argument("--activate", action="store_true", help="serve the converted models from now on")
+    args = parser.parse_args()
+
+    if args.command == "export-native":
+        export_native(model_registry, args.models_dir, args.activate)
+
+
+if __name__ == "__main__":
+    main()
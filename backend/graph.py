@@ -1,51 +1,44 @@
 import os
 import pandas as pd
 import networkx as nx
-import ast
 from itertools import combinations
 import matplotlib.pyplot as plt
 from networkx.algorithms import community
+from order_store import OrderStore
 
 # Directory containing CSV files
-data_folder = r"Core_ml\Models\Data"
+data_folder = "Data"
 
-# Load and merge all CSV files except 'menu.csv'
-all_data = []
-for filename in os.listdir(data_folder):
-    if filename.endswith(".csv") and filename.lower() != "menu.csv":
-        filepath = os.path.join(data_folder, filename)
-        print(f"Loading: {filename}")
-        df = pd.read_csv(filepath)
-        all_data.append(df)
+# Load all outlet CSV files except 'menu.csv' (Order_List comes pre-parsed from the columnar cache)
+tables = OrderStore(data_folder).tables()
+for outlet in tables:
+    print(f"Loading: {outlet}")
 
-# Merge all DataFrames
-if not all_data:
+if not tables:
     print("No valid CSV files found!")
     exit()
 
-df = pd.concat(all_data, ignore_index=True)
-print(f"\nTotal Orders Processed: {len(df)}")
+print(f"\nTotal Orders Processed: {sum(len(table) for table in tables.values())}")
 
 # Create an empty undirected graph
 G = nx.Graph()
 
-# Process each order in the merged DataFrame
-for idx, row in df.iterrows():
-    try:
-        menu_ids = ast.literal_eval(row["Order_List"])  # Convert string to list
-    except Exception as e:
-        print(f"Error parsing Order_List in row {idx}: {e}")
-        continue
+# Process each order of every outlet
+for table in tables.values():
+    items = table.items.tolist()
+    offsets = table.offsets.tolist()
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        menu_ids = items[start:end]
 
-    for menu_id in menu_ids:
-        G.add_node(menu_id)
+        for menu_id in menu_ids:
+            G.add_node(menu_id)
 
-    if len(menu_ids) > 1:
-        for item1, item2 in combinations(menu_ids, 2):
-            if G.has_edge(item1, item2):
-                G[item1][item2]['weight'] += 1
-            else:
-                G.add_edge(item1, item2, weight=1)
+        if len(menu_ids) > 1:
+            for item1, item2 in combinations(menu_ids, 2):
+                if G.has_edge(item1, item2):
+                    G[item1][item2]['weight'] += 1
+                else:
+                    G.add_edge(item1, item2, weight=1)
 
 ### 1. Most Frequently Ordered Pairs
 sorted_edges = sorted(G.edges(data=True), key=lambda x: x[2]['weight'], reverse=True)
@@ -0,0 +1,269 @@
+import csv
+import os
+import re
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from columnar_cache import ORDER_COLUMNS, OutletTable
+from order_store import MENU_FILE, OrderStore
+
+
+BATCH_ROWS = 20000
+MAX_REPORTED_ERRORS = 20
+# Longest accepted CSV line; an order row is a few hundred bytes
+MAX_LINE_BYTES = 64 * 1024
+# Order times must fall within this many years of the outlet's existing orders
+# (of today for a new outlet); the hourly cube spans every hour in between
+ORDER_TIME_WINDOW_YEARS = 10
+
+OUTLET_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9 _-]{0,63}$")
+ORDER_LIST = re.compile(r"^\[\s*(\d+\s*(,\s*\d+\s*)*)?\]$")
+# Order_List items are stored as int32
+MAX_MENU_ID = int(np.iinfo(np.int32).max)
+
+
+class UploadError(Exception):
+    """Raised when an upload cannot be ingested at all (bad outlet name or header)."""
+
+
+def validate_outlet_name(outlet: str) -> str:
+    outlet = outlet.strip()
+    if outlet.lower().endswith(".csv"):
+        outlet = outlet[:-4]
+    if not OUTLET_NAME.match(outlet) or f"{outlet.lower()}.csv" == MENU_FILE:
+        raise UploadError(f"Invalid outlet name: {outlet!r}")
+    return outlet
+
+
+class CsvLineBatcher:
+    """
+    Splits a byte stream into batches of complete CSV lines, holding at most
+    one batch plus one partial line in memory. The first line is the header.
+    Rows must not contain embedded newlines, which holds for the outlet exports.
+    A line longer than ``max_line_bytes`` is not kept: it is handed out as
+    None (reported by ``parse_batch``), or fails the upload if it is the header.
+    """
+
+    def __init__(self, batch_rows: int = BATCH_ROWS, max_line_bytes: int = MAX_LINE_BYTES):
+        self.batch_rows = batch_rows
+        self.max_line_bytes = max_line_bytes
+        self.header: Optional[str] = None
+        # Received pieces of the current, unfinished line
+        self._partial: List[bytes] = []
+        self._partial_bytes = 0
+        self._oversized = False
+        self._lines: List[Optional[str]] = []
+        self.line_number = 0  # data lines handed out so far
+
+    def _extend_partial(self, piece: bytes) -> None:
+        if self._oversized or not piece:
+            return
+        self._partial_bytes += len(piece)
+        if self._partial_bytes > self.max_line_bytes:
+            self._oversized = True
+            self._partial = []
+        else:
+            self._partial.append(piece)
+
+    def _end_line(self) -> None:
+        oversized, raw = self._oversized, b"".join(self._partial)
+        self._partial, self._partial_bytes, self._oversized = [], 0, False
+        if self.header is None:
+            if oversized:
+                raise UploadError(f"Header line longer than {self.max_line_bytes} bytes")
+            self.header = raw.decode("utf-8-sig").rstrip("\r")
+        elif oversized:
+            self._lines.append(None)
+        else:
+            line = raw.decode("utf-8").rstrip("\r")
+            if line.strip():
+                self._lines.append(line)
+
+    def _take_lines(self, data: bytes) -> None:
+        *complete, rest = data.split(b"\n")
+        for piece in complete:
+            self._extend_partial(piece)
+            self._end_line()
+        self._extend_partial(rest)
+
+    def _batches(self, final: bool) -> Iterator[Tuple[int, List[str]]]:
+        while len(self._lines) >= self.batch_rows or (final and self._lines):
+            lines, self._lines = self._lines[:self.batch_rows], self._lines[self.batch_rows:]
+            first_line = self.line_number
+            self.line_number += len(lines)
+            yield first_line, lines
+
+    def feed(self, data: bytes) -> Iterator[Tuple[int, List[str]]]:
+        """Add received bytes; yields (index of first line, lines) for every full batch."""
+        self._take_lines(data)
+        return self._batches(final=False)
+
+    def finish(self) -> Iterator[Tuple[int, List[str]]]:
+        """Flush the trailing partial line and the last (short) batch."""
+        if self._partial or self._oversized:
+            self._take_lines(b"\n")
+        return self._batches(final=True)
+
+
+def parse_header(header: str) -> List[str]:
+    columns = [column.strip() for column in next(csv.reader([header]))]
+    missing = [column for column in ORDER_COLUMNS if column not in columns]
+    if missing:
+        raise UploadError(f"Missing columns: {', '.join(missing)}")
+    return columns
+
+
+def parse_batch(columns: List[str], lines: List[Optional[str]], first_line: int) -> Tuple[pd.DataFrame, List[Dict]]:
+    """
+    Parse a batch of lines into string columns. Rows with the wrong number of
+    fields and lines that were too long (None) are reported instead of
+    failing the whole batch. The frame's index is each row's position in the batch.
+    """
+    rows, positions = [], []
+    # +2: 1-based line numbers and the header line
+    errors = [{"line": first_line + position + 2, "error": "line too long"}
+              for position, line in enumerate(lines) if line is None]
+    kept = [position for position, line in enumerate(lines) if line is not None]
+    parsed = csv.reader((lines[position] for position in kept), skipinitialspace=True)
+    for position, row in zip(kept, parsed):
+        if len(row) == len(columns):
+            rows.append(row)
+            positions.append(position)
+        else:
+            errors.append({"line": first_line + position + 2,
+                           "error": f"expected {len(columns)} fields, got {len(row)}"})
+    df = pd.DataFrame(rows, columns=columns, index=positions)[ORDER_COLUMNS]
+    return df.mask(df == ""), errors
+
+
+def order_time_window(table: Optional[OutletTable]) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """Earliest and latest accepted order time for an outlet with ``table`` (None: no orders yet)."""
+    placed = table.placed[~np.isnat(table.placed)] if table is not None else np.array([], dtype="datetime64[ns]")
+    if len(placed):
+        first, last = pd.Timestamp(placed.min()), pd.Timestamp(placed.max())
+    else:
+        first = last = pd.Timestamp.now().normalize()
+    years = pd.DateOffset(years=ORDER_TIME_WINDOW_YEARS)
+    return first - years, last + years
+
+
+def read_menu_ids(data_dir: str) -> Optional[Set[int]]:
+    """Menu IDs listed in ``data_dir``'s menu.csv, or None without a readable menu."""
+    try:
+        menu = pd.read_csv(os.path.join(data_dir, MENU_FILE), usecols=["Menu ID"])
+    except (OSError, ValueError) as e:
+        print(f"Upload items are only range-checked, no menu: {e}")
+        return None
+    return set(pd.to_numeric(menu["Menu ID"], errors="coerce").dropna().astype(np.int64).tolist())
+
+
+def valid_order_items(order_lists: pd.Series, menu_ids: Optional[Set[int]] = None) -> pd.Series:
+    """Per row: every Menu ID in the Order_List fits int32 and, given ``menu_ids``, is on the menu."""
+    items = order_lists.fillna("").str.findall(r"\d+").explode().dropna()
+    # More than 10 digits never fits int32, and would not even parse as int64
+    short = items.str.len() <= 10
+    ids = pd.to_numeric(items.where(short), errors="coerce")
+    ok = short & (ids <= MAX_MENU_ID)
+    if menu_ids is not None:
+        ok &= ids.isin(menu_ids)
+    return ok.groupby(level=0).all().reindex(order_lists.index, fill_value=True)
+
+
+def validate_batch(df: pd.DataFrame, first_line: int,
+                   window: Optional[Tuple[pd.Timestamp, pd.Timestamp]] = None,
+                   menu_ids: Optional[Set[int]] = None) -> Tuple[pd.DataFrame, List[Dict]]:
+    """
+    Split a parsed batch into valid rows and errors. Every row needs a whole,
+    non-negative int64 User_ID, a finite Order_Bill, a phone number, a
+    well-formed Order_List of int32 Menu IDs (on the menu, when ``menu_ids``
+    is given) and parseable order times, inside ``window`` when one is
+    given; Order_Complete_Time must not precede Order_Placed_Time.
+    """
+    placed = pd.to_datetime(df["Order_Placed_Time"], errors="coerce")
+    complete = pd.to_datetime(df["Order_Complete_Time"], errors="coerce")
+    placed_ok, complete_ok = placed.notna(), complete.notna() & ~(complete < placed)
+    if window is not None:
+        placed_ok &= placed.between(*window)
+        complete_ok &= complete.between(*window)
+    user_ids = pd.to_numeric(df["User_ID"], errors="coerce").astype(np.float64)
+    bills = pd.to_numeric(df["Order_Bill"], errors="coerce").astype(np.float64)
+    checks = {
+        # Stored as int64 with -1 for a missing User_ID, so it must be a whole number in [0, 2**63)
+        "User_ID": (user_ids >= 0) & (user_ids < 2.0 ** 63) & (user_ids == np.floor(user_ids)),
+        "Phone_Number": df["Phone_Number"].notna(),
+        "Order_List": (df["Order_List"].fillna("").str.strip().str.match(ORDER_LIST)
+                       & valid_order_items(df["Order_List"], menu_ids)),
+        "Order_Placed_Time": placed_ok,
+        "Order_Complete_Time": complete_ok,
+        "Order_Bill": pd.Series(np.isfinite(bills), index=df.index),
+    }
+
+    valid = pd.Series(True, index=df.index)
+    for ok in checks.values():
+        valid &= ok
+
+    errors = []
+    for position in (~valid).to_numpy().nonzero()[0][:MAX_REPORTED_ERRORS]:
+        bad = [column for column, ok in checks.items() if not ok.iloc[position]]
+        errors.append({"line": first_line + int(df.index[position]) + 2, "error": f"invalid {', '.join(bad)}"})
+    return df[valid], errors
+
+
+class UploadIngestor:
+    """
+    Streams one uploaded CSV into an outlet's dataset: bytes are cut into
+    bounded batches of lines, each batch is validated and appended through
+    the order store, which updates the CSV, the in-memory table and every
+    registered index/aggregate incrementally. Nothing triggers a full reload.
+    """
+
+    def __init__(self, store: OrderStore, outlet: str, batch_rows: int = BATCH_ROWS):
+        self.store = store
+        self.outlet = validate_outlet_name(outlet)
+        self.batcher = CsvLineBatcher(batch_rows)
+        self.rows_received = 0
+        self.rows_ingested = 0
+        self.errors: List[Dict] = []
+        self.rows_rejected = 0
+        self.columns: Optional[List[str]] = None
+        self.window = order_time_window(store.table(self.outlet))
+        self.menu_ids = read_menu_ids(store.data_dir)
+
+    def feed(self, data: bytes) -> None:
+        batches = self.batcher.feed(data)
+        if self.columns is None and self.batcher.header is not None:
+            # Reject a file with the wrong columns before anything is appended
+            self.columns = parse_header(self.batcher.header)
+        for first_line, lines in batches:
+            self._ingest(first_line, lines)
+
+    def finish(self) -> Dict:
+        for first_line, lines in self.batcher.finish():
+            self._ingest(first_line, lines)
+        if self.batcher.header is None:
+            raise UploadError("Empty upload")
+        if self.rows_ingested:
+            # One cache write per upload so the next cold start memory-maps the new data
+            self.store.persist_cache(self.outlet)
+        return {
+            "outlet": self.outlet,
+            "rows_received": self.rows_received,
+            "rows_ingested": self.rows_ingested,
+            "rows_rejected": self.rows_rejected,
+            "errors": self.errors,
+        }
+
+    def _ingest(self, first_line: int, lines: List[str]) -> None:
+        if self.columns is None:
+            self.columns = parse_header(self.batcher.header)
+        df, errors = parse_batch(self.columns, lines, first_line)
+        valid, invalid = validate_batch(df, first_line, self.window, self.menu_ids)
+        errors = sorted(errors + invalid, key=lambda error: error["line"])
+        self.rows_received += len(lines)
+        self.rows_rejected += len(lines) - len(valid)
+        self.errors.extend(errors[:MAX_REPORTED_ERRORS - len(self.errors)])
+        if len(valid):
+            self.store.append_rows(self.outlet, valid)
+            self.rows_ingested += len(valid)
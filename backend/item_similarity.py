@@ -0,0 +1,94 @@
+import copy
+from typing import Optional
+
+import numpy as np
+import scipy.sparse as sp
+
+
+# Normalizations of the item co-occurrence counts
+MEASURES = ("cosine", "lift")
+# Most similar items kept per item
+ITEM_NEIGHBORS = 20
+
+
+def basket_matrix(columns: np.ndarray, baskets: np.ndarray, n_items: int) -> sp.csr_matrix:
+    """
+    Binary baskets x items CSR matrix from parallel arrays with one entry per
+    ordered item: ``columns`` are item columns, ``baskets`` the basket (order)
+    each entry belongs to, numbered from 0. An item ordered twice in one
+    basket counts once.
+    """
+    n_baskets = int(baskets.max()) + 1 if len(baskets) else 0
+    matrix = sp.csr_matrix((np.ones(len(columns)), (baskets, columns)), shape=(n_baskets, n_items))
+    matrix.sum_duplicates()
+    matrix.data[:] = 1.0
+    return matrix
+
+
+class ItemSimilarity:
+    """
+    Item-item similarities from how often items are ordered together.
+
+    ``cooccurrence`` counts, for every pair of items, the baskets containing
+    both (the diagonal: the baskets containing the item). They are
+    normalized with cosine, C_ij / sqrt(C_ii * C_jj), or lift,
+    C_ij * baskets / (C_ii * C_jj), and only the ``neighbors`` most similar
+    items of each item are kept, so ``matrix`` is a sparse items x items
+    matrix whose row i holds the neighbors of item i. Adding baskets only adds
+    to the counts, so an update is a small sparse product plus renormalizing
+    a matrix the size of the menu.
+    """
+
+    def __init__(self, measure: str = "cosine", neighbors: int = ITEM_NEIGHBORS):
+        if measure not in MEASURES:
+            raise ValueError(f"Unknown measure {measure!r}, choose from {', '.join(MEASURES)}")
+        self.measure = measure
+        self.neighbors = neighbors
+        self.cooccurrence: Optional[sp.csr_matrix] = None
+        self.n_baskets = 0
+        self.matrix: Optional[sp.csr_matrix] = None
+
+    def fit(self, baskets: sp.csr_matrix) -> "ItemSimilarity":
+        self.cooccurrence = (baskets.T @ baskets).tocsr()
+        self.n_baskets = baskets.shape[0]
+        self._normalize()
+        return self
+
+    def update(self, baskets: sp.csr_matrix) -> "ItemSimilarity":
+        """A copy with more baskets counted in."""
+        similarity = copy.copy(self)
+        similarity.cooccurrence = (self.cooccurrence + baskets.T @ baskets).tocsr()
+        similarity.n_baskets = self.n_baskets + baskets.shape[0]
+        similarity._normalize()
+        return similarity
+
+    def _normalize(self) -> None:
+        counts = self.cooccurrence.diagonal()
+        pairs = self.cooccurrence.tocoo()
+        off_diagonal = pairs.row != pairs.col
+        rows, columns, together = pairs.row[off_diagonal], pairs.col[off_diagonal], pairs.data[off_diagonal]
+        if self.measure == "lift":
+            values = together * self.n_baskets / (counts[rows] * counts[columns])
+        else:
+            values = together / np.sqrt(counts[rows] * counts[columns])
+
+        # Top ``neighbors`` per row: sort by row, then best first (lower item column on ties)
+        order = np.lexsort((columns, -values, rows))
+        rows, columns, values = rows[order], columns[order], values[order]
+        starts = np.searchsorted(rows, rows, side="left")
+        keep = np.arange(len(rows)) - starts < self.neighbors
+        n_items = self.cooccurrence.shape[0]
+        self.matrix = sp.csr_matrix((values[keep], (rows[keep], columns[keep])), shape=(n_items, n_items))
+
+    def user_scores(self, columns: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """``scores`` of one user given as item columns and counts, straight from the CSR arrays."""
+        starts = self.matrix.indptr[columns]
+        lengths = self.matrix.indptr[columns + 1] - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.bincount(self.matrix.indices[positions],
+                           weights=self.matrix.data[positions] * np.repeat(counts, lengths),
+                           minlength=self.matrix.shape[1])
+
+    def scores(self, weights: sp.csr_matrix) -> np.ndarray:
+        """Dense (users x items) sums of the neighbor rows of each user's items, weighted by ``weights``."""
+        return (weights @ self.matrix).toarray()
@@ -1,31 +1,35 @@
-import ast
-from fastapi import FastAPI, APIRouter, HTTPException
+import asyncio
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.requests import Request  # Correct way to import request in FastAPI
-from fastapi.responses import JSONResponse  # Equivalent to Flas
+from fastapi.responses import JSONResponse, StreamingResponse  # Equivalent to Flas
 from fastapi.encoders import jsonable_encoder
+from fastapi.concurrency import run_in_threadpool
 from typing import Dict, List, Optional
 import pandas as pd
 import numpy as np
-from sklearn.neighbors import NearestNeighbors
-from sklearn.preprocessing import StandardScaler
-import glob
 import csv
 import secrets
 import os
 import certifi
-import ssl
 from google import genai
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from pydantic import BaseModel,EmailStr
 from fastapi.middleware.cors import CORSMiddleware
-import joblib
 from collections import Counter
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 import json
-import requests
-from collections import Counter
 from dotenv import load_dotenv
+from order_store import order_store
+from phone_index import phone_index
+from aggregates import aggregate_engine
+from time_cube import GRANULARITIES, time_cube
+from data_source import CsvDirectorySource, create_data_source
+from recommender import ENGINES, LiveRecommender
+from forecast import MAX_HORIZON, STREAM_FORMATS, forecast_cache, model_registry, stream_forecasts
+from ingest import UploadError, UploadIngestor
+from account_store import AccountExistsError, open_account_store
+from order_log import ORDER_FILE, OrderLog
 load_dotenv()
 os.environ['GOOGLE_API_KEY'] = os.getenv('GOOGLE_API_KEY')
 os.environ['SSL_CERT_FILE'] = certifi.where()
@@ -101,6 +105,13 @@ class CityRequest(BaseModel):
 
 app = FastAPI()
 
+# Orders behind the analytics endpoints: Data/*.csv (default) or MongoDB, see data_source.py
+data_source = create_data_source(order_store, aggregate_engine)
+
+@app.on_event("shutdown")
+def shutdown_data_source():
+    data_source.close()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the RetailAI Backend! 🚀"}
@@ -118,153 +129,28 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
-# Load all models and scalers
-models = {
-    "andheri": ("andheri.pkl", "scaler.pkl"),
-    "dadar": ("dadar.pkl", "scaler2.pkl"),
-    "borivali": ("borivali.pkl", "scaler3.pkl"),
-    "bhayander": ("bhayander.pkl", "scaler4.pkl"),
-}
-def generate_forecast(model_file, scaler_file):
-    """Generates a 30-day forecast using the given model and scaler."""
-    model = joblib.load(model_file)
-    scaler = joblib.load(scaler_file)
-
-    last_date = datetime.today()
-    forecast_dates = pd.date_range(start=last_date + timedelta(days=1), periods=30, freq='D')
-
-    # Generate features for prediction
-    future_features = pd.DataFrame({
-        'dayofweek': forecast_dates.dayofweek,
-        'month': forecast_dates.month,
-        'year': forecast_dates.year,
-        'day': forecast_dates.day,
-        'is_weekend': (forecast_dates.dayofweek >= 5).astype(int),
-        'is_month_start': forecast_dates.is_month_start.astype(int),
-        'is_month_end': forecast_dates.is_month_end.astype(int)
-    }, index=forecast_dates)
-
-    # Scale features and predict
-    X_future_scaled = scaler.transform(future_features)
-    predictions = model.predict(X_future_scaled)
-
-    # Format the result
-    return {date.strftime('%Y-%m-%d'): float(pred) for date, pred in zip(forecast_dates, predictions)}
-
-
-class RecommenderSystem:
-    def __init__(self):
-        self.df = None
-        self.model = None
-        self.user_item_matrix = None
-        self.scaler = StandardScaler()
-        
-    def load_data(self, data_path: str):
-        data_path = os.path.abspath("Data")  # Use absolute path
-        print(f"Looking for CSV files in: {data_path}")
-        # Load all CSV files from the directory
-        csv_files = glob.glob(os.path.join(data_path, "*.csv"))
-        print("Loading CSV files", csv_files)
-        dfs = []
-        
-        for file in csv_files:
-            df = pd.read_csv(file)
-            dfs.append(df)
-        
-        # Merge all dataframes
-        self.df = pd.concat(dfs, ignore_index=True)
-        
-        # Process Order_List column: only evaluate if the value is a string
-        self.df['Order_List'] = self.df['Order_List'].apply(lambda x: eval(x) if isinstance(x, str) else x)
-        
-        # Explode the Order_List to create user-item interactions
-        self.df_exploded = self.df.explode('Order_List')
-        
-        # Create user-item matrix for collaborative filtering
-        self.user_item_matrix = pd.crosstab(
-            self.df_exploded['User_ID'], 
-            self.df_exploded['Order_List']
-        ).astype(float)
-        
-        # Fill NaN values with 0
-        self.user_item_matrix = self.user_item_matrix.fillna(0)
-        
-        # Scale the data
-        self.user_item_matrix_scaled = pd.DataFrame(
-            self.scaler.fit_transform(self.user_item_matrix),
-            index=self.user_item_matrix.index,
-            columns=self.user_item_matrix.columns
-        )
-        
-        return self.user_item_matrix_scaled
-    
-    def train_model(self, n_neighbors=3):
-        # Initialize and train the model
-        self.model = NearestNeighbors(
-            n_neighbors=n_neighbors + 1,  # +1 because it will find the user itself
-            metric='cosine',
-            algorithm='brute'
-        )
-        self.model.fit(self.user_item_matrix_scaled)
-    
-    def get_recommendations(self, user_id: int, n_recommendations: int = 3):
-        if user_id not in self.user_item_matrix.index:
-            raise HTTPException(
-                status_code=404, 
-                detail=f"User {user_id} not found in the training data"
-            )
-        
-        # Get user's row index
-        user_idx = self.user_item_matrix_scaled.index.get_loc(user_id)
-        
-        # Find similar users
-        distances, indices = self.model.kneighbors(
-            self.user_item_matrix_scaled.iloc[user_idx:user_idx+1],
-            n_neighbors=n_recommendations + 1
-        )
-        
-        # Convert distances to similarity scores (1 - distance)
-        similarity_scores = 1 - distances.flatten()
-        
-        # Remove the user itself from recommendations
-        similar_user_indices = indices.flatten()[1:]
-        similarity_scores = similarity_scores[1:]
-        
-        # Get user's current items
-        user_items = set(self.df_exploded[self.df_exploded['User_ID'] == user_id]['Order_List'].tolist())
-        
-        # Get weighted recommendations
-        weighted_rec = pd.DataFrame(0, 
-            index=self.user_item_matrix.columns, 
-            columns=['score']
-        )
-        
-        for idx, score in zip(similar_user_indices, similarity_scores):
-            user_vector = self.user_item_matrix.iloc[idx]
-            weighted_rec['score'] += user_vector * score
-        
-        # Sort and filter recommendations
-        recommendations = weighted_rec.sort_values('score', ascending=False)
-        
-        # Filter out items the user already has
-        recommendations = recommendations[~recommendations.index.isin(user_items)]
-        
-        # Get top N recommendations
-        top_n = recommendations.head(n_recommendations)
-        
-        return top_n.index.tolist(), top_n['score'].tolist()
-
 # Initialize recommender system and a global menu mapping dictionary
-recommender = RecommenderSystem()
+# RECOMMENDER_INDEX=lsh switches neighbor search to the approximate LSH index
+# RECOMMENDER_ITEM_MEASURE (cosine or lift) normalizes the item co-occurrences of the "item" engine
+recommender = LiveRecommender(index=os.getenv("RECOMMENDER_INDEX", "exact"),
+                              item_measure=os.getenv("RECOMMENDER_ITEM_MEASURE", "cosine"))
 menu_mapping = {}
 
 @app.on_event("startup")
 async def startup_event():
     global menu_mapping
-    # Load and prepare data for the recommender
-    recommender.load_data("Core_ml/Models/Data")
-    # Train the model
-    recommender.train_model()
+    # Build the phone -> user_id index and keep it current as orders change
+    order_store.add_listener(phone_index)
+    # Running sales aggregates served by the analytics endpoints
+    order_store.add_listener(aggregate_engine)
+    # Outlet x hour cube behind /sales/rollup
+    order_store.add_listener(time_cube)
+    # Forecast models are loaded once here and reloaded when their files change
+    model_registry.load_all()
+    # Default forecasts are computed now and again right after each midnight
+    forecast_cache.start_warmer()
+    # Train the recommender; new orders are folded in as they arrive
+    recommender.start()
     data_path = os.path.abspath("Data")
     # Load the menu CSV file and create a mapping dictionary (Menu ID -> Menu Name)
     menu_csv_path = os.path.join(data_path, "menu.csv")
@@ -278,41 +164,34 @@ async def startup_event():
 class RecommendationRequest(BaseModel):
     Phone_Number: str
     num_recommendations: Optional[int] = 5
+    # "user" (similar customers) or "item" (items ordered together with the customer's items)
+    engine: Optional[str] = "user"
+class BatchRecommendationRequest(BaseModel):
+    Phone_Numbers: List[str]
+    num_recommendations: Optional[int] = 5
+    engine: Optional[str] = "user"
+# Users scored per block when streaming batch recommendations
+RECOMMEND_BATCH_USERS = 2048
 def get_user_id_by_phone(phone_number: str) -> Optional[int]:
-    """Search for the user_id based on Phone_Number in all CSV files inside the 'Data' folder."""
-    DATA_PATH = os.path.abspath("Data")
-    if not os.path.exists(DATA_PATH):
+    """Look up the user_id for a Phone_Number in the phone index built over the Data folder."""
+    if not os.path.exists(order_store.data_dir):
         raise HTTPException(status_code=500, detail="Data folder not found")
 
-    # Loop through all CSV files in the Data directory
-    for file_name in os.listdir(DATA_PATH):
-        if file_name.endswith(".csv"):
-            file_path = os.path.join(DATA_PATH, file_name)
-            print(f"Checking file: {file_path}")  # Debugging
-
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                
-                # Debug: Print detected column names
-                print(f"Columns found: {reader.fieldnames}")
-
-                for row in reader:
-                    # Debugging: Print each row being checked
-                    #print(f"Checking row: {row}")
-
-                    # Strip whitespace from phone number fields
-                    if row.get("Phone_Number", "").strip() == phone_number.strip():
-                        try:
-                            return int(row.get("User_ID", "").strip())   # Convert to int and return
-                        except ValueError:
-                            print(f"Invalid user_id format in row: {row}")  # Debugging
-
-    return None  # If not found
+    # Picks up outlet files that changed on disk; the index is updated by the store
+    order_store.refresh()
+    return phone_index.user_id(phone_number)
+def check_engine(engine: str) -> None:
+    if engine not in ENGINES:
+        raise HTTPException(status_code=400, detail=f"engine must be one of: {', '.join(ENGINES)}")
+def check_num_recommendations(num_recommendations: Optional[int]) -> None:
+    if not num_recommendations or num_recommendations < 1:
+        raise HTTPException(status_code=400, detail="num_recommendations must be at least 1")
 @app.post("/recommend/", response_model=RecommendationResponse)
 async def get_recommendations(request: RecommendationRequest):
+    check_num_recommendations(request.num_recommendations)
+    check_engine(request.engine)
     # Find user_id from phone number
     user_id = get_user_id_by_phone(request.Phone_Number)
-    print(user_id)
 
     if user_id is None or user_id == -1:
         raise HTTPException(status_code=404, detail="User not found")
@@ -320,7 +199,8 @@ async def get_recommendations(request: RecommendationRequest):
     # Fetch recommendations
     recommended_items, similarity_scores = recommender.get_recommendations(
         user_id,
-        request.num_recommendations
+        request.num_recommendations,
+        request.engine
     )
 
     # Map recommended menu IDs to menu names (Assuming menu_mapping is predefined)
@@ -339,62 +219,121 @@ async def get_recommendations(request: RecommendationRequest):
     )
 
 
-@app.get("/get_waiting")
-async def get_waiting_time():
+def stream_batch_recommendations(phone_numbers: List[str], user_ids: List[Optional[int]], n: int, engine: str):
+    """NDJSON lines, one per phone number in request order, scored in blocks of RECOMMEND_BATCH_USERS."""
+    for start in range(0, len(phone_numbers), RECOMMEND_BATCH_USERS):
+        phones = phone_numbers[start:start + RECOMMEND_BATCH_USERS]
+        users = user_ids[start:start + RECOMMEND_BATCH_USERS]
+        # One model snapshot per block, so rows stay valid if an update is swapped in meanwhile
+        model = recommender.model
+        rows = model.user_rows(users)
+        known = np.flatnonzero(rows >= 0)
+        items, scores = model.recommend_batch(rows[known], n, engine) if len(known) else (None, None)
+        position = dict(zip(known.tolist(), range(len(known))))
+
+        lines = []
+        for i, (phone, user_id) in enumerate(zip(phones, users)):
+            if i not in position:
+                lines.append(json.dumps({"Phone_Number": phone, "error": "User not found"}))
+                continue
+            j = position[i]
+            recommended = [
+                {"menu_id": menu_id, "menu_name": menu_mapping.get(menu_id, "Unknown Menu"), "similarity_score": score}
+                for menu_id, score in zip(items[j].tolist(), scores[j].tolist()) if score != float("-inf")
+            ]
+            lines.append(json.dumps({"Phone_Number": phone, "user_id": user_id, "recommended_items": recommended}))
+        yield "\n".join(lines) + "\n"
+
+@app.post("/recommend/batch")
+def get_batch_recommendations(request: BatchRecommendationRequest):
     """
-    This route iterates through each CSV file in the Data folder,
-    calculates the waiting time (difference between Order_Complete_Time and Order_Placed_Time)
-    in minutes for each order, computes the average waiting time for the file/outlet,
-    and returns a JSON response excluding any outlets that encountered errors.
+    Recommendations for many customers in one call. Phone numbers are
+    resolved in bulk and each block of users gets one batched neighbor
+    search and one scoring product. Results are streamed as NDJSON, one line
+    per phone number in request order; unknown numbers get an "error" line.
     """
-    data_path = os.path.abspath("Data")
-    csv_files = glob.glob(os.path.join(data_path, "*.csv"))
-    results = {}
+    check_num_recommendations(request.num_recommendations)
+    check_engine(request.engine)
+    if not os.path.exists(order_store.data_dir):
+        raise HTTPException(status_code=500, detail="Data folder not found")
 
-    for file in csv_files:
-        try:
-            df = pd.read_csv(file)
-            # Convert the time columns to datetime objects
-            df["Order_Placed_Time"] = pd.to_datetime(df["Order_Placed_Time"], errors='coerce')
-            df["Order_Complete_Time"] = pd.to_datetime(df["Order_Complete_Time"], errors='coerce')
+    order_store.refresh()
+    user_ids = phone_index.user_ids(request.Phone_Numbers)
+    return StreamingResponse(
+        stream_batch_recommendations(request.Phone_Numbers, user_ids, request.num_recommendations, request.engine),
+        media_type="application/x-ndjson",
+    )
 
-            # Drop any rows where conversion failed
-            df = df.dropna(subset=["Order_Placed_Time", "Order_Complete_Time"])
+@app.get("/recommend/status")
+def get_recommender_status():
+    """Size of the served recommender model and counters of its incremental updates."""
+    return recommender.stats()
 
-            # Calculate waiting time in minutes
-            df["waiting_time"] = (df["Order_Complete_Time"] - df["Order_Placed_Time"]).dt.total_seconds() / 60
+@app.get("/get_waiting")
+async def get_waiting_time():
+    """
+    Returns the average waiting time (difference between Order_Complete_Time and
+    Order_Placed_Time) in minutes for each outlet, from the order data source,
+    excluding outlets without any valid timestamps.
+    """
+    results = {}
 
-            # Compute the average waiting time for this CSV file/outlet
-            avg_waiting_time = df["waiting_time"].mean()
+    for outlet_name, avg_waiting_time in data_source.waiting_times().items():
+        # Only add valid results (ignoring outlets without timestamps)
+        if avg_waiting_time is not None:
+            results[outlet_name] = round(avg_waiting_time, 2)
 
-            # Use the file name (without extension) as the outlet name
-            outlet_name = os.path.splitext(os.path.basename(file))[0]
+    return results
 
-            # Only add valid results (ignoring NaN cases)
-            if not pd.isna(avg_waiting_time):
-                results[outlet_name] = round(avg_waiting_time, 2)
+@app.get("/forecast")
+def get_forecast(
+    location: str = None,
+    horizon: int = 30,
+    start: Optional[str] = None,
+    output_format: str = Query("json", alias="format"),
+):
+    """
+    Daily sales forecast of one location, or of all locations. `horizon` is
+    the number of days (default 30) and `start` the first date (default
+    tomorrow). With `format=ndjson` or `format=csv` the rows are streamed as
+    they are predicted, one row per location and date.
+    """
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise HTTPException(status_code=400, detail=f"horizon must be between 1 and {MAX_HORIZON} days")
+    if output_format != "json" and output_format not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Choose from: json, {', '.join(STREAM_FORMATS)}")
+    start_date = None
+    if start is not None:
+        try:
+            start_date = datetime.strptime(start, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid start date, expected YYYY-MM-DD")
 
-        except Exception as e:
-            # Ignore errors and move on to the next file
-            continue
+    if location and location not in model_registry.models:
+        return {"error": f"Invalid location. Choose from: {', '.join(model_registry.locations())}"}
+    locations = [location] if location else model_registry.locations()
 
-    return results
+    if output_format in STREAM_FORMATS:
+        models = [model_registry.get(loc) for loc in locations]
+        first_day = start_date or date.today() + timedelta(days=1)
+        media_type = "application/x-ndjson" if output_format == "ndjson" else "text/csv"
+        return StreamingResponse(stream_forecasts(forecast_cache.engine, models, first_day, horizon, output_format),
+                                 media_type=media_type)
 
-@app.get("/forecast")
-def get_forecast(location: str = None):
     if location:
         # Return forecast for a specific location
-        if location not in models:
-            return {"error": "Invalid location. Choose from: andheri, dadar, borivali, bhayander"}
-        
-        model_file, scaler_file = models[location]
-        forecast = generate_forecast(model_file, scaler_file)
+        forecast = forecast_cache.get(location, start_date, horizon)
         return {"location": location, "forecast": forecast}
 
     # If no location is provided, return forecasts for all locations
-    forecasts = {loc: generate_forecast(*files) for loc, files in models.items()}
+    forecasts = forecast_cache.get_many(locations, start_date, horizon)
     return {"forecast":forecasts}
 
+@app.get("/forecast/cache")
+def get_forecast_cache_stats():
+    """Hit/miss counters of the forecast result cache."""
+    return forecast_cache.stats()
+
 def get_lat_lon(place):
     geolocator = Nominatim(user_agent="geo_finder", timeout=10)
     try:
@@ -425,24 +364,15 @@ async def get_location():
 
 @app.get("/get_missing_locations/")
 async def get_missing_locations():
-    data_path = os.path.abspath("Data")
-    locations = []
-    
+    frames = order_store.frames()
+
     # Step 1: Get Outlet Locations
-    for file in os.listdir(data_path):
-        if file.endswith(".csv"):
-            location_name = os.path.splitext(file)[0]  # Extract location name
-            locations.append(location_name)
-    
-    # Step 2: Get User Locations from CSV Data
+    locations = list(frames)
+
+    # Step 2: Get User Locations from the order store
     user_locations = []
-    for file in os.listdir(data_path):
-        if file.endswith(".csv"):
-            location_name = os.path.splitext(file)[0]
-            if location_name == "menu":
-                continue
-            df = pd.read_csv(os.path.join(data_path, file))
-            user_locations.extend(df["User_Location"].dropna().tolist())  # Remove NaN values
+    for df in frames.values():
+        user_locations.extend(df["User_Location"].dropna().tolist())  # Remove NaN values
     
     # Step 3: Find Locations Where No Outlet Exists
     missing_locations = [loc for loc in user_locations if loc not in locations]
@@ -471,122 +401,77 @@ async def get_missing_locations():
     return location_data
 
 
+# Indexed account store; imports Auth/user_signup.csv the first time it is created
+account_store = open_account_store()
+
 @app.post("/signup")
 async def signup(user: SignupRequest):
     # Validate password confirmation
     if user.password != user.confirm_password:
         raise HTTPException(status_code=400, detail="Passwords do not match")
 
-    # Define CSV file path
-    auth_path = os.path.abspath("Auth")
-    if not os.path.exists(auth_path):
-        os.makedirs(auth_path)
-
-    csv_file = os.path.join(auth_path, "user_signup.csv")
-
-    # Debugging: Print file path to verify its location
-    print(f"CSV file path: {csv_file}")
-
-    # Check if the file exists, create headers if missing
-    file_exists = os.path.exists(csv_file)
-
     try:
-        with open(csv_file, 'a', newline='\n',encoding='utf-8') as f:
-            writer = csv.writer(f)
-
-            # If file is newly created, add headers
-            if not file_exists:
-                headers = ['full_name', 'Phone_Number', 'email', 'location', 'password', 'confirm_password']
-                writer.writerow(headers)
-
-            # Append user data
-            writer.writerow([
-                user.full_name,
-                user.Phone_Number,
-                user.email,
-                user.location,
-                user.password,
-                user.confirm_password
-            ])
-
-            f.flush()  # Force write the data to file immediately
-
+        account_store.create(
+            full_name=user.full_name,
+            phone_number=user.Phone_Number,
+            email=user.email,
+            location=user.location,
+            password=user.password
+        )
+    except AccountExistsError:
+        raise HTTPException(status_code=400, detail="Phone number is already registered")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error writing to CSV: {e}")
+        raise HTTPException(status_code=500, detail=f"Error saving user: {e}")
 
     return {"message": "User registered successfully"}
 
 @app.post("/login")
 async def login(user: LoginRequest):
     AUTH_DIR = os.path.abspath("Auth")
-    SIGNUP_FILE = os.path.join(AUTH_DIR, "user_signup.csv")
     LOGIN_FILE = os.path.join(AUTH_DIR, "user_login.csv")
-    # Check if signup file exists
-    if not os.path.exists(SIGNUP_FILE):
+    # Check if any user has signed up
+    if account_store.count() == 0:
         raise HTTPException(status_code=400, detail="No registered users found")
 
-    # Read the CSV file to check credentials
-    with open(SIGNUP_FILE, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row['Phone_Number'] == user.Phone_Number and row['password'] == user.password:
-                # Generate a random access token
-                access_token = secrets.token_hex(16)
+    # Check credentials
+    if account_store.check_password(user.Phone_Number, user.password):
+        # Generate a random access token
+        access_token = secrets.token_hex(16)
 
-                # Store the access token in user_login.csv
-                with open(LOGIN_FILE, 'a', newline='\n', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow([user.Phone_Number, access_token])
+        # Store the access token in user_login.csv
+        with open(LOGIN_FILE, 'a', newline='\n', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow([user.Phone_Number, access_token])
 
-                return {"message": "Login successful", "access_token": access_token}
+        return {"message": "Login successful", "access_token": access_token}
 
     # If no match found, return unauthorized error
     raise HTTPException(status_code=401, detail="Invalid phone number or password")
 
-# Function to get the most sold item for a given outlet CSV file
-def get_most_sold_item(file_path):
-    DATA_DIR = os.path.abspath("Data")
-    menu_file = os.path.join(DATA_DIR, "menu.csv")
-    menu_df = pd.read_csv(menu_file)  # CSV should have 'Menu ID' and 'Menu Name' columns
-    menu_mapping = dict(zip(menu_df["Menu ID"], menu_df["Menu Name"]))
-    try:
-        df = pd.read_csv(file_path)
-        all_items = []
-
-        # Extract and count item occurrences
-        for order in df["Order_List"]:
-            item_list = ast.literal_eval(order)  # Convert string list to Python list
-            all_items.extend(item_list)
-
-        item_counts = Counter(all_items)
-        most_sold_item, max_count = item_counts.most_common(1)[0]
+# Format the most sold item of an outlet
+def get_most_sold_item(most_sold):
+    if most_sold is None:
+        return {"error": "No items ordered"}
 
-        return {
-            "Most Sold Item ID": most_sold_item,
-            "Most Sold Item Name": menu_mapping.get(most_sold_item, "Unknown Item"),
-            "Count": max_count
-        }
-    except Exception as e:
-        return {"error":str(e)}
+    most_sold_item, max_count = most_sold
+    return {
+        "Most Sold Item ID": most_sold_item,
+        "Most Sold Item Name": menu_mapping.get(most_sold_item, "Unknown Item"),
+        "Count": max_count
+    }
 
 @app.get("/most_sold_items")
 def most_sold_items():
-    DATA_DIR = os.path.abspath("Data")
-    dadar_file = os.path.join(DATA_DIR, "Dadar.csv")
-    andheri_file = os.path.join(DATA_DIR, "Andheri.csv")
-    borivali_file = os.path.join(DATA_DIR, "Borivali.csv")
-    bhayandar_file = os.path.join(DATA_DIR, "Bhayandar.csv")
-    outlets = {
-        "Dadar": dadar_file,
-        "Andheri": andheri_file,
-        "Borivali": borivali_file,
-        "Bhayandar": bhayandar_file
-    }
+    outlets = ["Dadar", "Andheri", "Borivali", "Bhayandar"]
+    most_sold = data_source.most_sold_items()
 
     results = {}
 
-    for outlet, file in outlets.items():
-        results[outlet] = get_most_sold_item(file)
+    for outlet in outlets:
+        if outlet not in most_sold:
+            results[outlet] = {"error": f"No order data found for {outlet}"}
+            continue
+        results[outlet] = get_most_sold_item(most_sold[outlet])
 
     return results
 
@@ -603,140 +488,131 @@ async def sales_respond() -> List[SalesResponse]:
     Returns a list of SalesResponse objects containing filename and sales metrics.
     """
     try:
-        DATA_DIR = os.path.abspath("Data")
-        # Get list of all CSV files in the DATA directory
-        csv_files = [f for f in os.listdir(DATA_DIR) if f.endswith('.csv')]
+        totals = data_source.sales_totals()
         
-        if not csv_files:
+        if not totals:
             raise HTTPException(status_code=404, detail="No CSV files found in DATA directory")
         
         result = []
         
-        # Process each CSV file
-        for filename in csv_files:
-            file_path = os.path.join(DATA_DIR, filename)
-            try:
-                # Skip menu.csv as it doesn't contain order data
-                if filename.lower() == 'menu.csv':
-                    continue
-                    
-                # Read CSV file
-                df = pd.read_csv(file_path)
-                
-                # Check if Order_Bill column exists
-                if 'Order_Bill' not in df.columns:
-                    print(f"Warning: Order_Bill column not found in {filename}")
-                    continue
-                
-                # Calculate total sales from Order_Bill column
-                total_sales = df['Order_Bill'].sum()
-                
-                # Get additional statistics
-                order_count = len(df)
-                avg_order_value = float(total_sales) / order_count if order_count > 0 else 0
-                
-                result.append(SalesResponse(
-                    filename=filename,
-                    total_sales=float(total_sales),
-                    total_orders=order_count,
-                    average_order_value=round(avg_order_value, 2)
-                ))
-                
-            except pd.errors.EmptyDataError:
-                print(f"Warning: {filename} is empty")
-                continue
-            except Exception as e:
-                print(f"Error processing {filename}: {str(e)}")
-                continue
+        # Running totals of each outlet
+        for outlet_name, (total_sales, order_count) in totals.items():
+            avg_order_value = float(total_sales) / order_count if order_count > 0 else 0
+            
+            result.append(SalesResponse(
+                filename=f"{outlet_name}.csv",
+                total_sales=float(total_sales),
+                total_orders=order_count,
+                average_order_value=round(avg_order_value, 2)
+            ))
         
         return result
         
     except Exception as e:
         raise HTTPException(status_code=500,detail=str(e))
 
+def parse_rollup_bound(value: Optional[str], name: str, end: bool = False) -> Optional[int]:
+    """Hours since epoch for a from/to query value; a date-only `to` covers that whole day."""
+    if value is None:
+        return None
+    try:
+        stamp = pd.Timestamp(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} date: {value}")
+    hour = int(np.datetime64(stamp.floor("h").to_datetime64(), "h").astype(np.int64))
+    if end:
+        hour += 24 if len(value) <= 10 else 1
+    return hour
+
+@app.get("/sales/rollup")
+def sales_rollup(
+    outlet: Optional[str] = None,
+    granularity: str = "day",
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+):
+    """
+    Revenue, order count, item count and average waiting time per hour, day,
+    week or month, rolled up from the pre-aggregated hourly cube. Without an
+    outlet the metrics of all outlets are summed. `from` and `to` are
+    inclusive dates or datetimes.
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"Invalid granularity. Choose from: {', '.join(GRANULARITIES)}")
+
+    order_store.refresh()
+    outlets = time_cube.outlets()
+    if outlet is not None:
+        if outlet not in outlets:
+            raise HTTPException(status_code=404, detail=f"No order data found for {outlet}")
+        outlets = [outlet]
+
+    buckets = time_cube.rollup(
+        outlets,
+        granularity,
+        first_hour=parse_rollup_bound(from_, "from"),
+        end_hour=parse_rollup_bound(to, "to", end=True),
+    )
+    return {"outlet": outlet, "granularity": granularity, "buckets": buckets}
+
+@app.post("/upload/{outlet}")
+async def upload_outlet_data(outlet: str, request: Request):
+    """
+    Streams a CSV export (raw request body, same columns as Data/<Outlet>.csv)
+    into an outlet's dataset. Rows are validated and appended in bounded
+    batches as they arrive, and the indexes and aggregates are updated
+    incrementally. Invalid rows are skipped and reported.
+    """
+    try:
+        ingestor = UploadIngestor(order_store, outlet)
+        async for chunk in request.stream():
+            if chunk:
+                await run_in_threadpool(ingestor.feed, chunk)
+        return await run_in_threadpool(ingestor.finish)
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/profile/{phone_number}", response_model=UserProfile)
 
 async def get_profile(phone_number: str):
-    auth_path = os.path.abspath("Auth")
-    csv_file = os.path.join(auth_path, "user_signup.csv")
-
     try:
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
+        profile = account_store.get_profile(phone_number)
 
-            for row in reader:
-                if row['Phone_Number'] == phone_number:
-                    return {
-                        "full_name": row['full_name'],
-                        "Phone_Number": row['Phone_Number'],
-                        "email": row['email'],
-                        "location": row['location']
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error reading user data: {str(e)}"
 
-                    }
+        )
 
+    if profile is None:
         raise HTTPException(
             status_code=404,
             detail="User not found"
         )
 
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error reading user data: {str(e)}"
-
-        )
+    return profile
  
 @app.put("/profile/{phone_number}", response_model=UserProfile)
 
 async def update_profile(phone_number: str, profile_update: UpdateProfileRequest):
-    auth_path = os.path.abspath("Auth")
-    csv_file = os.path.join(auth_path, "user_signup.csv")
-    temp_file = os.path.join(auth_path, "temp_user_signup.csv")
-
     try:
-        user_found = False
-        rows = []
-        # Read existing data
-
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            headers = reader.fieldnames
-
-            for row in reader:
-                if row['Phone_Number'] == phone_number:
-                    user_found = True
-
-                    if profile_update.full_name:
-                        row['full_name'] = profile_update.full_name
-
-                    if profile_update.email:
-                        row['email'] = profile_update.email
-
-                    if profile_update.location:
-                        row['location'] = profile_update.location
-                rows.append(row)
+        # Only the fields that were provided are changed, in a single row update
+        profile = account_store.update_profile(
+            phone_number,
+            full_name=profile_update.full_name,
+            email=profile_update.email,
+            location=profile_update.location
+        )
  
-        if not user_found:
+        if profile is None:
             raise HTTPException(
                 status_code=404,
                 detail="User not found"
             )
  
-        # Write updated data
-        with open(temp_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=headers)
-            writer.writeheader()
-            writer.writerows(rows)
- 
-        # Replace original file with  file
-        os.replace(temp_file, csv_file)
         # Return updated profile
-        return {
-            "full_name": next(row['full_name'] for row in rows if row['Phone_Number'] == phone_number),
-            "Phone_Number": phone_number,
-            "email": next(row['email'] for row in rows if row['Phone_Number'] == phone_number),
-            "location": next(row['location'] for row in rows if row['Phone_Number'] == phone_number)
-        }
+        return profile
  
     except HTTPException:
         raise
@@ -749,96 +625,44 @@ async def update_profile(phone_number: str, profile_update: UpdateProfileRequest
     
 @app.get("/process-data")
 def process_data():
-    # Absolute path to the DATA directory
-    DATA_DIR = os.path.abspath("Data")
-    print(f"Looking for CSV files in: {DATA_DIR}")
-    
-    if not os.path.exists(DATA_DIR):
+    if isinstance(data_source, CsvDirectorySource) and not os.path.exists(order_store.data_dir):
         raise HTTPException(status_code=404, detail="DATA directory not found.")
 
     results = []  # List to hold the processed results
 
-    # Loop over each file in the DATA directory
-    filenames = [os.path.join(DATA_DIR, f) for f in os.listdir(DATA_DIR) if f.lower().endswith('.csv')]
-    print("Loading CSV files", filenames)
-    
-    for file_path in filenames:
-        filename = os.path.basename(file_path)
-        # Skip files whose name starts with "menu"
-        if filename.lower().startswith("menu"):
-            print(f"Skipping file: {filename}")
-            continue
-
-        try:
-            # Read CSV file into a pandas DataFrame
-            df = pd.read_csv(file_path)
-        except Exception as e:
-            print(f"Error reading {filename}: {e}")
-            continue
-
-        try:
-            # Convert Order_Placed_Time to datetime
-            df['Order_Placed_Time'] = pd.to_datetime(df['Order_Placed_Time'])
-        except Exception as e:
-            print(f"Error converting Order_Placed_Time in {filename}: {e}")
-            continue
-
-        # Sort the DataFrame by Order_Placed_Time
-        df_sorted = df.sort_values(by='Order_Placed_Time')
-
-        # Extract date from Order_Placed_Time for daily grouping
-        df_sorted['Order_Date'] = df_sorted['Order_Placed_Time'].dt.date
-
-        # Group by Order_Date and sum the Order_Bill to compute daily sales
-        daily_sales = df_sorted.groupby('Order_Date', as_index=False)['Order_Bill'].sum()
-
-        # Convert the daily sales DataFrame to a list of dictionaries
-        sales_list = daily_sales.to_dict(orient='records')
+    # Daily Order_Bill sums of each outlet
+    for outlet_name, daily_sales in data_source.daily_sales().items():
+        sales_list = [{"Order_Date": order_date, "Order_Bill": sales} for order_date, sales in daily_sales]
 
         results.append({
-            "filename": filename.split('.')[0],
+            "filename": outlet_name,
             "sales": sales_list
         })
 
     # Use jsonable_encoder to convert non-serializable types (like date) into serializable ones
     json_compatible_data = jsonable_encoder({"results": results})
     return JSONResponse(content=json_compatible_data)
+
+# Append-only order log with group commit and a per-phone index (Auth/order.csv)
+order_log = OrderLog(ORDER_FILE)
+
+@app.on_event("shutdown")
+def shutdown_order_log():
+    order_log.close()
+
 @app.post("/add_order/{phone_number}")
 async def add_order(phone_number: str, order: OrderRequest):
-    # Ensure the file is stored in the "Auth" directory
-    auth_path = os.path.abspath("Auth")  # Correct directory
-    if not os.path.exists(auth_path):
-        os.makedirs(auth_path)
- 
-    csv_file = os.path.join(auth_path, "order.csv")  # Use "Auth/order.csv"
- 
     # Generate current timestamp in ISO format
     ordered_time = datetime.utcnow().isoformat()
  
-    # Check if file exists, create headers if missing
-    file_exists = os.path.exists(csv_file)
- 
     try:
-        with open(csv_file, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
- 
-            # If file is newly created, add headers
-            if not file_exists:
-                headers = ['Phone_Number', 'name', 'quantity', 'ordered_time']
-                writer.writerow(headers)
- 
-            # Append order data
-            writer.writerow([
-                phone_number,  # Taken from URL path
-                order.burger_name,
-                order.quantity,
-                ordered_time  # Auto-generated timestamp
-            ])
- 
-            f.flush()  # Force write the data to file immediately
- 
-            # Debugging: Read back to verify
-            print(f"✅ Order added: {phone_number}, {order.burger_name}, {order.quantity}, {ordered_time}")
+        # Wait for the group commit that makes this order durable
+        await asyncio.wrap_future(order_log.append(
+            phone_number,  # Taken from URL path
+            order.burger_name,
+            order.quantity,
+            ordered_time  # Auto-generated timestamp
+        ))
  
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error writing to CSV: {e}")
@@ -849,31 +673,15 @@ async def add_order(phone_number: str, order: OrderRequest):
     }
    
  
-ORDER_FILE = "Auth/order.csv"
- 
-# Read orders from CSV
-def read_orders():
-    if not os.path.exists(ORDER_FILE):
-        return []
-   
-    orders = []
-    with open(ORDER_FILE, mode="r", newline="", encoding="utf-8") as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            orders.append(row)
-    return orders
- 
 # Get user-specific orders
 @app.get("/get_orders/{phone_number}")
 def get_orders(phone_number: str):
-    orders = read_orders()
-    user_orders = [order for order in orders if order["Phone_Number"] == phone_number]
+    user_orders = order_log.orders_for(phone_number)
  
     if not user_orders:
         raise HTTPException(status_code=404, detail="No orders found for this phone number.")
  
     return {"orders": user_orders}
-import json
 def show_json(obj):
   print(json.dumps(obj.model_dump(exclude_none=True), indent=2)) 
 # Initialize Google AI client
@@ -882,7 +690,6 @@ MODEL = 'gemini-2.0-flash-exp'
 @app.post("/analyze-location", response_model=ShopAnalysisResponse)
 async def analyze_location(request: CityRequest) -> Dict:
     try:
-        import json
         # Create prompt
         prompt = f"""The user has a fast food chain and wants to open a new outlet in a new city. 
         The name of the new outlet will be given, and you have to do the following:
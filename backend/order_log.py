@@ -0,0 +1,174 @@
+import csv
+import io
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+
+ORDER_FILE = os.path.join("Auth", "order.csv")
+ORDER_HEADERS = ['Phone_Number', 'name', 'quantity', 'ordered_time']
+
+
+def encode_row(row: List) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerow(row)
+    return buffer.getvalue().encode('utf-8')
+
+
+def decode_row(line: bytes) -> Optional[List[str]]:
+    """Parse one log line; None for lines that are not order rows (e.g. merge-conflict markers)."""
+    try:
+        row = next(csv.reader([line.decode('utf-8').rstrip('\r\n')]))
+    except (StopIteration, UnicodeDecodeError, csv.Error):
+        return None
+    if len(row) != len(ORDER_HEADERS) or not row[0]:
+        return None
+    return row
+
+
+class OrderLog:
+    """
+    Append-only order log (Auth/order.csv) with group commit.
+
+    Appends are queued and a single writer thread collects everything that
+    arrives within ``commit_window`` seconds (up to ``max_batch`` orders),
+    writes the batch with one write call and fsyncs once. Each append returns
+    a Future that resolves once its batch is durable.
+
+    An in-memory Phone_Number -> byte offsets index lets a user's orders be
+    read with one seek per order instead of scanning the file. The index is
+    rebuilt from the file when the log is opened; a torn last line left by a
+    crash mid-write is truncated away.
+    """
+
+    def __init__(self, path: str = ORDER_FILE, commit_window: float = 0.005, max_batch: int = 1024):
+        self.path = os.path.abspath(path)
+        self.commit_window = commit_window
+        self.max_batch = max_batch
+        self._index: Dict[str, List[int]] = {}
+        self._index_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._closed = False
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.recover()
+        self._append_file = open(self.path, 'ab')
+        self._read_file = open(self.path, 'rb')
+
+    def recover(self) -> None:
+        """Rebuild the phone index from the log, creating the file or trimming a torn tail first."""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            with open(self.path, 'wb') as f:
+                f.write(encode_row(ORDER_HEADERS))
+                f.flush()
+                os.fsync(f.fileno())
+
+        index: Dict[str, List[int]] = {}
+        with open(self.path, 'r+b') as f:
+            f.readline()  # header
+            offset = f.tell()
+            for line in iter(f.readline, b''):
+                row = decode_row(line)
+                if not line.endswith(b'\n'):
+                    if row is None:
+                        # Incomplete write from a crash: drop it so the next append starts on a fresh line
+                        print(f"Truncating torn order log entry at byte {offset}")
+                        f.truncate(offset)
+                        break
+                    # Complete row that just lacks the final newline (e.g. edited by hand)
+                    f.write(b'\n')
+                if row is not None:
+                    index.setdefault(row[0], []).append(offset)
+                offset += len(line)
+
+        with self._index_lock:
+            self._index = index
+
+    def append(self, phone_number: str, name: str, quantity: int, ordered_time: str) -> Future:
+        """Queue an order for the next group commit; the Future resolves once it is fsynced."""
+        if self._closed:
+            raise RuntimeError("Order log is closed")
+        future: Future = Future()
+        self._queue.put(([phone_number, name, quantity, ordered_time], future))
+        self._ensure_writer()
+        return future
+
+    def _ensure_writer(self) -> None:
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="order-log-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.commit_window
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                batch.append(entry)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch) -> None:
+        lines = [encode_row(row) for row, _ in batch]
+        try:
+            offset = self._append_file.seek(0, os.SEEK_END)
+            self._append_file.write(b''.join(lines))
+            self._append_file.flush()
+            os.fsync(self._append_file.fileno())
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        with self._index_lock:
+            for (row, _), line in zip(batch, lines):
+                self._index.setdefault(row[0], []).append(offset)
+                offset += len(line)
+        for _, future in batch:
+            future.set_result(None)
+
+    def orders_for(self, phone_number: str) -> List[Dict[str, str]]:
+        """All orders of one phone number, in the order they were placed."""
+        with self._index_lock:
+            offsets = list(self._index.get(phone_number, ()))
+
+        orders = []
+        with self._read_lock:
+            for offset in offsets:
+                self._read_file.seek(offset)
+                row = decode_row(self._read_file.readline())
+                if row is not None:
+                    orders.append(dict(zip(ORDER_HEADERS, row)))
+        return orders
+
+    def close(self) -> None:
+        """Flush pending appends and stop the writer thread."""
+        self._closed = True
+        with self._writer_lock:
+            writer = self._writer
+        if writer is not None and writer.is_alive():
+            self._queue.put(None)
+            writer.join()
+        self._append_file.close()
+        self._read_file.close()
@@ -0,0 +1,188 @@
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from columnar_cache import ORDER_COLUMNS, ColumnarCache, OutletTable, TableBuilder, table_from_frame
+
+
+DATA_DIR = "Data"
+MENU_FILE = "menu.csv"
+
+
+def outlet_name(file_name: str) -> str:
+    """Outlet name for an outlet CSV, i.e. the file name without extension."""
+    return os.path.splitext(os.path.basename(file_name))[0]
+
+
+def clean_collection_name(collection_name: str) -> str:
+    """Outlet name for a MongoDB collection, i.e. the last part of a path-like collection name."""
+    return collection_name.split("/")[-1].split("\\")[-1]
+
+
+def file_signature(path: str) -> Tuple[int, int]:
+    """(mtime_ns, size) of a file, used to detect that it changed on disk."""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class OrderStore:
+    """
+    Process-wide cache of the outlet order CSVs in the Data folder.
+
+    Each outlet file is loaded once into a columnar OutletTable and kept in
+    memory. Loading goes through the on-disk columnar cache, so after the
+    first parse a (re)load is a memory-map rather than a CSV parse. A file is
+    only loaded again when its mtime or size changes, so the analytics
+    endpoints aggregate in memory instead of re-parsing CSVs on every request.
+    The returned tables and frames are shared and must be treated as read-only.
+
+    Derived structures (indexes, aggregates) register as listeners and are
+    told about every change instead of rescanning the data. A listener may
+    implement any of ``outlet_loaded(outlet, table)`` (an outlet was loaded
+    or reloaded from disk), ``orders_appended(outlet, batch, table)`` (new
+    orders were ingested; ``table`` is the outlet's table after the append)
+    and ``outlet_removed(outlet)``.
+    """
+
+    def __init__(self, data_dir: str = DATA_DIR, cache: Optional[ColumnarCache] = None):
+        self.data_dir = os.path.abspath(data_dir)
+        self.cache = cache or ColumnarCache()
+        self._lock = threading.RLock()
+        self._tables: Dict[str, OutletTable] = {}
+        self._signatures: Dict[str, Tuple[int, int]] = {}
+        # Outlet -> builder that appends to its table without copying all of it
+        self._builders: Dict[str, TableBuilder] = {}
+        self._listeners = []
+
+    def add_listener(self, listener) -> None:
+        """Register a listener and replay the currently loaded outlets to it."""
+        with self._lock:
+            self.refresh()
+            self._listeners.append(listener)
+            for outlet, table in self._tables.items():
+                self._notify_listener(listener, "outlet_loaded", outlet, table)
+
+    def _notify_listener(self, listener, event: str, *args) -> None:
+        handler = getattr(listener, event, None)
+        if handler is None:
+            return
+        try:
+            handler(*args)
+        except Exception as e:
+            print(f"Error in order store listener {type(listener).__name__}.{event}: {e}")
+
+    def _notify(self, event: str, *args) -> None:
+        for listener in self._listeners:
+            self._notify_listener(listener, event, *args)
+
+    def _outlet_paths(self) -> Dict[str, str]:
+        if not os.path.isdir(self.data_dir):
+            return {}
+        return {
+            outlet_name(file_name): os.path.join(self.data_dir, file_name)
+            for file_name in sorted(os.listdir(self.data_dir))
+            if file_name.lower().endswith(".csv") and file_name.lower() != MENU_FILE
+        }
+
+    def refresh(self) -> None:
+        """Load new outlet files, reload changed ones and drop deleted ones."""
+        with self._lock:
+            paths = self._outlet_paths()
+            for outlet in list(self._tables):
+                if outlet not in paths:
+                    del self._tables[outlet]
+                    del self._signatures[outlet]
+                    self._builders.pop(outlet, None)
+                    self._notify("outlet_removed", outlet)
+
+            for outlet, path in paths.items():
+                try:
+                    signature = file_signature(path)
+                except OSError:
+                    continue
+                if self._signatures.get(outlet) == signature:
+                    continue
+                self._builders.pop(outlet, None)
+                try:
+                    self._tables[outlet] = self.cache.load(outlet, path, signature)
+                    self._signatures[outlet] = signature
+                except Exception as e:
+                    print(f"Error loading {path}: {e}")
+                    self._tables.pop(outlet, None)
+                    self._signatures.pop(outlet, None)
+                    self._notify("outlet_removed", outlet)
+                    continue
+                self._notify("outlet_loaded", outlet, self._tables[outlet])
+
+    def append(self, outlet: str, batch: OutletTable) -> OutletTable:
+        """
+        Add newly ingested orders to an outlet in memory and notify listeners
+        with just the new batch. Persisting the orders is up to the caller.
+        """
+        with self._lock:
+            current = self._tables.get(outlet)
+            if current is None:
+                table = batch
+            else:
+                builder = self._builders.get(outlet)
+                if builder is None or builder.table is not current:
+                    builder = self._builders[outlet] = TableBuilder(current)
+                table = builder.append(batch)
+            self._tables[outlet] = table
+            self._notify("orders_appended", outlet, batch, table)
+            return table
+
+    def append_rows(self, outlet: str, rows: pd.DataFrame) -> OutletTable:
+        """
+        Append validated order rows (string columns as in the CSV) to the
+        outlet's CSV in Data/, creating it if needed, and to the in-memory
+        table. The store records the file's new signature, so the write does
+        not trigger a reload; listeners only see the new batch.
+        """
+        batch = table_from_frame(rows)
+        path = os.path.join(self.data_dir, f"{outlet}.csv")
+        with self._lock:
+            # Make sure earlier changes to the file are loaded before it is extended
+            self.refresh()
+            os.makedirs(self.data_dir, exist_ok=True)
+            is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+            with open(path, 'ab+') as f:
+                if not is_new:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) not in (b'\n', b''):
+                        f.write(b'\n')
+                f.write(rows[ORDER_COLUMNS].to_csv(header=is_new, index=False, lineterminator='\n').encode('utf-8'))
+            self._signatures[outlet] = file_signature(path)
+            return self.append(outlet, batch)
+
+    def persist_cache(self, outlet: str) -> None:
+        """Write the outlet's in-memory table to the columnar cache under its current file signature."""
+        with self._lock:
+            table, signature = self._tables.get(outlet), self._signatures.get(outlet)
+            if table is not None and signature is not None:
+                self.cache.put(outlet, signature, table)
+
+    def tables(self) -> Dict[str, OutletTable]:
+        """Outlet name -> columnar order table, reloading stale files first."""
+        with self._lock:
+            self.refresh()
+            return dict(self._tables)
+
+    def table(self, outlet: str) -> Optional[OutletTable]:
+        """Columnar order table of a single outlet, or None if it has no data file."""
+        return self.tables().get(outlet)
+
+    def frames(self) -> Dict[str, pd.DataFrame]:
+        """Outlet name -> typed order DataFrame (without Order_List), reloading stale files first."""
+        return {outlet: table.frame() for outlet, table in self.tables().items()}
+
+    def frame(self, outlet: str) -> Optional[pd.DataFrame]:
+        """Typed order DataFrame of a single outlet, or None if it has no data file."""
+        table = self.table(outlet)
+        return table.frame() if table is not None else None
+
+
+# Shared by every endpoint in the process
+order_store = OrderStore()
@@ -0,0 +1,112 @@
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from columnar_cache import OutletTable
+
+
+def _first_occurrences(table: OutletTable) -> Dict[str, int]:
+    """Phone_Number -> User_ID of the first order placed with each phone in a table, in order of those orders."""
+    valid = (table.phone != "") & (table.user_id >= 0)
+    phones, user_ids = table.phone[valid], table.user_id[valid]
+    first = np.sort(np.unique(phones, return_index=True)[1])
+    return dict(zip(phones[first].tolist(), user_ids[first].tolist()))
+
+
+class PhoneIndex:
+    """
+    Phone_Number <-> User_ID hash index over the outlet orders.
+
+    Registered as an order store listener: an outlet's part of the index is
+    rebuilt when the outlet is (re)loaded from disk and extended when new
+    orders are appended, so lookups are O(1) instead of a scan over every
+    outlet CSV. As with the old scan, the first order seen for a phone
+    (outlets in name order, then rows in file order) decides its User_ID, and
+    a user's phone is the first of the phones that resolve to them in that order.
+    Appends merge just their new phones into the lookups.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Outlet -> its phones in order of their first order
+        self._by_outlet: Dict[str, Dict[str, int]] = {}
+        self._phone_to_user: Dict[str, int] = {}
+        # Phone -> the outlet whose order decided its User_ID
+        self._owner: Dict[str, str] = {}
+        self._user_to_phone: Dict[int, str] = {}
+
+    def _rebuild(self) -> None:
+        outlets = sorted(self._by_outlet)
+        phone_to_user, owner = {}, {}
+        for outlet in reversed(outlets):
+            phone_to_user.update(self._by_outlet[outlet])
+            owner.update(dict.fromkeys(self._by_outlet[outlet], outlet))
+        user_to_phone = {}
+        for outlet in reversed(outlets):
+            owned = [(phone, user_id) for phone, user_id in self._by_outlet[outlet].items() if owner[phone] == outlet]
+            user_to_phone.update((user_id, phone) for phone, user_id in reversed(owned))
+        self._phone_to_user, self._owner, self._user_to_phone = phone_to_user, owner, user_to_phone
+
+    def _first_phone(self, user_id: int) -> Optional[str]:
+        """The phone ``user_id`` gets on a rebuild; a scan, only needed when a user loses their phone."""
+        for outlet in sorted(self._by_outlet):
+            for phone, phone_user in self._by_outlet[outlet].items():
+                if phone_user == user_id and self._owner.get(phone) == outlet:
+                    return phone
+        return None
+
+    def outlet_loaded(self, outlet: str, table: OutletTable) -> None:
+        index = _first_occurrences(table)
+        with self._lock:
+            self._by_outlet[outlet] = index
+            self._rebuild()
+
+    def outlet_removed(self, outlet: str) -> None:
+        with self._lock:
+            if self._by_outlet.pop(outlet, None) is not None:
+                self._rebuild()
+
+    def orders_appended(self, outlet: str, batch: OutletTable, table: OutletTable) -> None:
+        with self._lock:
+            outlet_index = self._by_outlet.setdefault(outlet, {})
+            for phone, user_id in _first_occurrences(batch).items():
+                if phone in outlet_index:
+                    continue
+                outlet_index[phone] = user_id
+                # Appended orders come after the outlet's others, so a phone new to it only
+                # wins over an owner later in name order
+                owner = self._owner.get(phone)
+                if owner is not None and owner < outlet:
+                    continue
+                previous = self._phone_to_user.get(phone)
+                self._phone_to_user[phone] = user_id
+                self._owner[phone] = outlet
+                if previous is not None and previous != user_id and self._user_to_phone.get(previous) == phone:
+                    first_phone = self._first_phone(previous)
+                    if first_phone is None:
+                        del self._user_to_phone[previous]
+                    else:
+                        self._user_to_phone[previous] = first_phone
+                current = self._user_to_phone.get(user_id)
+                if current is None or current == phone or outlet < self._owner[current]:
+                    self._user_to_phone[user_id] = phone
+
+    def user_id(self, phone_number: str) -> Optional[int]:
+        """User_ID for a phone number, or None if no order was placed with it."""
+        return self._phone_to_user.get(phone_number.strip())
+
+    def user_ids(self, phone_numbers: List[str]) -> List[Optional[int]]:
+        """``user_id`` of many phone numbers, resolved against one snapshot of the index."""
+        lookup = self._phone_to_user
+        return [lookup.get(phone_number.strip()) for phone_number in phone_numbers]
+
+    def phone_number(self, user_id: int) -> Optional[str]:
+        """Phone_Number a User_ID ordered with, or None if the user is unknown."""
+        return self._user_to_phone.get(user_id)
+
+    def __len__(self):
+        return len(self._phone_to_user)
+
+
+phone_index = PhoneIndex()
@@ -0,0 +1,662 @@
+import copy
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from fastapi import HTTPException
+
+from ann_index import LSHIndex
+from columnar_cache import OutletTable
+from item_similarity import ItemSimilarity, basket_matrix
+from order_store import order_store
+
+
+# Neighbors kept per user in the precomputed table; requests for more fall back to a live search
+TABLE_NEIGHBORS = 20
+# Upper bound on the users x block similarity matrix computed at once; it is the only
+# allocation of that size, everything else per block is O(users) or O(block)
+BLOCK_BYTES = 64 * 1024 * 1024
+# Neighbor search modes: exact brute force, or approximate through an LSH index (see ann_index.py)
+INDEX_MODES = ("exact", "lsh")
+# Recommendation engines: user-based kNN, or item-item co-occurrence (see item_similarity.py)
+ENGINES = ("user", "item")
+# Seconds between the live recommender's periodic full rebuilds
+REBUILD_SECONDS = 6 * 3600
+
+
+def order_entries(tables) -> np.ndarray:
+    """Order number (counted across ``tables``) of every entry of their concatenated exploded Order_Lists."""
+    sizes = np.concatenate([table.order_sizes() for table in tables] or [np.zeros(0, dtype=np.int64)])
+    return np.repeat(np.arange(len(sizes)), sizes)
+
+
+class NeighborTable:
+    """Every user's top-K most similar users: row indices as int32, similarities as float32, best first."""
+
+    def __init__(self, indices: np.ndarray, scores: np.ndarray):
+        self.indices = indices
+        self.scores = scores
+
+    @property
+    def k(self) -> int:
+        return self.indices.shape[1]
+
+    def __len__(self):
+        return self.indices.shape[0]
+
+
+def interaction_matrix(user_ids: np.ndarray, items: np.ndarray) -> Tuple[sp.csr_matrix, np.ndarray, np.ndarray]:
+    """
+    Users x items CSR matrix of how often each user ordered each item, from
+    parallel arrays with one entry per ordered item. Returns (matrix, sorted
+    User_IDs of the rows, sorted Menu IDs of the columns), the same layout as
+    ``pd.crosstab(User_ID, Order_List)``.
+    """
+    user_index, rows = np.unique(user_ids, return_inverse=True)
+    item_index, columns = np.unique(items, return_inverse=True)
+    matrix = sp.csr_matrix(
+        (np.ones(len(rows), dtype=np.float64), (rows.ravel(), columns.ravel())),
+        shape=(len(user_index), len(item_index)),
+    )
+    matrix.sum_duplicates()
+    return matrix, user_index, item_index
+
+
+class RecommenderSystem:
+    """
+    User-based collaborative filtering over the order history.
+
+    The user-item counts are kept as a scipy.sparse CSR matrix. Neighbors are
+    ranked by cosine similarity of the standard-scaled rows, as with a
+    StandardScaler + brute-force cosine NearestNeighbors, but the scaling is
+    never materialized: with w = 1 / scale**2, the dot product of two scaled
+    rows is x_u.(w * x_v) - x_u.(w * mean) - x_v.(w * mean) + mean.(w * mean),
+    so only per-column statistics and two per-user vectors are stored next
+    to the sparse counts, and a query is one sparse matrix-vector product.
+
+    With ``index="lsh"`` neighbor searches go through an LSHIndex instead of
+    scanning every user; ``lsh_params`` (n_tables, n_bits, max_candidates)
+    trade recall for latency.
+
+    The "item" engine scores a user by the item-item similarities
+    (``item_measure``: cosine or lift of how often items share an order) of
+    the items they ordered, which needs no neighbor search at all.
+    """
+
+    def __init__(self, index: str = "exact", lsh_params: Optional[Dict] = None, item_measure: str = "cosine"):
+        if index not in INDEX_MODES:
+            raise ValueError(f"Unknown index {index!r}, choose from {', '.join(INDEX_MODES)}")
+        self.index = index
+        self.lsh_params = lsh_params or {}
+        self.ann: Optional[LSHIndex] = None
+        self.item_similarity = ItemSimilarity(item_measure)
+        self.matrix: Optional[sp.csr_matrix] = None
+        self.user_ids = np.zeros(0, dtype=np.int64)
+        self.item_ids = np.zeros(0, dtype=np.int64)
+        # User_IDs in sorted order and the row of each, for binary-search lookups
+        self._sorted_ids = np.zeros(0, dtype=np.int64)
+        self._id_order = np.zeros(0, dtype=np.int64)
+        # The order store tables the interactions were taken from
+        self.sources: Dict[str, OutletTable] = {}
+        self.n_neighbors = 3
+        self.neighbor_table: Optional[NeighborTable] = None
+        self._table_lock = threading.Lock()
+        self._table_thread: Optional[threading.Thread] = None
+
+    def load_data(self, data_path: str):
+        # Orders come from the shared order store, with Order_List already parsed
+        tables = order_store.tables()
+        print("Loading outlet data", list(tables))
+        self.sources = tables
+
+        # User-item interactions: one entry per ordered item, and the order it was part of
+        user_ids = np.concatenate([table.item_users() for table in tables.values()])
+        items = np.concatenate([table.items for table in tables.values()])
+        return self.fit_interactions(user_ids, items, order_entries(tables.values()))
+
+    def fit_interactions(self, user_ids: np.ndarray, items: np.ndarray,
+                         baskets: Optional[np.ndarray] = None) -> sp.csr_matrix:
+        """
+        Build the interaction matrix, the column statistics of the (implicit)
+        standard scaling and the item similarities. ``baskets`` numbers the
+        order of every entry; without it each user's items count as one basket.
+        """
+        self.matrix, self.user_ids, self.item_ids = interaction_matrix(user_ids, items)
+        self.item_similarity = copy.copy(self.item_similarity).fit(
+            self._baskets(np.searchsorted(self.item_ids, items), baskets, self.matrix))
+        self._sorted_ids = self.user_ids
+        self._id_order = np.arange(len(self.user_ids))
+        # Column sums and sums of squares, kept so that fold_in can update the statistics
+        self._sums = np.asarray(self.matrix.sum(axis=0)).ravel()
+        self._squares = np.asarray(self.matrix.multiply(self.matrix).sum(axis=0)).ravel()
+        self._set_statistics()
+        return self.matrix
+
+    def _set_statistics(self) -> None:
+        # Population mean and standard deviation per item, as StandardScaler computes them
+        n = max(self.matrix.shape[0], 1)
+        self.mean = self._sums / n
+        scale = np.sqrt(np.maximum(self._squares / n - self.mean ** 2, 0.0))
+        # Constant columns are left unscaled, like StandardScaler does
+        self.scale = np.where(scale < 10 * np.finfo(np.float64).eps, 1.0, scale)
+
+    def _baskets(self, columns: np.ndarray, baskets: Optional[np.ndarray], matrix: sp.csr_matrix) -> sp.csr_matrix:
+        """Binary baskets x items matrix: from the order numbers, or the users' rows of ``matrix``."""
+        if baskets is not None:
+            return basket_matrix(columns, baskets, len(self.item_ids))
+        users = matrix[np.flatnonzero(np.diff(matrix.indptr))]
+        users.data[:] = 1.0
+        return users
+
+    def fold_in(self, user_ids: np.ndarray, items: np.ndarray,
+                baskets: Optional[np.ndarray] = None) -> Optional["RecommenderSystem"]:
+        """
+        A new model with more interactions (one entry per ordered item, in the
+        orders numbered by ``baskets``) added to this one, which is left
+        untouched and can keep serving meanwhile.
+
+        Users new to the model get rows after the existing ones, so existing
+        row numbers stay valid. The column statistics are updated from the
+        changed rows alone; the per-user terms are recomputed (one pass over
+        the matrix), the LSH index rehashes the changed rows, the item
+        co-occurrence counts take in the new baskets and the neighbor table
+        is updated with ``update_neighbors``. Lists of
+        unaffected users were ranked with the previous statistics, which
+        drift only slightly per batch; a full rebuild resets them.
+
+        Returns None when the interactions contain Menu IDs the model has no
+        column for, which needs a full rebuild.
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        items = np.asarray(items, dtype=np.int64)
+        if len(self.item_ids) == 0:
+            return None
+        columns = np.minimum(np.searchsorted(self.item_ids, items), len(self.item_ids) - 1)
+        if (self.item_ids[columns] != items).any():
+            return None
+
+        old = self.matrix
+        n_old = old.shape[0]
+        rows = self._lookup(user_ids)
+        new_ids = np.unique(user_ids[rows < 0])
+        rows = np.where(rows < 0, n_old + np.searchsorted(new_ids, user_ids), rows)
+        shape = (n_old + len(new_ids), old.shape[1])
+        delta = sp.csr_matrix((np.ones(len(rows)), (rows, columns)), shape=shape)
+        delta.sum_duplicates()
+        # The old matrix with empty rows for the new users, sharing its arrays
+        padded = sp.csr_matrix((old.data, old.indices, np.concatenate([old.indptr, np.full(len(new_ids), old.indptr[-1])])),
+                               shape=shape)
+
+        model = copy.copy(self)
+        model.matrix = (padded + delta).tocsr()
+        model.user_ids = np.concatenate([self.user_ids, new_ids])
+        positions = np.searchsorted(self._sorted_ids, new_ids)
+        model._sorted_ids = np.insert(self._sorted_ids, positions, new_ids)
+        model._id_order = np.insert(self._id_order, positions, np.arange(n_old, shape[0]))
+
+        changed = np.unique(rows)
+        before = old[changed[changed < n_old]]
+        after = model.matrix[changed]
+        model._sums = self._sums + np.asarray(delta.sum(axis=0)).ravel()
+        model._squares = (self._squares + np.asarray(after.multiply(after).sum(axis=0)).ravel()
+                          - np.asarray(before.multiply(before).sum(axis=0)).ravel())
+        model._set_statistics()
+        model._precompute()
+        model.ann = self.ann.update(model.matrix, changed) if self.ann is not None else None
+        model.item_similarity = self.item_similarity.update(self._baskets(columns, baskets, delta))
+
+        model._table_lock = threading.Lock()
+        model._table_thread = None
+        table = self.neighbor_table
+        model.neighbor_table = None
+        if table is not None:
+            # New users start with empty lists; update_neighbors fills them in
+            pad = shape[0] - len(table)
+            model.neighbor_table = NeighborTable(
+                np.vstack([table.indices, np.zeros((pad, table.k), dtype=np.int32)]),
+                np.vstack([table.scores, np.full((pad, table.k), -np.inf, dtype=np.float32)]),
+            )
+            model.update_neighbors(changed)
+        return model
+
+    def train_model(self, n_neighbors=3, table_neighbors: Optional[int] = TABLE_NEIGHBORS):
+        """
+        Precompute the per-user terms of the scaled dot products and the row
+        norms, then build the top-``table_neighbors`` neighbor table on a
+        background thread (``None`` skips it). Until the table is ready,
+        recommendations use a live search.
+        """
+        started = time.perf_counter()
+        self.n_neighbors = n_neighbors
+        self.neighbor_table = None
+        self._precompute()
+        self.ann = LSHIndex(**self.lsh_params).build(self.matrix, self.mean, self.scale) if self.index == "lsh" else None
+        print(f"Trained recommender on {self.matrix.shape[0]} users x {self.matrix.shape[1]} items "
+              f"in {time.perf_counter() - started:.2f} s")
+        if table_neighbors:
+            self._table_thread = threading.Thread(target=self._build_neighbor_table, args=(table_neighbors,),
+                                                  name="recommender-neighbors", daemon=True)
+            self._table_thread.start()
+
+    def _precompute(self) -> None:
+        """Per-user terms of the implicit scaling, from the matrix and the column statistics."""
+        self.weights = 1.0 / self.scale ** 2
+        self.center = self.weights * self.mean
+        self.const = float(self.mean @ self.center)
+        # x_u . (w * mean) for every user
+        self.offsets = self.matrix @ self.center
+        squared_norms = self.matrix.multiply(self.matrix) @ self.weights - 2 * self.offsets + self.const
+        self.norms = np.sqrt(np.maximum(squared_norms, 0.0))
+
+    def _build_neighbor_table(self, k: int) -> None:
+        started = time.perf_counter()
+        matrix = self.matrix
+        try:
+            indices, scores = self.compute_neighbors(np.arange(matrix.shape[0]), k)
+        except Exception as e:
+            print(f"Error building the recommender neighbor table: {e}")
+            return
+        with self._table_lock:
+            # A retrain while this was running makes the result stale
+            if self.matrix is matrix:
+                self.neighbor_table = NeighborTable(indices, scores)
+        print(f"Built top-{k} neighbor table for {matrix.shape[0]} users in {time.perf_counter() - started:.2f} s")
+
+    def wait_for_neighbor_table(self, timeout: Optional[float] = None) -> Optional[NeighborTable]:
+        thread = self._table_thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.neighbor_table
+
+    def compute_neighbors(self, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        ``neighbors`` of many rows as int32/float32 arrays, computed in blocks
+        whose users x block similarity matrix, the only allocation of that
+        size, stays within BLOCK_BYTES.
+        Building the full table is O(users^2) work, spread over blocks.
+        """
+        n_users = self.matrix.shape[0]
+        k = max(min(k, n_users - 1), 0)
+        indices = np.zeros((len(rows), k), dtype=np.int32)
+        scores = np.zeros((len(rows), k), dtype=np.float32)
+        block = max(1, BLOCK_BYTES // (8 * max(n_users, 1)))
+        for start in range(0, len(rows), block):
+            block_indices, block_scores = self.neighbors(rows[start:start + block], k)
+            indices[start:start + block] = block_indices
+            scores[start:start + block] = block_scores
+        return indices, scores
+
+    def update_neighbors(self, rows: np.ndarray) -> None:
+        """
+        Bring the neighbor table up to date after the interaction rows
+        ``rows`` changed (with unchanged column statistics). Those users get
+        their neighbors recomputed; every other user that had one of them as
+        a neighbor is recomputed too, and the changed users are merged into
+        the lists of users they are now closer to than the current K-th.
+        """
+        table = self.neighbor_table
+        if table is None or table.k == 0 or len(rows) == 0:
+            return
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        changed = np.zeros(len(table), dtype=bool)
+        changed[rows] = True
+        # Users whose lists contain a changed user may have lost that neighbor
+        stale = np.flatnonzero(changed[table.indices].any(axis=1) | changed)
+        indices, scores = table.indices.copy(), table.scores.copy()
+        if len(stale):
+            indices[stale], scores[stale] = self.compute_neighbors(stale, table.k)
+
+        # Other users may now rank a changed user above their current K-th neighbor
+        fresh = np.ones(len(table), dtype=bool)
+        fresh[stale] = False
+        block = max(1, BLOCK_BYTES // (8 * max(len(table), 1)))
+        for start in range(0, len(rows), block):
+            block_rows = rows[start:start + block]
+            # Cosine similarity is symmetric: row c of this block is every user's similarity to user c
+            similarities = self.similarities(block_rows)
+            for c, row_similarities in zip(block_rows.tolist(), similarities):
+                closer = np.flatnonzero(fresh & (row_similarities > scores[:, -1]))
+                closer = closer[closer != c]
+                for u in closer.tolist():
+                    # Insert c into u's sorted list, dropping the last entry
+                    position = int(np.searchsorted(-scores[u], -row_similarities[u], side="right"))
+                    indices[u, position + 1:] = indices[u, position:-1].copy()
+                    scores[u, position + 1:] = scores[u, position:-1].copy()
+                    indices[u, position] = c
+                    scores[u, position] = row_similarities[u]
+        with self._table_lock:
+            if self.neighbor_table is table:
+                self.neighbor_table = NeighborTable(indices, scores)
+
+    def pair_similarities(self, row: int, others: np.ndarray) -> np.ndarray:
+        """Exact cosine similarities of the scaled row ``row`` to the scaled rows ``others``."""
+        return self.batch_pair_similarities(np.array([row]), np.asarray(others)[None, :])[0]
+
+    def batch_pair_similarities(self, rows: np.ndarray, others: np.ndarray) -> np.ndarray:
+        """Exact cosine similarities of each scaled row ``rows[i]`` to the scaled rows ``others[i, :]``."""
+        # Dense weighted query rows: rows x items is small, items are few
+        queries = np.zeros((len(rows), self.matrix.shape[1]))
+        positions, lengths = self._row_positions(rows)
+        columns = self.matrix.indices[positions]
+        queries[np.repeat(np.arange(len(rows)), lengths), columns] = self.matrix.data[positions] * self.weights[columns]
+        flat = others.ravel()
+        positions, lengths = self._row_positions(flat)
+        pair_ids = np.repeat(np.arange(len(flat)), lengths)
+        query_ids = pair_ids // max(others.shape[1], 1)
+        dots = np.bincount(pair_ids,
+                           weights=self.matrix.data[positions] * queries[query_ids, self.matrix.indices[positions]],
+                           minlength=len(flat)).reshape(others.shape)
+        dots += self.const - self.offsets[others] - self.offsets[rows][:, None]
+        denominator = self.norms[others] * self.norms[rows][:, None]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(denominator > 0, dots / denominator, 0.0)
+
+    def user_neighbors(self, row: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-``k`` neighbors of one user: looked up in the neighbor table when
+        it is ready and deep enough, otherwise searched live. Table hits get
+        their similarities recomputed exactly (k dot products), so scores do
+        not depend on the table's float32 storage.
+        """
+        table = self.neighbor_table
+        if table is not None and k <= table.k and row < len(table):
+            others = table.indices[row, :k].astype(np.int64)
+            similarities = self.pair_similarities(row, others)
+            order = np.argsort(-similarities, kind="stable")
+            return others[order], similarities[order]
+        indices, similarities = self.neighbors(np.array([row]), k)
+        return indices[0], similarities[0]
+
+    def user_row(self, user_id: int) -> Optional[int]:
+        row = int(self._lookup(np.array([user_id], dtype=np.int64))[0])
+        return row if row >= 0 else None
+
+    def user_rows(self, user_ids: List[Optional[int]]) -> np.ndarray:
+        """Matrix rows of many User_IDs at once (binary search in the sorted ids); -1 where unknown."""
+        return self._lookup(np.array([-1 if user_id is None else user_id for user_id in user_ids], dtype=np.int64))
+
+    def _lookup(self, ids: np.ndarray) -> np.ndarray:
+        if len(self._sorted_ids) == 0:
+            return np.full(len(ids), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self._sorted_ids) - 1)
+        return np.where(self._sorted_ids[positions] == ids, self._id_order[positions], -1)
+
+    def similarities(self, rows: np.ndarray) -> np.ndarray:
+        """
+        (len(rows) x users) cosine similarities of the scaled rows ``rows`` to
+        every user's scaled row. The result is the only array of that size:
+        it is one sparse x dense product, and the centering and normalization
+        are applied to it in place (column by column for the norms, so the
+        temporaries are O(users)). It is returned as a transposed view.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        # Dense weighted query rows: rows x items is small, items are few
+        queries = np.zeros((len(rows), self.matrix.shape[1]))
+        positions, lengths = self._row_positions(rows)
+        columns = self.matrix.indices[positions]
+        queries[np.repeat(np.arange(len(rows)), lengths), columns] = self.matrix.data[positions] * self.weights[columns]
+        dots = np.asarray(self.matrix @ queries.T)  # users x rows
+        dots -= self.offsets[rows][None, :]
+        dots -= self.offsets[:, None]
+        dots += self.const
+        for j, row in enumerate(rows.tolist()):
+            denominator = self.norms[row] * self.norms
+            column = dots[:, j]
+            np.divide(column, denominator, out=column, where=denominator > 0)
+            # Rows with zero norm have no direction; they are dissimilar to everyone
+            column[denominator <= 0] = 0.0
+        return dots.T
+
+    def neighbors(self, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and similarities of the ``k`` most similar other users of each row, most similar first."""
+        ann = self.ann
+        if ann is not None and len(ann) == self.matrix.shape[0]:
+            k = min(k, self.matrix.shape[0] - 1)
+            return ann.query(self, rows, k) if k > 0 else self.exact_neighbors(rows, k)
+        return self.exact_neighbors(rows, k)
+
+    def exact_neighbors(self, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """``neighbors`` by brute force over every user."""
+        k = min(k, self.matrix.shape[0] - 1)
+        if k <= 0:
+            return np.zeros((len(rows), 0), dtype=np.int64), np.zeros((len(rows), 0))
+        similarities = self.similarities(rows)
+        indices = np.zeros((len(rows), k), dtype=np.int64)
+        top_similarities = np.zeros((len(rows), k))
+        # One query at a time, so the selection temporaries are O(users), not O(rows x users)
+        for i, row in enumerate(np.asarray(rows).tolist()):
+            row_similarities = similarities[i]
+            row_similarities[row] = -np.inf  # a user is not their own neighbor
+            top = np.argpartition(-row_similarities, k - 1)[:k]
+            top = top[np.argsort(-row_similarities[top], kind="stable")]
+            indices[i], top_similarities[i] = top, row_similarities[top]
+        return indices, top_similarities
+
+    def batch_neighbors(self, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """``user_neighbors`` of many users at once: one table gather, or one blocked search."""
+        table = self.neighbor_table
+        if table is not None and k <= table.k and len(table) == self.matrix.shape[0]:
+            others = table.indices[rows, :k].astype(np.int64)
+            similarities = self.batch_pair_similarities(rows, others)
+            order = np.argsort(-similarities, axis=1, kind="stable")
+            return np.take_along_axis(others, order, axis=1), np.take_along_axis(similarities, order, axis=1)
+        return self.neighbors(rows, k)
+
+    def recommend_batch(self, rows: np.ndarray, n_recommendations: int = 3,
+                        engine: str = "user") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recommendations for many users (matrix rows) at once: (Menu IDs,
+        scores), each rows x n, best first. Slots past the number of items a
+        user does not own yet have score -inf.
+
+        The neighbors' weighted item sums of all users are one sparse
+        (rows x users) @ (users x items) product; with the item engine it is
+        (rows x items) @ (items x items).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if engine == "item":
+            scores = self.item_similarity.scores(self.matrix[rows])
+        else:
+            k = n_recommendations
+            neighbor_rows, similarities = self.batch_neighbors(rows, k)
+            k = neighbor_rows.shape[1]
+            weights = sp.csr_matrix((similarities.ravel(), neighbor_rows.ravel(), np.arange(0, len(rows) * k + 1, k)),
+                                    shape=(len(rows), self.matrix.shape[0]))
+            scores = (weights @ self.matrix).toarray()
+        # The users' own items are never recommended
+        owned = self.matrix[rows].tocoo()
+        scores[owned.row, owned.col] = -np.inf
+
+        n = min(n_recommendations, scores.shape[1])
+        top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.lexsort((top, -top_scores), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return self.item_ids[top], np.take_along_axis(top_scores, order, axis=1)
+
+    def get_recommendations(self, user_id: int, n_recommendations: int = 3, engine: str = "user"):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, choose from {', '.join(ENGINES)}")
+        user_row = self.user_row(user_id)
+        if user_row is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"User {user_id} not found in the training data"
+            )
+
+        if engine == "item":
+            # Sum of the neighbor rows of the user's items, weighted by how often each was ordered
+            owned = self.row_items(user_row)
+            counts = self.matrix.data[self.matrix.indptr[user_row]:self.matrix.indptr[user_row + 1]]
+            scores = self.item_similarity.user_scores(owned, counts)
+            return self.top_items(scores, owned, n_recommendations)
+
+        # Find similar users
+        similar_user_indices, similarity_scores = self.user_neighbors(user_row, n_recommendations)
+
+        # Weighted sum of the neighbors' item counts, without the user's own items
+        scores = self.weighted_row_sum(similar_user_indices, similarity_scores)
+        return self.top_items(scores, self.row_items(user_row), n_recommendations)
+
+    def row_items(self, row: int) -> np.ndarray:
+        """Column indices of the items a user has ordered."""
+        return self.matrix.indices[self.matrix.indptr[row]:self.matrix.indptr[row + 1]]
+
+    def _row_positions(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions in the CSR data/indices arrays of the entries of ``rows``, and each row's entry count."""
+        starts = self.matrix.indptr[rows]
+        lengths = self.matrix.indptr[np.asarray(rows) + 1] - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return positions, lengths
+
+    def weighted_row_sum(self, rows: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """sum(weights[i] * matrix[rows[i]]) as a dense item vector, straight from the CSR arrays."""
+        positions, lengths = self._row_positions(rows)
+        return np.bincount(self.matrix.indices[positions],
+                           weights=self.matrix.data[positions] * np.repeat(weights, lengths),
+                           minlength=self.matrix.shape[1])
+
+    def top_items(self, scores: np.ndarray, owned: np.ndarray, n: int) -> Tuple[List[int], List[float]]:
+        """
+        Menu IDs and scores of the ``n`` best-scoring items the user does not
+        own yet, best first; equal scores go to the lower Menu ID.
+        """
+        scores = scores.astype(np.float64, copy=True)
+        scores[owned] = -np.inf
+        n = min(n, len(scores) - len(owned))
+        if n <= 0:
+            return [], []
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.lexsort((top, -scores[top]))]
+        return self.item_ids[top].tolist(), scores[top].tolist()
+
+
+class LiveRecommender:
+    """
+    The served recommender: a trained RecommenderSystem that follows the
+    order store without retraining pauses.
+
+    Registered as an order store listener. Appended orders are queued and a
+    background thread folds them into a copy of the current model
+    (``RecommenderSystem.fold_in``); the copy replaces ``model`` with a
+    single assignment, so a request keeps using the snapshot it started
+    with. Outlets reloaded or removed on disk, orders with unknown Menu IDs
+    and a timer every ``rebuild_interval`` seconds trigger a full rebuild on
+    the same thread, swapped in the same way once its neighbor table is ready.
+    """
+
+    def __init__(self, index: str = "exact", lsh_params: Optional[Dict] = None, item_measure: str = "cosine",
+                 rebuild_interval: float = REBUILD_SECONDS):
+        self.index = index
+        self.lsh_params = lsh_params
+        self.item_measure = item_measure
+        self.rebuild_interval = rebuild_interval
+        self.model = RecommenderSystem(index, lsh_params, item_measure)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self.folds = 0
+        self.rebuilds = 0
+
+    def start(self) -> None:
+        """Train on the current orders, follow the order store and start the update thread."""
+        self.model = self.train(wait=False)
+        order_store.add_listener(self)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="recommender-updates", daemon=True)
+            self._thread.start()
+
+    def train(self, wait: bool = True) -> RecommenderSystem:
+        """A model trained from scratch on the order store; ``wait`` also waits for its neighbor table."""
+        model = RecommenderSystem(self.index, self.lsh_params, self.item_measure)
+        model.load_data(order_store.data_dir)
+        model.train_model()
+        if wait:
+            model.wait_for_neighbor_table()
+        return model
+
+    def outlet_loaded(self, outlet: str, table: OutletTable) -> None:
+        if self.model.sources.get(outlet) is not table:
+            self._queue.put(None)
+
+    def outlet_removed(self, outlet: str) -> None:
+        if outlet in self.model.sources:
+            self._queue.put(None)
+
+    def orders_appended(self, outlet: str, batch: OutletTable, table: OutletTable) -> None:
+        self._queue.put((outlet, batch, table))
+
+    def _run(self) -> None:
+        next_rebuild = time.monotonic() + self.rebuild_interval
+        while True:
+            try:
+                jobs = [self._queue.get(timeout=max(next_rebuild - time.monotonic(), 0))]
+            except queue.Empty:
+                jobs = [None]
+            # Everything queued meanwhile is applied in one go
+            while True:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if None in jobs:
+                    self.rebuild()
+                    next_rebuild = time.monotonic() + self.rebuild_interval
+                self.fold([job for job in jobs if job is not None])
+            except Exception as e:
+                print(f"Error updating the recommender: {e}")
+
+    def rebuild(self) -> None:
+        started = time.perf_counter()
+        self.model = self.train()
+        self.rebuilds += 1
+        print(f"Rebuilt recommender in {time.perf_counter() - started:.2f} s")
+
+    def fold(self, batches: List[Tuple[str, OutletTable, OutletTable]]) -> None:
+        """Fold appended order batches into a new model, skipping those the current one already has."""
+        # Fold-ins update the neighbor table, so the first one has to be built
+        model = self.model
+        model.wait_for_neighbor_table()
+        sources = dict(model.sources)
+        new = []
+        for outlet, batch, table in batches:
+            # Tables only grow by appends, so a source at least this long already holds the batch
+            if outlet in sources and len(sources[outlet]) >= len(table):
+                continue
+            new.append(batch)
+            sources[outlet] = table
+        if not new:
+            return
+
+        started = time.perf_counter()
+        user_ids = np.concatenate([batch.item_users() for batch in new])
+        items = np.concatenate([batch.items for batch in new])
+        folded = model.fold_in(user_ids, items, order_entries(new))
+        if folded is None:
+            self.rebuild()
+            return
+        folded.sources = sources
+        self.model = folded
+        self.folds += 1
+        print(f"Folded {sum(len(batch) for batch in new)} orders into the recommender "
+              f"in {time.perf_counter() - started:.2f} s")
+
+    def get_recommendations(self, user_id: int, n_recommendations: int = 3, engine: str = "user"):
+        return self.model.get_recommendations(user_id, n_recommendations, engine)
+
+    def stats(self) -> Dict:
+        model = self.model
+        table = model.neighbor_table
+        return {
+            "users": model.matrix.shape[0] if model.matrix is not None else 0,
+            "items": len(model.item_ids),
+            "index": model.index,
+            "item_measure": model.item_similarity.measure,
+            "neighbor_table": table.k if table is not None else None,
+            "pending": self._queue.qsize(),
+            "folds": self.folds,
+            "rebuilds": self.rebuilds,
+        }
@@ -0,0 +1,29 @@
+from datetime import date
+
+import pandas as pd
+
+from aggregates import OutletAggregates
+from columnar_cache import table_from_frame
+
+
+def table(bills):
+    return table_from_frame(pd.DataFrame({
+        "User_ID": ["1"] * len(bills),
+        "Phone_Number": ["9999999999"] * len(bills),
+        "User_Location": ["Test"] * len(bills),
+        "Order_List": ["[101]"] * len(bills),
+        "Order_Placed_Time": ["2024-10-02 10:00:00", "2024-10-01 10:00:00"][:len(bills)],
+        "Order_Complete_Time": ["2024-10-02 10:10:00", "2024-10-01 10:10:00"][:len(bills)],
+        "Order_Bill": bills,
+    }))
+
+
+def test_daily_sales_keep_integer_bills_integer():
+    sales = OutletAggregates().add(table(["189", "233"])).daily_sales()
+    assert sales == [(date(2024, 10, 1), 233), (date(2024, 10, 2), 189)]
+    assert all(type(value) is int for _, value in sales)
+
+
+def test_daily_sales_are_floats_once_a_bill_is_not_whole():
+    aggregates = OutletAggregates().add(table(["189"])).add(table(["10.5"]))
+    assert all(type(value) is float for _, value in aggregates.daily_sales())
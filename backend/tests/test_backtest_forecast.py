@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from backtest_forecast import backtest
+
+HEADER = "User_ID,Phone_Number,User_Location,Order_List,Order_Placed_Time,Order_Complete_Time,Order_Bill\n"
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ZeroModel:
+    def predict(self, X):
+        return np.zeros(len(X))
+
+
+class Entry:
+    model = ZeroModel()
+    mean = np.zeros(7)
+    scale = np.ones(7)
+    model_file = "zero"
+
+
+class Registry:
+    def get(self, location):
+        return Entry()
+
+
+def write_outlet(data_dir, days):
+    rows = [f'1,9000000001,Malad,[101],{day} 08:00:00,{day} 08:20:00,{100 + i}\n' for i, day in enumerate(days)]
+    (data_dir / "Andheri.csv").write_text(HEADER + "".join(rows))
+
+
+def test_folds_cover_calendar_days(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data_dir = tmp_path / "Data"
+    data_dir.mkdir()
+    # 10 calendar days with orders on 8 of them
+    write_outlet(data_dir, ["2024-10-01", "2024-10-02", "2024-10-03", "2024-10-05",
+                            "2024-10-06", "2024-10-07", "2024-10-09", "2024-10-10"])
+    [result] = backtest(data_dir=str(data_dir), horizon=3, min_train=4, registry=Registry())
+    assert result["days"] == 10
+    # Origins at calendar days 4..7, each scoring the 3 calendar days after it
+    assert result["folds"] == 4
+    assert result["rows"] == 12
+
+
+def test_unknown_outlet_is_a_usage_error(tmp_path):
+    data_dir = tmp_path / "Data"
+    data_dir.mkdir()
+    write_outlet(data_dir, ["2024-10-01"])
+    with pytest.raises(ValueError):
+        backtest(["Nowhere"], data_dir=str(data_dir), registry=Registry())
+    run = subprocess.run([sys.executable, "backtest_forecast.py", "--data", str(data_dir), "--outlets", "Nowhere"],
+                         cwd=BACKEND, capture_output=True, text=True)
+    assert run.returncode == 2
+    assert "unknown outlet(s): Nowhere" in run.stderr
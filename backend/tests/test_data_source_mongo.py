@@ -0,0 +1,70 @@
+"""
+The Mongo pipelines against the CSV source on the same orders. Needs a local
+mongod (MONGODB_TEST_URI, default mongodb://localhost:27017); skipped without one.
+"""
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from aggregates import AggregateEngine
+from columnar_cache import ColumnarCache
+from data_source import CsvDirectorySource, MongoDataSource
+from order_store import OrderStore
+
+pymongo = pytest.importorskip("pymongo")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data")
+TEST_DATABASE = "Mcd_data_source_test"
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = pymongo.MongoClient(os.getenv("MONGODB_TEST_URI", "mongodb://localhost:27017"),
+                                 serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        pytest.skip("no local mongod")
+    client.drop_database(TEST_DATABASE)
+    yield client
+    client.drop_database(TEST_DATABASE)
+    client.close()
+
+
+def import_outlet(db, outlet: str, df: pd.DataFrame) -> None:
+    """Insert an outlet's CSV rows as documents, dates as dates and Order_List as the CSV string."""
+    documents = df.assign(
+        Order_Placed_Time=pd.to_datetime(df["Order_Placed_Time"]),
+        Order_Complete_Time=pd.to_datetime(df["Order_Complete_Time"]),
+    ).to_dict("records")
+    db[outlet].insert_many(documents)
+
+
+def test_pipelines_match_csv_source(client, tmp_path):
+    db = client[TEST_DATABASE]
+    data_dir = tmp_path / "Data"
+    data_dir.mkdir()
+    for outlet in ("Andheri", "Bhayandar"):
+        df = pd.read_csv(os.path.join(DATA_DIR, f"{outlet}.csv"))
+        if outlet == "Bhayandar":
+            # Padding inside and around the list must not change the counts ($trim)
+            df["Order_List"] = " " + df["Order_List"].str.replace(",", " , ") + " "
+        import_outlet(db, outlet, df)
+        df.to_csv(data_dir / f"{outlet}.csv", index=False)
+    shutil.copy(os.path.join(DATA_DIR, "menu.csv"), data_dir / "menu.csv")
+
+    aggregates = AggregateEngine()
+    store = OrderStore(str(data_dir), ColumnarCache(str(tmp_path / "Cache")))
+    store.add_listener(aggregates)
+    csv_source = CsvDirectorySource(store, aggregates)
+    mongo_source = MongoDataSource(client=client, database=TEST_DATABASE)
+
+    assert mongo_source.most_sold_items() == dict(sorted(csv_source.most_sold_items().items()))
+    assert mongo_source.sales_totals() == dict(sorted(csv_source.sales_totals().items()))
+    assert mongo_source.daily_sales() == dict(sorted(csv_source.daily_sales().items()))
+    mongo_waiting, csv_waiting = mongo_source.waiting_times(), csv_source.waiting_times()
+    assert sorted(mongo_waiting) == sorted(csv_waiting)
+    for outlet in csv_waiting:
+        assert mongo_waiting[outlet] == pytest.approx(csv_waiting[outlet])
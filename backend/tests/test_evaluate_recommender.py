@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from evaluate_recommender import time_split
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("test_fraction", ["0", "1", "1.5", "-0.2", "abc"])
+def test_cli_rejects_test_fraction_outside_0_1(test_fraction):
+    result = subprocess.run([sys.executable, "evaluate_recommender.py", "--test-fraction", test_fraction, "--scales"],
+                            cwd=BACKEND_DIR, capture_output=True, text=True)
+    assert result.returncode == 2
+    assert "--test-fraction" in result.stderr and "Traceback" not in result.stderr
+
+
+@pytest.mark.parametrize("test_fraction", [0, 1])
+def test_time_split_rejects_test_fraction_outside_0_1(test_fraction):
+    with pytest.raises(ValueError, match="test_fraction"):
+        time_split(test_fraction=test_fraction)
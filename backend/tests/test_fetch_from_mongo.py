@@ -0,0 +1,58 @@
+import glob
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+import fetch_from_mongo
+from fetch_from_mongo import STATE_FILE, ExportState, export_collection
+
+
+def order(user_id, placed):
+    return {"User_ID": user_id, "Order_List": "[101]", "Order_Placed_Time": placed,
+            "Order_Complete_Time": placed, "Order_Bill": 100}
+
+
+def exported_user_ids(folder):
+    files = glob.glob(os.path.join(folder, "*.csv"))
+    user_ids = [pd.read_csv(path)["User_ID"].tolist() for path in files]
+    for path in files:
+        os.remove(path)
+    return sorted(sum(user_ids, []))
+
+
+def test_incremental_export_keeps_same_minute_and_late_orders(tmp_path):
+    db = mongomock.MongoClient()["Mcd"]
+    state = ExportState(str(tmp_path / STATE_FILE))
+    db.Andheri.insert_many([order(1, datetime(2024, 10, 1, 9, 0)), order(2, datetime(2024, 10, 1, 9, 30))])
+    assert export_collection(db, "Andheri", str(tmp_path), state, incremental=True) == 2
+    assert exported_user_ids(tmp_path) == [1, 2]
+
+    # Same minute as the newest exported order, and an order placed earlier that arrived late
+    db.Andheri.insert_many([order(3, datetime(2024, 10, 1, 9, 30)), order(4, datetime(2024, 10, 1, 8, 0))])
+    state = ExportState(str(tmp_path / STATE_FILE))
+    assert export_collection(db, "Andheri", str(tmp_path), state, incremental=True) == 2
+    assert exported_user_ids(tmp_path) == [3, 4]
+    assert export_collection(db, "Andheri", str(tmp_path), state, incremental=True) == 0
+
+
+def test_legacy_placed_time_mark_includes_its_minute(tmp_path):
+    state = ExportState(str(tmp_path / STATE_FILE))
+    state._marks["Andheri"] = "2024-10-01T09:30:00"
+    assert state.query("Andheri") == {"Order_Placed_Time": {"$gte": datetime(2024, 10, 1, 9, 30)}}
+
+
+def test_failed_export_removes_partial_file(tmp_path, monkeypatch):
+    db = mongomock.MongoClient()["Mcd"]
+    db.Andheri.insert_many([order(user_id, datetime(2024, 10, 1, 9, user_id)) for user_id in range(5)])
+
+    def fail(documents, columns=None):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(fetch_from_mongo, "format_chunk", fail)
+    with pytest.raises(RuntimeError):
+        export_collection(db, "Andheri", str(tmp_path), chunk_rows=2)
+    assert os.listdir(tmp_path) == []
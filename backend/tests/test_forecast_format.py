@@ -0,0 +1,22 @@
+import csv
+import io
+import json
+
+import numpy as np
+
+from forecast import format_rows
+
+DATES = np.array(["2024-10-01", "2024-10-02"], dtype="datetime64[D]")
+PREDICTIONS = np.array([[120.5, np.nan], [np.inf, 80.0]])
+
+
+def test_ndjson_writes_missing_forecasts_as_null():
+    rows = [json.loads(line) for line in format_rows("ndjson", ["Andheri", "Dadar"], DATES, PREDICTIONS).splitlines()]
+    assert [row["forecast"] for row in rows] == [120.5, None, None, 80.0]
+    assert rows[1] == {"location": "Andheri", "date": "2024-10-02", "forecast": None}
+
+
+def test_csv_leaves_missing_forecasts_empty():
+    rows = list(csv.reader(io.StringIO(format_rows("csv", ["Andheri", "Dadar"], DATES, PREDICTIONS))))
+    assert rows == [["Andheri", "2024-10-01", "120.5"], ["Andheri", "2024-10-02", ""],
+                    ["Dadar", "2024-10-01", ""], ["Dadar", "2024-10-02", "80.0"]]
@@ -0,0 +1,58 @@
+import os
+import shutil
+
+import forecast
+from forecast import ModelRegistry
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def counting_loads(monkeypatch):
+    loads = []
+    original = forecast.ForecastModel
+
+    def load(location, model_file, scaler_file):
+        loads.append(model_file)
+        return original(location, model_file, scaler_file)
+
+    monkeypatch.setattr(forecast, "ForecastModel", load)
+    return loads
+
+
+def test_broken_new_artifact_is_not_retried(tmp_path, monkeypatch):
+    for name in ("andheri.pkl", "scaler.pkl"):
+        shutil.copy(os.path.join(BACKEND, name), tmp_path / name)
+    registry = ModelRegistry({"andheri": ("andheri.pkl", "scaler.pkl")}, base_dir=str(tmp_path), manifest=None)
+    good = registry.get("andheri")
+
+    # Repoint the location at a new, broken model file
+    (tmp_path / "broken.pkl").write_bytes(b"not a model")
+    loads = counting_loads(monkeypatch)
+    assert registry.register("andheri", "broken.pkl", "scaler.pkl") is good
+    for _ in range(5):
+        assert registry.get("andheri") is good
+    assert len(loads) == 1
+
+    # A changed file is tried again
+    (tmp_path / "broken.pkl").write_bytes(b"still not a model, but longer")
+    assert registry.get("andheri") is good
+    assert len(loads) == 2
+
+    # Pointing back at the good artifacts serves them without a reload
+    registry.register("andheri", "andheri.pkl", "scaler.pkl")
+    assert registry.get("andheri") is good
+    assert len(loads) == 2
+
+
+def test_activated_export_updates_the_manifest_the_registry_reads(tmp_path):
+    server = tmp_path / "server"
+    server.mkdir()
+    for name in ("andheri.pkl", "scaler.pkl"):
+        shutil.copy(os.path.join(BACKEND, name), server / name)
+    registry = ModelRegistry({"andheri": ("andheri.pkl", "scaler.pkl")}, base_dir=str(server))
+
+    entries = forecast.export_native(registry, str(tmp_path / "elsewhere"), activate=True)
+    assert os.path.exists(registry.manifest)
+    assert forecast.read_manifest(registry.manifest) == entries
+    assert not os.path.exists(tmp_path / "elsewhere" / os.path.basename(forecast.MANIFEST_FILE))
+    assert forecast.is_native(registry.get("andheri").model_file)
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+from ingest import UploadIngestor, order_time_window, validate_batch
+
+HEADER = "User_ID,Phone_Number,User_Location,Order_List,Order_Placed_Time,Order_Complete_Time,Order_Bill\n"
+
+
+def batch(*times):
+    return pd.DataFrame({
+        "User_ID": ["1"] * len(times),
+        "Phone_Number": ["9999999999"] * len(times),
+        "User_Location": ["Test"] * len(times),
+        "Order_List": ["[1, 2]"] * len(times),
+        "Order_Placed_Time": list(times),
+        "Order_Complete_Time": list(times),
+        "Order_Bill": ["100"] * len(times),
+    })
+
+
+def test_validate_batch_rejects_times_outside_window():
+    window = (pd.Timestamp("2014-10-01"), pd.Timestamp("2034-12-31"))
+    valid, errors = validate_batch(batch("2024-10-01 12:00:00", "1900-01-01 00:00:00", "2200-01-01 00:00:00"), 0, window)
+    assert valid["Order_Placed_Time"].tolist() == ["2024-10-01 12:00:00"]
+    assert [error["line"] for error in errors] == [3, 4]
+    assert all("Order_Placed_Time" in error["error"] for error in errors)
+
+
+def test_validate_batch_rejects_fractional_or_huge_user_ids_and_infinite_bills():
+    df = batch(*["2024-10-01 12:00:00"] * 6)
+    df["User_ID"] = ["1", "2.7", "1e20", "-3", "4", "5"]
+    df["Order_Bill"] = ["100", "100", "100", "100", "inf", "-inf"]
+    valid, errors = validate_batch(df, 0)
+    assert valid["User_ID"].tolist() == ["1"]
+    assert [error["error"] for error in errors] == ["invalid User_ID"] * 3 + ["invalid Order_Bill"] * 2
+
+
+def test_validate_batch_rejects_menu_ids_out_of_range_or_off_the_menu():
+    df = batch(*["2024-10-01 12:00:00"] * 5)
+    df["Order_List"] = ["[101, 102]", "[99999999999]", "[2147483648]", "[101, 999]", "[]"]
+    valid, errors = validate_batch(df, 0)
+    assert valid["Order_List"].tolist() == ["[101, 102]", "[101, 999]", "[]"]
+    valid, errors = validate_batch(df, 0, menu_ids={101, 102})
+    assert valid["Order_List"].tolist() == ["[101, 102]", "[]"]
+    assert [error["error"] for error in errors] == ["invalid Order_List"] * 3
+
+
+def test_order_time_window_follows_existing_orders():
+    class Table:
+        placed = np.array(["2024-10-01", "NaT", "2024-12-31"], dtype="datetime64[ns]")
+
+    first, last = order_time_window(Table())
+    assert first == pd.Timestamp("2014-10-01") and last == pd.Timestamp("2034-12-31")
+    first, last = order_time_window(None)
+    assert first < pd.Timestamp.now() < last
+
+
+def test_upload_skips_out_of_range_rows():
+    class Store:
+        def __init__(self):
+            self.appended = []
+
+        data_dir = "no such dir"
+
+        def table(self, outlet):
+            return None
+
+        def append_rows(self, outlet, rows):
+            self.appended.append(rows)
+
+        def persist_cache(self, outlet):
+            pass
+
+    store = Store()
+    ingestor = UploadIngestor(store, "Test")
+    now = pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
+    ingestor.feed((HEADER +
+                   f'1,9999999999,Test,"[1, 2]",{now},{now},100\n'
+                   '2,9999999998,Test,"[3]",1900-01-01 00:00:00,1900-01-01 00:30:00,50\n').encode())
+    result = ingestor.finish()
+    assert (result["rows_ingested"], result["rows_rejected"]) == (1, 1)
+    assert result["errors"][0]["line"] == 3
+
+
+def test_appended_tables_match_concatenation(tmp_path):
+    from columnar_cache import ColumnarCache, concat_tables, table_from_frame
+    from order_store import OrderStore
+
+    store = OrderStore(str(tmp_path / "Data"), ColumnarCache(str(tmp_path / "Cache")))
+    batches = [batch(f"2024-10-0{day} 12:00:00", f"2024-10-0{day} 13:00:00") for day in range(1, 6)]
+    batches[2]["User_Location"] = "Somewhere else"
+    batches[3]["Phone_Number"] = "+91 99999 99999 ext"
+    batches[4]["Order_List"] = ["[]", "[101, 102, 103]"]
+    tables = [store.append_rows("Test", rows) for rows in batches]
+
+    expected = table_from_frame(batches[0])
+    for rows, table in zip(batches[1:], tables[1:]):
+        expected = concat_tables(expected, table_from_frame(rows))
+        assert len(table) == len(expected)
+    for table in (tables[-1], store.table("Test")):
+        for name, values in expected.arrays().items():
+            assert getattr(table, name).tolist() == values.tolist(), name
+    # Tables handed out earlier are not changed by later appends
+    assert tables[1].phone.tolist() == ["9999999999"] * 4 and len(tables[1].items) == 8
+
+
+def test_batcher_drops_overlong_lines_without_buffering_them():
+    from ingest import CsvLineBatcher, parse_batch
+
+    batcher = CsvLineBatcher(batch_rows=10, max_line_bytes=100)
+    assert not list(batcher.feed(HEADER.encode() + b"1,2"))
+    for _ in range(1000):
+        assert not list(batcher.feed(b"x" * 50))
+    # The overlong line is dropped as soon as it passes the limit
+    assert batcher._partial == [] and batcher._partial_bytes < 200
+    assert not list(batcher.feed(b"\n3,4\n5,"))
+    (first_line, lines), = list(batcher.finish())
+    assert lines == [None, "3,4", "5,"]
+    _, errors = parse_batch(HEADER.strip().split(","), lines, first_line)
+    assert [error["line"] for error in errors] == [2, 3, 4]
+    assert errors[0]["error"] == "line too long"
+
+
+def test_batcher_rejects_overlong_header():
+    import pytest
+    from ingest import CsvLineBatcher, UploadError
+
+    batcher = CsvLineBatcher(max_line_bytes=100)
+    with pytest.raises(UploadError):
+        list(batcher.feed(b"x" * 200 + b"\n"))
@@ -0,0 +1,67 @@
+import pandas as pd
+
+from columnar_cache import concat_tables, table_from_frame
+from phone_index import PhoneIndex
+
+
+def table(*orders):
+    """Orders given as (User_ID, Phone_Number) pairs."""
+    return table_from_frame(pd.DataFrame({
+        "User_ID": [str(user_id) for user_id, _ in orders],
+        "Phone_Number": [phone for _, phone in orders],
+        "User_Location": ["Test"] * len(orders),
+        "Order_List": ["[101]"] * len(orders),
+        "Order_Placed_Time": ["2024-10-01 10:00:00"] * len(orders),
+        "Order_Complete_Time": ["2024-10-01 10:10:00"] * len(orders),
+        "Order_Bill": ["100"] * len(orders),
+    }))
+
+
+def loaded(tables):
+    index = PhoneIndex()
+    for outlet, outlet_table in tables.items():
+        index.outlet_loaded(outlet, outlet_table)
+    return index
+
+
+def test_appended_phone_follows_outlet_name_order():
+    andheri, dadar = table((1, "900")), table((2, "911"), (3, "922"))
+    index = loaded({"Andheri": andheri, "Dadar": dadar})
+    # Already known from Dadar, but Andheri comes first by name and wins, as on a reload
+    batch = table((4, "911"), (5, "933"))
+    index.orders_appended("Andheri", batch, concat_tables(andheri, batch))
+    reloaded = loaded({"Andheri": concat_tables(andheri, batch), "Dadar": dadar})
+    for phone in ("900", "911", "922", "933"):
+        assert index.user_id(phone) == reloaded.user_id(phone)
+    for user_id in range(1, 6):
+        assert index.phone_number(user_id) == reloaded.phone_number(user_id)
+    assert index.user_id("911") == 4 and index.phone_number(2) is None
+
+
+def test_appended_phone_of_later_outlet_keeps_earlier_owner():
+    andheri, dadar = table((1, "900")), table((2, "911"))
+    index = loaded({"Andheri": andheri, "Dadar": dadar})
+    batch = table((3, "900"))
+    index.orders_appended("Dadar", batch, concat_tables(dadar, batch))
+    assert index.user_id("900") == 1 and index.phone_number(3) is None
+
+
+def test_random_appends_match_a_reload():
+    import random
+
+    rng = random.Random(0)
+    outlets = ["Andheri", "Bhayandar", "Dadar"]
+
+    def orders(n):
+        return [(rng.randrange(8), str(900 + rng.randrange(12))) for _ in range(n)]
+
+    tables = {outlet: table(*orders(4)) for outlet in outlets}
+    index = loaded(tables)
+    for _ in range(40):
+        outlet = rng.choice(outlets)
+        batch = table(*orders(3))
+        tables[outlet] = concat_tables(tables[outlet], batch)
+        index.orders_appended(outlet, batch, tables[outlet])
+        reloaded = loaded(tables)
+        assert index._phone_to_user == reloaded._phone_to_user
+        assert index._user_to_phone == reloaded._user_to_phone
@@ -0,0 +1,52 @@
+import tracemalloc
+
+import numpy as np
+
+import recommender
+from benchmarks import synthetic_interactions
+from recommender import RecommenderSystem
+
+
+def fitted(users: int) -> RecommenderSystem:
+    model = RecommenderSystem()
+    model.fit_interactions(*synthetic_interactions(users))
+    model.train_model(table_neighbors=None)
+    return model
+
+
+def test_neighbor_table_build_stays_within_block_budget(monkeypatch):
+    model = fitted(5000)
+    budget = 4 * 1024 * 1024
+    monkeypatch.setattr(recommender, "BLOCK_BYTES", budget)
+    rows = np.arange(model.matrix.shape[0])
+
+    tracemalloc.start()
+    try:
+        indices, scores = model.compute_neighbors(rows, 20)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # The similarity block plus the int32/float32 table and O(users) temporaries
+    table_bytes = indices.nbytes + scores.nbytes
+    assert peak <= budget + table_bytes + 64 * 8 * len(rows)
+
+    # Blocking does not change the result
+    monkeypatch.setattr(recommender, "BLOCK_BYTES", 1024 ** 3)
+    unblocked_indices, unblocked_scores = model.compute_neighbors(rows, 20)
+    assert np.array_equal(indices, unblocked_indices)
+    assert np.array_equal(scores, unblocked_scores)
+
+
+def test_exact_neighbors_match_dense_cosine():
+    model = fitted(500)
+    dense = model.matrix.toarray()
+    scaled = (dense - model.mean) / model.scale
+    unit = scaled / np.linalg.norm(scaled, axis=1, keepdims=True)
+    rows = np.arange(0, 500, 7)
+    expected = unit[rows] @ unit.T
+    assert np.allclose(model.similarities(rows), expected, atol=1e-12)
+
+    indices, similarities = model.exact_neighbors(rows, 5)
+    expected[np.arange(len(rows)), rows] = -np.inf
+    assert np.allclose(similarities, -np.sort(-expected, axis=1)[:, :5], atol=1e-12)
+    assert not (indices == rows[:, None]).any()
@@ -0,0 +1,26 @@
+import numpy as np
+
+from train_forecast import calendar_series, daily_sales
+
+HEADER = "User_ID,Phone_Number,User_Location,Order_List,Order_Placed_Time,Order_Complete_Time,Order_Bill\n"
+
+
+def test_calendar_series_fills_missing_days_with_zero():
+    dates = np.array(["2024-10-01", "2024-10-02", "2024-10-04"], dtype="datetime64[D]")
+    calendar, sales = calendar_series(dates, np.array([100.0, 50.0, 70.0]))
+    assert calendar.tolist() == np.arange(np.datetime64("2024-10-01"), np.datetime64("2024-10-05")).tolist()
+    assert sales.tolist() == [100.0, 50.0, 0.0, 70.0]
+
+
+def test_daily_sales_is_calendar_complete(tmp_path):
+    csv_path = tmp_path / "Andheri.csv"
+    csv_path.write_text(
+        HEADER
+        + '1,9000000001,Malad,[101],2024-10-01 08:00:00,2024-10-01 08:20:00,100\n'
+        + '2,9000000002,Malad,"[101, 102]",2024-10-01 09:00:00,2024-10-01 09:20:00,50\n'
+        # no orders on 2024-10-02
+        + '1,9000000001,Malad,[103],2024-10-03 10:00:00,2024-10-03 10:20:00,70\n'
+    )
+    dates, sales = daily_sales("Andheri", str(csv_path), str(tmp_path / "Cache"))
+    assert [str(day) for day in dates] == ["2024-10-01", "2024-10-02", "2024-10-03"]
+    assert sales.tolist() == [150.0, 0.0, 70.0]
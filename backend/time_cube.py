@@ -0,0 +1,170 @@
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from columnar_cache import OutletTable
+
+
+GRANULARITIES = ("hour", "day", "week", "month")
+
+# Metrics kept per outlet and hour, in row order of OutletCube.values
+METRICS = ("revenue", "orders", "items", "waiting_minutes_sum", "waiting_count")
+
+
+def bucket_starts(hours: np.ndarray, granularity: str) -> np.ndarray:
+    """Start hour (hours since epoch) of the hour/day/week/month bucket each hour falls in."""
+    if granularity == "hour":
+        return hours
+    stamps = hours.astype("datetime64[h]")
+    if granularity == "day":
+        starts = stamps.astype("datetime64[D]")
+    elif granularity == "week":
+        # Weeks start on Monday; 1970-01-01 was a Thursday
+        days = stamps.astype("datetime64[D]").astype(np.int64)
+        starts = (days - (days + 3) % 7).astype("datetime64[D]")
+    elif granularity == "month":
+        starts = stamps.astype("datetime64[M]")
+    else:
+        raise ValueError(f"Unknown granularity {granularity!r}, choose from {', '.join(GRANULARITIES)}")
+    return starts.astype("datetime64[h]").astype(np.int64)
+
+
+class OutletCube:
+    """Dense hourly metrics of one outlet, covering the hours [start_hour, start_hour + n)."""
+
+    def __init__(self):
+        self.start_hour = 0
+        self.values = np.zeros((len(METRICS), 0), dtype=np.float64)
+
+    @property
+    def end_hour(self) -> int:
+        return self.start_hour + self.values.shape[1]
+
+    def _cover(self, first_hour: int, last_hour: int) -> None:
+        """Grow the dense range so it includes [first_hour, last_hour]."""
+        if self.values.shape[1] == 0:
+            self.start_hour = first_hour
+            self.values = np.zeros((len(METRICS), last_hour - first_hour + 1))
+            return
+        start = min(self.start_hour, first_hour)
+        end = max(self.end_hour, last_hour + 1)
+        if start == self.start_hour and end == self.end_hour:
+            return
+        values = np.zeros((len(METRICS), end - start))
+        values[:, self.start_hour - start:self.end_hour - start] = self.values
+        self.start_hour, self.values = start, values
+
+    def add(self, table: OutletTable) -> "OutletCube":
+        placed = np.asarray(table.placed)
+        valid = ~np.isnat(placed)
+        if not valid.any():
+            return self
+        hours = placed[valid].astype("datetime64[h]").astype(np.int64)
+        self._cover(int(hours.min()), int(hours.max()))
+
+        complete = np.asarray(table.complete)[valid]
+        has_waiting = ~np.isnat(complete)
+        waiting = np.where(has_waiting, (complete - placed[valid]) / np.timedelta64(1, "m"), 0.0)
+
+        columns = hours - self.start_hour
+        n = self.values.shape[1]
+        batch = np.stack([
+            np.nan_to_num(np.asarray(table.bill, dtype=np.float64)[valid], nan=0.0),
+            np.ones(len(hours)),
+            np.diff(np.asarray(table.offsets))[valid],
+            waiting,
+            has_waiting,
+        ])
+        for row in range(len(METRICS)):
+            self.values[row] += np.bincount(columns, weights=batch[row], minlength=n)
+        return self
+
+
+class TimeCube:
+    """
+    Pre-aggregated outlet x hour cube of revenue, order count, item count and
+    waiting time sum/count, keyed on Order_Placed_Time.
+
+    Registered as an order store listener, so it is built when an outlet
+    loads and updated in O(batch) as orders are appended. Day, week and
+    month rollups are reduced from the hourly cube at query time, never from
+    raw rows, so a query over a year of data touches at most 8760 cells per
+    outlet.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._outlets: Dict[str, OutletCube] = {}
+
+    def outlet_loaded(self, outlet: str, table: OutletTable) -> None:
+        cube = OutletCube().add(table)
+        with self._lock:
+            self._outlets[outlet] = cube
+
+    def outlet_removed(self, outlet: str) -> None:
+        with self._lock:
+            self._outlets.pop(outlet, None)
+
+    def orders_appended(self, outlet: str, batch: OutletTable, table: OutletTable) -> None:
+        with self._lock:
+            self._outlets.setdefault(outlet, OutletCube()).add(batch)
+
+    def outlets(self) -> List[str]:
+        with self._lock:
+            return sorted(self._outlets)
+
+    def _hourly(self, outlets: List[str], first_hour: Optional[int], end_hour: Optional[int]):
+        """Summed hourly values of ``outlets`` over [first_hour, end_hour), clipped to the data."""
+        with self._lock:
+            cubes = [self._outlets[outlet] for outlet in outlets if self._outlets[outlet].values.shape[1]]
+            if not cubes:
+                return 0, np.zeros((len(METRICS), 0))
+            start = min(cube.start_hour for cube in cubes)
+            end = max(cube.end_hour for cube in cubes)
+            if first_hour is not None:
+                start = max(start, first_hour)
+            if end_hour is not None:
+                end = min(end, end_hour)
+            values = np.zeros((len(METRICS), max(end - start, 0)))
+            for cube in cubes:
+                lo, hi = max(start, cube.start_hour), min(end, cube.end_hour)
+                if lo < hi:
+                    values[:, lo - start:hi - start] += cube.values[:, lo - cube.start_hour:hi - cube.start_hour]
+            return start, values
+
+    def rollup(self, outlets: List[str], granularity: str = "day",
+               first_hour: Optional[int] = None, end_hour: Optional[int] = None) -> List[Dict]:
+        """
+        Buckets of the summed metrics of ``outlets`` at the given granularity,
+        restricted to hours in [first_hour, end_hour). Buckets cut by the range
+        only include the hours inside it.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity {granularity!r}, choose from {', '.join(GRANULARITIES)}")
+        start, values = self._hourly(outlets, first_hour, end_hour)
+        if values.shape[1] == 0:
+            return []
+
+        keys = bucket_starts(np.arange(start, start + values.shape[1]), granularity)
+        boundaries = np.concatenate([[0], np.flatnonzero(np.diff(keys)) + 1])
+        totals = np.add.reduceat(values, boundaries, axis=1)
+
+        labels = np.datetime_as_string(keys[boundaries].astype("datetime64[h]"), unit="m" if granularity == "hour" else "D")
+        revenue, orders, items, waiting_sum, waiting_count = totals
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg_waiting = np.round(waiting_sum / waiting_count, 2)
+        return [
+            {
+                "start": label,
+                "revenue": float(r),
+                "orders": int(o),
+                "items": int(i),
+                "avg_waiting_minutes": None if c == 0 else float(w),
+            }
+            for label, r, o, i, w, c in zip(labels.tolist(), revenue.tolist(), orders.tolist(),
+                                            items.tolist(), avg_waiting.tolist(), waiting_count.tolist())
+        ]
+
+
+time_cube = TimeCube()
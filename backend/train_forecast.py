@@ -0,0 +1,166 @@
+"""
+Retrains the per-outlet sales forecast models from Data/<Outlet>.csv.
+
+Each outlet's daily Order_Bill totals, with 0 for days without orders, are
+turned into the calendar features used by /forecast, and a StandardScaler +
+XGBRegressor pair is fitted per outlet in a process pool. Artifacts are written in xgboost's native format
+(model.ubj + scaler.npy) to Models/<location>/<version>/ and the manifest
+Models/models.json is updated, which the running server's model registry
+picks up without a restart.
+
+Run from the backend folder, e.g.:
+
+    python train_forecast.py
+    python train_forecast.py --outlets Andheri Dadar --workers 2
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from aggregates import OutletAggregates
+from columnar_cache import CACHE_DIR, ColumnarCache
+from forecast import MANIFEST_FILE, MODELS_DIR, date_features, location_for, save_native, update_manifest
+from order_store import DATA_DIR, MENU_FILE, file_signature, outlet_name
+
+
+# XGBRegressor settings of the original models
+MODEL_PARAMS = {"n_estimators": 100, "objective": "reg:squarederror"}
+# Outlets with fewer days of sales than this are skipped
+MIN_DAYS = 14
+
+
+def outlet_files(data_dir: str = DATA_DIR) -> Dict[str, str]:
+    """Outlet name -> CSV path for every outlet file in ``data_dir``."""
+    return {
+        outlet_name(file_name): os.path.join(data_dir, file_name)
+        for file_name in sorted(os.listdir(data_dir))
+        if file_name.lower().endswith(".csv") and file_name.lower() != MENU_FILE
+    }
+
+
+def calendar_series(dates: np.ndarray, sales: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reindex sorted daily sales onto every calendar day from the first to the
+    last, with 0 for days without orders, so that the models see zero-sales
+    days and position i is always i days after the first day.
+    """
+    if len(dates) == 0:
+        return dates, sales
+    calendar = np.arange(dates[0], dates[-1] + 1)
+    filled = np.zeros(len(calendar), dtype=np.float64)
+    filled[(dates - dates[0]).astype(np.int64)] = sales
+    return calendar, filled
+
+
+def daily_sales(outlet: str, csv_path: str, cache_dir: str = CACHE_DIR) -> Tuple[np.ndarray, np.ndarray]:
+    """(every day as datetime64[D], total Order_Bill per day, 0 without orders) of one outlet."""
+    table = ColumnarCache(cache_dir).load(outlet, csv_path, file_signature(csv_path))
+    days = OutletAggregates().add(table).daily_sales()
+    dates = np.array([day for day, _ in days], dtype="datetime64[D]")
+    sales = np.array([total for _, total in days], dtype=np.float64)
+    return calendar_series(dates, sales)
+
+
+def fit_model(features: np.ndarray, sales: np.ndarray, n_jobs: int = 1):
+    """Fit the scaler and regressor on a feature matrix; returns (model, scaler)."""
+    from sklearn.preprocessing import StandardScaler
+    from xgboost import XGBRegressor
+
+    scaler = StandardScaler().fit(features)
+    model = XGBRegressor(**MODEL_PARAMS, n_jobs=n_jobs)
+    model.fit(scaler.transform(features), sales)
+    return model, scaler
+
+
+def train_outlet(outlet: str, csv_path: str, models_dir: str, version: str) -> Dict:
+    """Train and save one outlet's model; runs in a worker process."""
+    started = time.perf_counter()
+    dates, sales = daily_sales(outlet, csv_path)
+    loaded = time.perf_counter()
+    location = location_for(outlet)
+    result = {"outlet": outlet, "location": location, "days": len(dates),
+              "load_seconds": loaded - started}
+    if len(dates) < MIN_DAYS:
+        result["error"] = f"only {len(dates)} days of sales, need {MIN_DAYS}"
+        return result
+
+    model, scaler = fit_model(date_features(dates), sales)
+    fitted = time.perf_counter()
+
+    model_file, scaler_file = save_native(model, scaler, os.path.join(models_dir, location, version))
+    result.update({
+        "model": model_file,
+        "scaler": scaler_file,
+        "version": version,
+        "trained_on": f"{dates[0]}..{dates[-1]}",
+        "fit_seconds": fitted - loaded,
+        "total_seconds": time.perf_counter() - started,
+    })
+    return result
+
+
+def train_all(outlets: Optional[List[str]] = None, data_dir: str = DATA_DIR, models_dir: str = MODELS_DIR,
+              manifest: str = MANIFEST_FILE, workers: Optional[int] = None) -> List[Dict]:
+    """
+    Train every outlet (or ``outlets``) in parallel, then point the manifest
+    at the new artifacts of the outlets that trained successfully.
+    """
+    files = outlet_files(data_dir)
+    if outlets:
+        missing = [outlet for outlet in outlets if outlet not in files]
+        if missing:
+            raise ValueError(f"No data file for: {', '.join(missing)}")
+        files = {outlet: files[outlet] for outlet in outlets}
+
+    version = datetime.now().strftime("%Y%m%d-%H%M%S")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {outlet: pool.submit(train_outlet, outlet, path, models_dir, version)
+                   for outlet, path in files.items()}
+        results = []
+        for outlet, future in futures.items():
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({"outlet": outlet, "location": location_for(outlet), "error": str(e)})
+
+    trained = {
+        result["location"]: {"model": result["model"], "scaler": result["scaler"],
+                             "version": result["version"], "trained_on": result["trained_on"]}
+        for result in results if "error" not in result
+    }
+    if trained:
+        update_manifest(manifest, trained)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain the per-outlet sales forecast models")
+    parser.add_argument("--outlets", nargs="*", help="outlet names (default: every CSV in the data folder)")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--manifest", default=MANIFEST_FILE,
+                        help="manifest the server reads the current models from (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="training processes (default: CPU count)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = train_all(args.outlets, args.data, args.models_dir, args.manifest, args.workers)
+    wall = time.perf_counter() - started
+
+    print(f"{'outlet':<16} {'location':<16} {'days':>6} {'load s':>8} {'fit s':>8} {'total s':>8}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['outlet']:<16} {result['location']:<16} ERROR {result['error']}")
+            continue
+        print(f"{result['outlet']:<16} {result['location']:<16} {result['days']:>6} "
+              f"{result['load_seconds']:>8.3f} {result['fit_seconds']:>8.3f} {result['total_seconds']:>8.3f}")
+    print(f"Trained {sum('error' not in r for r in results)}/{len(results)} outlets in {wall:.2f} s wall time")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,15 +7,37 @@ import toast from 'react-hot-toast';
 export default function UploadData() {
   const [preview, setPreview] = useState<string | null>(null);
 
-  const onDrop = useCallback((acceptedFiles: File[]) => {
+  const onDrop = useCallback(async (acceptedFiles: File[]) => {
     const file = acceptedFiles[0];
     if (file) {
+      // Preview only the start of the file so large exports are never read whole
       const reader = new FileReader();
       reader.onload = () => {
         setPreview(reader.result as string);
       };
-      reader.readAsText(file);
-      toast.success('File uploaded successfully!');
+      reader.readAsText(file.slice(0, 64 * 1024));
+
+      // Stream the file to the backend; the outlet is named after the file (e.g. Andheri.csv)
+      const outlet = file.name.replace(/\.csv$/i, '');
+      try {
+        const backendUrl = process.env.NEXT_PUBLIC_BACKEND_URL;
+        const response = await fetch(`${backendUrl}/upload/${encodeURIComponent(outlet)}`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'text/csv' },
+          body: file,
+        });
+        const result = await response.json();
+        if (!response.ok) {
+          throw new Error(result.detail || 'Upload failed');
+        }
+        toast.success(`Added ${result.rows_ingested} orders to ${result.outlet}`);
+        if (result.rows_rejected > 0) {
+          toast.error(`${result.rows_rejected} invalid rows were skipped`);
+        }
+      } catch (error) {
+        console.error('Error uploading file:', error);
+        toast.error(error instanceof Error ? error.message : 'Upload failed');
+      }
     }
   }, []);
 